@@ -0,0 +1,275 @@
+import math
+import os
+import threading
+from collections import Counter
+from datetime import date
+
+import numpy as np
+
+from quantile_sketch import DURATION_ACCURACY, resketched, sketch_key, sketch_keys, sketch_values
+from rollups import rebinned
+from telemetry import OPERATION_SECONDS
+
+# Width (in $) of the buckets the rate difference histogram is kept in
+RATE_BIN_WIDTH = float(os.environ.get('DASHBOARD_RATE_BIN_WIDTH', '25'))
+# Most bars the rate difference chart is sent, however wide the range gets
+RATE_DISPLAY_BINS = int(os.environ.get('DASHBOARD_RATE_DISPLAY_BINS', '20'))
+# Display bins are this many buckets wide (times a power of ten)
+_NICE_FACTORS = (1, 2, 4, 5)
+
+
+def _to_float(value):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return float('nan')
+    return value
+
+
+def _date_key(timestamp):
+    try:
+        return date.fromisoformat(str(timestamp)[:10]).isoformat()
+    except ValueError:
+        return None
+
+
+class DashboardAggregates:
+    """Running dashboard statistics, folded in as call metrics are appended.
+
+    The store follows the call metrics storage by cursor: the first refresh
+    rebuilds everything from storage, later ones only read rows appended
+    since (by this process or any other worker). Serving the dashboard reads
+    counters, running sums, daily buckets, histogram bins and quantile
+    sketches, never the history itself, so its size (and the payload built
+    from it) does not grow with the number of calls.
+    """
+
+    def __init__(self, storage, rate_bin_width=RATE_BIN_WIDTH):
+        self.storage = storage
+        self.rate_bin_width = rate_bin_width
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._cursor = 0
+        self._generation = None
+        self.total_calls = 0
+        self.successful_calls = 0
+        self.loads_accepted = 0
+        self.duration_sum = 0.0
+        self.duration_count = 0
+        self.rounds_sum = 0.0
+        self.rounds_count = 0
+        self.outcomes = Counter()
+        self.sentiments = Counter()
+        self.daily = Counter()
+        self.rate_bins = Counter()
+        self.has_rate_difference = False
+        # call_duration quantile sketches (see quantile_sketch.py), keyed by load_accepted
+        self.durations = {True: Counter(), False: Counter()}
+
+    # -- ingest -----------------------------------------------------------
+
+    def refresh(self):
+        """Fold in rows appended since the last refresh; O(new rows)"""
+        with self._lock:
+            generation, end = self.storage.call_metrics_state()
+            if generation != self._generation or end < self._cursor:
+                # Storage was replaced or truncated: start over
+                self._reset()
+                self._generation = generation
+            if end == self._cursor:
+                return
+            if self._cursor == 0:
+                with OPERATION_SECONDS.time('aggregates_rebuild'):
+                    # Days already rolled up come from their daily summaries
+                    start = 0
+                    rollups = getattr(self.storage, 'call_metrics_rollups', None)
+                    if rollups is not None:
+                        summaries, start = rollups()
+                        for summary in summaries:
+                            self._add_rollup(summary)
+                    for chunk in self.storage.iter_call_metrics_frames(start, end):
+                        self._add_frame(chunk)
+            else:
+                with OPERATION_SECONDS.time('aggregates_fold'):
+                    for record, _ in self.storage.iter_call_metrics(self._cursor, end):
+                        self._add_row(record)
+            self._cursor = end
+
+    def _add_row(self, row):
+        self.total_calls += 1
+        outcome = row.get('outcome') or None
+        if outcome is not None:
+            self.outcomes[outcome] += 1
+            if outcome == 'successful':
+                self.successful_calls += 1
+        sentiment = row.get('sentiment') or None
+        if sentiment is not None:
+            self.sentiments[sentiment] += 1
+        day = _date_key(row.get('timestamp', ''))
+        if day is not None:
+            self.daily[day] += 1
+
+        duration = _to_float(row.get('call_duration'))
+        if not math.isnan(duration):
+            self.duration_sum += duration
+            self.duration_count += 1
+        rounds = _to_float(row.get('negotiation_rounds'))
+        if not math.isnan(rounds):
+            self.rounds_sum += rounds
+            self.rounds_count += 1
+        rate_difference = _to_float(row.get('rate_difference'))
+        if not math.isnan(rate_difference):
+            self.has_rate_difference = True
+            self.rate_bins[math.floor(rate_difference / self.rate_bin_width)] += 1
+
+        accepted = str(row.get('load_accepted'))
+        if accepted in ('True', 'False'):
+            accepted = accepted == 'True'
+            if accepted:
+                self.loads_accepted += 1
+            if not math.isnan(duration):
+                self.durations[accepted][sketch_key(duration)] += 1
+
+    def _add_frame(self, df):
+        """Vectorized equivalent of _add_row over a whole chunk"""
+        import pandas as pd  # deferred: only needed when rebuilding from storage
+        self.total_calls += len(df)
+        if 'outcome' in df.columns:
+            self.outcomes.update(df['outcome'].value_counts().to_dict())
+            self.successful_calls += int((df['outcome'] == 'successful').sum())
+        if 'sentiment' in df.columns:
+            self.sentiments.update(df['sentiment'].value_counts().to_dict())
+        if 'timestamp' in df.columns:
+            days = pd.to_datetime(df['timestamp'].astype(str).str[:10], errors='coerce', format='%Y-%m-%d')
+            self.daily.update(days.dropna().dt.strftime('%Y-%m-%d').value_counts().to_dict())
+
+        duration = None
+        if 'call_duration' in df.columns:
+            duration = pd.to_numeric(df['call_duration'], errors='coerce')
+            self.duration_sum += float(duration.sum())
+            self.duration_count += int(duration.count())
+        if 'negotiation_rounds' in df.columns:
+            rounds = pd.to_numeric(df['negotiation_rounds'], errors='coerce')
+            self.rounds_sum += float(rounds.sum())
+            self.rounds_count += int(rounds.count())
+        if 'rate_difference' in df.columns:
+            rate_difference = pd.to_numeric(df['rate_difference'], errors='coerce').dropna()
+            if len(rate_difference):
+                self.has_rate_difference = True
+                bins = np.floor(rate_difference / self.rate_bin_width).astype(int)
+                self.rate_bins.update(bins.value_counts().to_dict())
+
+        if 'load_accepted' in df.columns:
+            accepted = df['load_accepted'].astype(str)
+            self.loads_accepted += int((accepted == 'True').sum())
+            if duration is not None:
+                for flag in (True, False):
+                    values = duration[(accepted == str(flag)) & duration.notna()]
+                    keys, counts = np.unique(sketch_keys(values.to_numpy()), return_counts=True)
+                    self.durations[flag].update(dict(zip(keys.tolist(), counts.tolist())))
+
+    def _add_rollup(self, summary):
+        """Fold in one day's rollup (see rollups.py) as if its rows had been read"""
+        self.total_calls += summary['calls']
+        self.successful_calls += summary['successful_calls']
+        self.loads_accepted += summary['loads_accepted']
+        self.outcomes.update(summary['outcomes'])
+        self.sentiments.update(summary['sentiments'])
+        if summary['calls']:
+            self.daily[summary['date']] += summary['calls']
+        self.duration_sum += summary['duration_sum']
+        self.duration_count += summary['duration_count']
+        self.rounds_sum += summary['rounds_sum']
+        self.rounds_count += summary['rounds_count']
+        if summary['rate_difference_count']:
+            self.has_rate_difference = True
+            self.rate_bins.update(rebinned(summary['rate_bins'], summary['rate_bin_width'], self.rate_bin_width))
+        accuracy = summary['duration_accuracy']
+        self.durations[True].update(resketched(summary['durations_accepted'], accuracy, DURATION_ACCURACY))
+        self.durations[False].update(resketched(summary['durations_rejected'], accuracy, DURATION_ACCURACY))
+
+    # -- serving ----------------------------------------------------------
+
+    def metrics(self):
+        avg_call_duration = self.duration_sum / self.duration_count if self.duration_count else float('nan')
+        avg_negotiation_rounds = self.rounds_sum / self.rounds_count if self.rounds_count else float('nan')
+        return {
+            'total_calls': self.total_calls,
+            'successful_calls': self.successful_calls,
+            'success_rate': self.successful_calls / self.total_calls * 100 if self.total_calls else 0,
+            'avg_call_duration': avg_call_duration,
+            'avg_negotiation_rounds': avg_negotiation_rounds,
+            'loads_accepted': self.loads_accepted,
+        }
+
+    def rate_histogram(self, max_bins=RATE_DISPLAY_BINS):
+        """(bin centers, counts, bin width) of the rate difference histogram, in at most max_bins bins.
+
+        Display bins merge a nice number of storage bins and are aligned to
+        zero, so they stay put as calls come in until the range outgrows them.
+        """
+        lo, hi = min(self.rate_bins), max(self.rate_bins)
+        scale = 1
+        while True:
+            factor = next((f * scale for f in _NICE_FACTORS if hi // (f * scale) - lo // (f * scale) < max_bins), None)
+            if factor is not None:
+                break
+            scale *= 10
+        merged = Counter()
+        for key, count in self.rate_bins.items():
+            merged[key // factor] += count
+        width = factor * self.rate_bin_width
+        keys = sorted(merged)
+        return [(k + 0.5) * width for k in keys], [merged[k] for k in keys], width
+
+    def duration_box(self, accepted):
+        """Box plot statistics of call_duration for accepted/rejected loads, or None"""
+        stats = box_stats(sketch_values(self.durations[accepted]))
+        # Sketch values are only good to DURATION_ACCURACY; more digits are noise
+        return stats and {key: round(value, 2) for key, value in stats.items()}
+
+    def snapshot(self):
+        """Refresh, then return a consistent copy of everything the dashboard needs"""
+        self.refresh()
+        with self._lock:
+            return {
+                'metrics': self.metrics(),
+                'outcomes': self.outcomes.most_common(),
+                'sentiments': self.sentiments.most_common(),
+                'daily': sorted(self.daily.items()),
+                'rate_histogram': self.rate_histogram() if self.has_rate_difference else None,
+                'duration_box': {flag: self.duration_box(flag) for flag in (True, False)},
+            }
+
+
+def _weighted_quantile(values, cumulative, total, q):
+    # Linear interpolation between order statistics, as pandas/numpy do
+    pos = q * (total - 1)
+    lo = math.floor(pos)
+    hi = min(lo + 1, total - 1)
+    v_lo = values[int(np.searchsorted(cumulative, lo, side='right'))]
+    v_hi = values[int(np.searchsorted(cumulative, hi, side='right'))]
+    return v_lo + (v_hi - v_lo) * (pos - lo)
+
+
+def box_stats(histogram):
+    """Tukey box statistics from a {value: count} histogram"""
+    total = sum(histogram.values())
+    if not total:
+        return None
+    values = sorted(histogram)
+    counts = np.array([histogram[v] for v in values])
+    cumulative = np.cumsum(counts)
+    q1, median, q3 = (_weighted_quantile(values, cumulative, total, q) for q in (0.25, 0.5, 0.75))
+    iqr = q3 - q1
+    inside = [v for v in values if q1 - 1.5 * iqr <= v <= q3 + 1.5 * iqr]
+    return {
+        'q1': q1,
+        'median': median,
+        'q3': q3,
+        'lowerfence': inside[0],
+        'upperfence': inside[-1],
+        'mean': float(np.dot(values, counts) / total),
+    }
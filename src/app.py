@@ -1,33 +1,142 @@
 
-from flask import Flask, jsonify, request, abort, render_template_string
-import pandas as pd
+from flask import Flask, Response, g, jsonify, request, abort, redirect, render_template_string
+import math
 import os
+import atexit
+import hashlib
+import hmac
+import itertools
+import logging
+import signal
+import sys
+import threading
+import time
 from functools import wraps
 from datetime import datetime
-import plotly.graph_objs as go
-import plotly.express as px
 import json
-import plotly
+from werkzeug.serving import make_server
+from storage import STORAGE_DIR, get_storage
+from load_board import LoadBoard, parse_datetime
+from load_changes import LOADS_WAL_FILE, LoadChangeLog, parse_deletes, parse_upserts
+from loads_format import json_body, json_records, output_options, select, text_results
+from ranking import DEFAULT_TOP_K, DEFAULT_WEIGHTS, MAX_TOP_K, parse_weights
+from metrics_reader import parse_time_bound
+from metrics_writer import CALL_METRICS_COLUMNS, serialize_rows
+from rollups import daily_report, summarize_frames
+from aggregates import RATE_BIN_WIDTH, DashboardAggregates
+from carriers import CarrierProfiles
+from rate_guidance import RateGuidance
+from idempotency import CallIdIndex, call_id
+from wire_formats import (ARROW_MIMETYPE, MSGPACK_MIMETYPE, arrow_stream, compress_response, content_encodings,
+                          missing_format_dependency, msgpack_body, msgpack_records, negotiate_encoding)
+from static_assets import ASSETS_DIR, StaticAsset, unhashed_name
+from conditional import data_etag, not_modified
+from dashboard_feed import DashboardFeed
+from structured_logging import (body_for_log, configure_logging, get_logger, log_event, route_enabled,
+                                sample_body)
+from telemetry import (CONTENT_TYPE as METRICS_CONTENT_TYPE, OPERATION_SECONDS, REGISTRY, REQUEST_SECONDS,
+                       CALL_METRICS_DUPLICATES, ROWS_INGESTED, ROWS_REJECTED, Gauge, TimedStorage)
+from ingest import (ASYNC_INGEST, MAX_BATCH_ROWS, IngestQueue, build_call_metric_row,
+                    coerce_call_metrics_batch, parse_batch_body)
 
 app = Flask(__name__)
 
+# Structured JSON logs, written by a background thread
+configure_logging()
+log = get_logger('app')
+# Requests are logged by observe_request below; skip the dev server's synchronous access lines
+logging.getLogger('werkzeug').setLevel(logging.WARNING)
+
 API_KEY = os.environ.get('ACME_API_KEY', 'testkey123')  # Set a default for local dev
 
-# Initialize call metrics CSV file
+# Fast-start mode for scale-to-zero machines: skip the eager cache builds at
+# import and warm them in the background once the port is bound
+FAST_START = os.environ.get('FAST_START', '').lower() in ('1', 'true', 'yes')
+
+# GET /call-metrics pagination and streaming
+CALL_METRICS_PAGE_MAX = 10000
+STREAM_BATCH_ROWS = 500
+STREAM_MIMETYPES = {
+    'json': 'application/json',
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+    'msgpack': MSGPACK_MIMETYPE,
+    'arrow': ARROW_MIMETYPE
+}
+EXPORT_LINK_TTL = 300  # seconds a dashboard export link stays valid
+
+# Plotly bundle served to the dashboard from /assets, so the page works offline; a
+# partial build with the pie, bar, scatter, histogram and box traces can be dropped in
+DASHBOARD_PLOTLY_BUNDLE = os.environ.get('DASHBOARD_PLOTLY_BUNDLE', os.path.join(ASSETS_DIR, 'plotly-2.35.2.min.js'))
+# Seconds browsers may reuse the dashboard page before revalidating it
+DASHBOARD_PAGE_MAX_AGE = int(os.environ.get('DASHBOARD_PAGE_MAX_AGE', '86400'))
+# Hashed asset names change with their content, so copies never go stale
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# Storage backend (csv, sqlite or parquet) selected by STORAGE_BACKEND, with its reads and writes timed
+storage = TimedStorage(get_storage())
+atexit.register(storage.close)
+
+# Initialize call metrics storage
 def init_call_metrics_csv():
-    csv_path = os.path.join(os.path.dirname(__file__), 'call_metrics.csv')
-    if not os.path.exists(csv_path):
-        df = pd.DataFrame(columns=[
-            'timestamp', 'mc_number', 'carrier_name', 'call_duration', 
-            'load_id', 'outcome', 'sentiment', 'negotiation_rounds',
-            'initial_rate', 'final_rate', 'rate_difference', 'load_accepted'
-        ])
-        df.to_csv(csv_path, index=False)
-    return csv_path
-
-# Initialize CSV on startup
+    storage.init_call_metrics()
+    return storage
+
+# Initialize call metrics on startup
 init_call_metrics_csv()
 
+# Load board upserts/deletes are logged here and folded into storage every LOADS_WAL_COMPACT_ENTRIES changes
+load_changes = LoadChangeLog(os.path.join(STORAGE_DIR, LOADS_WAL_FILE))
+load_board = LoadBoard(storage, load_changes)
+
+# Dashboard aggregates, rebuilt from storage once and then kept up to date on each write
+dashboard_aggregates = DashboardAggregates(storage)
+# Per-carrier profiles by mc_number, followed the same way
+carrier_profiles = CarrierProfiles(storage)
+# Negotiation outcomes by lane and equipment type, joined to the board by load_id
+rate_guidance = RateGuidance(storage, load_board)
+# call_ids already stored, so webhook retries are acknowledged without a second row
+call_ids = CallIdIndex(storage)
+if not FAST_START:
+    dashboard_aggregates.refresh()
+    carrier_profiles.refresh()
+    rate_guidance.refresh()
+    call_ids.refresh()
+
+def prewarm():
+    """Build the load board snapshot and every call metrics index ahead of the first request"""
+    try:
+        load_board.snapshot()
+        dashboard_aggregates.refresh()
+        carrier_profiles.refresh()
+        rate_guidance.refresh()
+        call_ids.refresh()
+        for encoding in content_encodings():
+            plotly_bundle.body(encoding)
+    except Exception as e:
+        log_event(log, logging.ERROR, 'prewarm.failed', error=str(e))
+
+# Live dashboard deltas pushed to every /dashboard/stream viewer
+# (dashboard_payload is defined with the dashboard routes below)
+dashboard_feed = DashboardFeed(dashboard_aggregates, lambda agg: dashboard_payload(agg))
+
+def call_metrics_written():
+    """Wake the live feed. The dashboard aggregates, carrier profiles and rate guidance
+    fold new rows in on their next read, so the write path never pays for them."""
+    dashboard_feed.notify()
+
+# Background writer for CALL_METRICS_ASYNC mode; flushed before storage closes at exit
+ingest_queue = IngestQueue(storage, on_commit=call_metrics_written,
+                           on_drop=lambda rows: call_ids.release([row['call_id'] for row in rows]))
+atexit.register(ingest_queue.close)
+QUEUE_FULL_RETRY_AFTER = 1  # seconds
+BATCH_BODY_LOG_ITEMS = 5  # items of a sampled batch body that are logged
+
+REGISTRY.register(Gauge('call_metrics_queue_depth', 'Rows queued for the asynchronous writer',
+                        lambda: ingest_queue.depth))
+REGISTRY.register(Gauge('dashboard_stream_viewers', 'Open /dashboard/stream connections',
+                        lambda: dashboard_feed.broadcaster.viewers))
+
 # Dashboard HTML template with Plotly
 DASHBOARD_HTML = '''
 <!DOCTYPE html>
@@ -36,7 +145,7 @@ DASHBOARD_HTML = '''
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>Acme Logistics - Inbound Carrier Sales Dashboard</title>
-    <script src="https://cdn.plot.ly/plotly-latest.min.js"></script>
+    <script src="{{ plotly_url }}"></script>
     <style>
         body { 
             font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif; 
@@ -208,17 +317,32 @@ DASHBOARD_HTML = '''
             }, 3000);
         }
         
+        // ETag of the data currently on screen
+        let dataETag = null;
+
         async function loadDashboard() {
             try {
                 showStatus('Loading dashboard data...', 'success');
                 
-                const response = await fetch('/dashboard/data');
+                const headers = {};
+                if (dataETag) headers['If-None-Match'] = dataETag;
+                // no-store: handle the 304 here instead of in the browser cache
+                const response = await fetch('/dashboard/data', { headers, cache: 'no-store' });
+                
+                if (response.status === 304) {
+                    // Nothing logged since the last refresh; keep the current charts
+                    document.getElementById('lastUpdated').textContent = 
+                        `Last updated: ${new Date().toLocaleTimeString()}`;
+                    showStatus('Dashboard is up to date', 'success');
+                    return;
+                }
                 
                 if (!response.ok) {
                     throw new Error(`HTTP error! status: ${response.status}`);
                 }
                 
                 const data = await response.json();
+                dataETag = response.headers.get('ETag');
                 
                 // Update metrics
                 updateMetrics(data.metrics);
@@ -285,48 +409,122 @@ DASHBOARD_HTML = '''
         
         async function exportData() {
             try {
-                const response = await fetch('/call-metrics', {
+                const response = await fetch('/call-metrics/export-link', {
+                    method: 'POST',
                     headers: {
                         'x-api-key': API_KEY
                     }
                 });
-                const data = await response.json();
-                
-                // Convert to CSV
-                const csv = convertToCSV(data);
+                if (!response.ok) {
+                    throw new Error(`HTTP error! status: ${response.status}`);
+                }
+                const link = await response.json();
                 
-                // Download
-                const blob = new Blob([csv], { type: 'text/csv' });
-                const url = window.URL.createObjectURL(blob);
+                // Let the browser stream the server-side CSV straight to disk
                 const a = document.createElement('a');
-                a.href = url;
+                a.href = link.url;
                 a.download = `call_metrics_${new Date().toISOString().split('T')[0]}.csv`;
                 a.click();
-                window.URL.revokeObjectURL(url);
                 
-                showStatus('Data exported successfully!', 'success');
+                showStatus('Data export started!', 'success');
             } catch (error) {
                 showStatus(`Export failed: ${error.message}`, 'error');
             }
         }
         
-        function convertToCSV(data) {
-            if (!data.length) return '';
-            
-            const headers = Object.keys(data[0]);
-            const csvContent = [
-                headers.join(','),
-                ...data.map(row => headers.map(header => JSON.stringify(row[header] || '')).join(','))
-            ].join('\\n');
+        function markUpdated() {
+            document.getElementById('lastUpdated').textContent = 
+                `Last updated: ${new Date().toLocaleTimeString()}`;
+        }
+        
+        function patchCounts(chartId, counts, labelKey, valueKey) {
+            // Overwrite the changed categories of a pie/bar/line trace, append new ones
+            const trace = document.getElementById(chartId).data[0];
+            const labels = trace[labelKey].slice();
+            const values = trace[valueKey].slice();
+            for (const [label, count] of Object.entries(counts)) {
+                const i = labels.indexOf(label);
+                if (i >= 0) {
+                    values[i] = count;
+                } else {
+                    labels.push(label);
+                    values.push(count);
+                }
+            }
+            Plotly.restyle(chartId, {[labelKey]: [labels], [valueKey]: [values]}, [0]);
+        }
+        
+        function applyDelta(delta) {
+            const needed = {
+                outcomes: 'outcomesChart',
+                sentiments: 'sentimentChart',
+                daily: 'dailyVolumeChart',
+                rate_bins: 'rateNegotiationChart',
+                duration_box: 'durationSuccessChart'
+            };
+            for (const [key, chartId] of Object.entries(needed)) {
+                if (delta[key] && !document.getElementById(chartId).data) {
+                    // A chart appeared for the first time: fetch it whole
+                    loadDashboard();
+                    return;
+                }
+            }
             
-            return csvContent;
+            updateMetrics(delta.metrics);
+            if (delta.outcomes) patchCounts('outcomesChart', delta.outcomes, 'labels', 'values');
+            if (delta.sentiments) patchCounts('sentimentChart', delta.sentiments, 'x', 'y');
+            if (delta.daily) {
+                // Known days are updated in place; a new day extends the line
+                const days = document.getElementById('dailyVolumeChart').data[0].x;
+                const known = {};
+                const added = [];
+                for (const day of Object.keys(delta.daily).sort()) {
+                    if (days.includes(day)) known[day] = delta.daily[day]; else added.push(day);
+                }
+                if (Object.keys(known).length) patchCounts('dailyVolumeChart', known, 'x', 'y');
+                if (added.length) {
+                    Plotly.extendTraces('dailyVolumeChart', {x: [added], y: [added.map(day => delta.daily[day])]}, [0]);
+                }
+            }
+            if (delta.rate_bins) {
+                // Added counts per bin; histfunc 'sum' folds them into the existing bars
+                Plotly.extendTraces('rateNegotiationChart', {x: [delta.rate_bins.x], y: [delta.rate_bins.y]}, [0]);
+            }
+            if (delta.duration_box) {
+                ['accepted', 'rejected'].forEach((name, trace) => {
+                    const stats = delta.duration_box[name];
+                    if (!stats) return;
+                    const update = {};
+                    for (const [key, value] of Object.entries(stats)) update[key] = [[value]];
+                    Plotly.restyle('durationSuccessChart', update, [trace]);
+                });
+            }
         }
         
-        // Load dashboard on page load
-        loadDashboard();
+        function connectStream() {
+            // A full snapshot on connect, then a small delta whenever a call is logged;
+            // EventSource reconnects by itself and the server resends the snapshot
+            const source = new EventSource('/dashboard/stream');
+            source.addEventListener('snapshot', (event) => {
+                const data = JSON.parse(event.data);
+                updateMetrics(data.metrics);
+                updateCharts(data.charts);
+                markUpdated();
+            });
+            source.addEventListener('delta', (event) => {
+                applyDelta(JSON.parse(event.data));
+                markUpdated();
+            });
+            source.onerror = () => showStatus('Live updates interrupted, reconnecting...', 'error');
+        }
         
-        // Auto-refresh every 2 minutes
-        setInterval(loadDashboard, 120000);
+        if (window.EventSource) {
+            connectStream();
+        } else {
+            // No Server-Sent Events: poll with conditional requests instead
+            loadDashboard();
+            setInterval(loadDashboard, 120000);
+        }
     </script>
 </body>
 </html>
@@ -341,40 +539,206 @@ def require_api_key(f):
         return f(*args, **kwargs)
     return decorated
 
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def observe_request(response):
+    start = g.get('request_start')
+    if start is not None:
+        elapsed = time.perf_counter() - start
+        # The rule, not the URL, so /loads/<id>-style paths share one series
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        REQUEST_SECONDS.observe(elapsed, route, request.method, str(response.status_code))
+        level = logging.WARNING if response.status_code >= 500 else logging.INFO
+        if route_enabled(route, level):
+            log_event(log, level, 'request', method=request.method, route=route, path=request.path,
+                      status=response.status_code, duration_ms=round(elapsed * 1000, 3))
+    return response
+
+@app.route('/metrics')
+@require_api_key
+def prometheus_metrics():
+    """Request latencies, storage and aggregate timers and ingest counters in Prometheus text format"""
+    return Response(REGISTRY.render(), content_type=METRICS_CONTENT_TYPE)
+
 @app.route('/')
 @require_api_key
 def home():
     return 'Hello, Flask!'
 
+def compressible(f):
+    """Compress the view's responses as the client's Accept-Encoding allows (see wire_formats.py)"""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        g.content_encoding = negotiate_encoding(request.accept_encodings)
+        return compress_response(app.make_response(f(*args, **kwargs)), g.content_encoding)
+    return decorated
+
+def conditional_response(dataset, stamp, variant, build):
+    """Answer 304 from the version stamp alone, else build the response and attach validators"""
+    if g.get('content_encoding'):
+        # Each encoding of a representation needs its own strong ETag
+        variant = [*variant, ('encoding', g.content_encoding)]
+    etag = data_etag(dataset, stamp, variant)
+    if not_modified(request, etag):
+        response = Response(status=304)
+    else:
+        response = app.make_response(build())
+        if response.status_code != 200:
+            return response
+    response.set_etag(etag)
+    # Clients may keep a copy but must revalidate it, which is a cheap 304
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+def request_variant(args):
+    """Query parameters in a stable order, for the ETag of a filtered view"""
+    return sorted(args.items(multi=True))
+
 @app.route('/loads', methods=['GET'])
 @require_api_key
 def get_loads():
-    csv_path = os.path.join(os.path.dirname(__file__), 'sample_loads.csv')
-    df = pd.read_csv(csv_path)
-    params = request.args
-    for key, value in params.items():
-        if key in df.columns:
-            df = df[df[key].astype(str).str.contains(value, case=False, na=False)]
-    if df.empty:
-        return jsonify({'message': 'No matching records found.', 'results': ''})
-    # Format all matched records as a single string
-    rows = []
-    for _, row in df.iterrows():
-        row_str = ', '.join(f"{col}: {row[col]}" for col in df.columns)
-        rows.append(row_str)
-    results_str = '\n'.join(rows)
-    return jsonify({'message': f'Matched {len(rows)} loads.', 'results': results_str})
+    def build():
+        snapshot = load_board.snapshot()
+        try:
+            with OPERATION_SECONDS.time('loads_filter'):
+                df = snapshot.filter(request.args)
+            fmt, fields, offset, limit = output_options(request.args, list(df.columns))
+        except ValueError as e:
+            return jsonify({'status': 'error', 'message': str(e)}), 400
+        total = len(df)
+        page = select(df, fields, offset, limit)
+        paged = offset > 0 or limit is not None
+        with OPERATION_SECONDS.time('loads_format'):
+            if fmt == 'json':
+                envelope = {
+                    'message': f'Matched {total} loads.' if total else 'No matching records found.',
+                    'total': total,
+                    'offset': offset,
+                    'count': len(page),
+                    'next_offset': offset + len(page) if offset + len(page) < total else None
+                }
+                return Response(json_body(envelope, json_records(page)), mimetype='application/json')
+            if df.empty:
+                return jsonify({'message': 'No matching records found.', 'results': ''})
+            # All matched records (or the requested page) as a single string
+            body = {'message': f'Matched {total} loads.', 'results': text_results(page)}
+            if paged:
+                body.update(offset=offset, count=len(page),
+                            next_offset=offset + len(page) if offset + len(page) < total else None)
+            return jsonify(body)
+
+    # 'now'-relative windows change with the clock, not the data
+    if any(value.strip().lower().startswith('now') for value in request.args.values()):
+        return build()
+    return conditional_response('loads', load_board.version(), request_variant(request.args), build)
+
+@app.route('/loads/top', methods=['GET'])
+@require_api_key
+def get_top_loads():
+    """The k most relevant matching loads for a carrier, best first"""
+    args = request.args
+
+    def build():
+        snapshot = load_board.snapshot()
+        try:
+            k = args.get('k') or str(DEFAULT_TOP_K)
+            if not k.isdigit() or not 1 <= int(k) <= MAX_TOP_K:
+                raise ValueError(f'k must be between 1 and {MAX_TOP_K}')
+            weights = parse_weights(args.get('weights', ''), DEFAULT_WEIGHTS)
+            as_of = parse_datetime(args.get('as_of') or 'now')
+            with OPERATION_SECONDS.time('loads_top'):
+                df, total = snapshot.top(args, int(k), weights, args.get('equipment'), as_of)
+            fmt, fields, _, _ = output_options(args, list(df.columns))
+        except ValueError as e:
+            return jsonify({'status': 'error', 'message': str(e)}), 400
+        page = select(df, fields)
+        message = f'Top {len(page)} of {total} matching loads.' if total else 'No matching records found.'
+        with OPERATION_SECONDS.time('loads_format'):
+            if fmt == 'json':
+                envelope = {'message': message, 'total': total, 'count': len(page), 'weights': weights}
+                return Response(json_body(envelope, json_records(page)), mimetype='application/json')
+            return jsonify({'message': message, 'results': text_results(page)})
+
+    # Urgency is measured from now unless as_of pins the moment
+    as_of = args.get('as_of', '').strip().lower()
+    if not as_of or as_of.startswith('now'):
+        return build()
+    return conditional_response('loads', load_board.version(), ['top'] + request_variant(args), build)
+
+def load_changes_body():
+    """The JSON body of a POST/DELETE /loads request, or an error response"""
+    if not request.is_json:
+        return None, (jsonify({'status': 'error', 'message': 'Content-Type must be application/json'}), 400)
+    data = request.get_json(silent=True)
+    if data is None:
+        return None, (jsonify({'status': 'error', 'message': 'Invalid JSON data'}), 400)
+    return data, None
+
+@app.route('/loads', methods=['POST'])
+@require_api_key
+def upsert_loads():
+    """Create or update one load (a JSON object) or many (a JSON array), keyed by load_id"""
+    data, error = load_changes_body()
+    if error:
+        return error
+    try:
+        loads = parse_upserts(data)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    created, updated = load_board.upsert(loads)
+    return jsonify({'status': 'success', 'created': created, 'updated': updated})
+
+@app.route('/loads', methods=['DELETE'])
+@require_api_key
+def delete_loads():
+    """Remove loads from the board: {"load_ids": [...]}"""
+    data, error = load_changes_body()
+    if error:
+        return error
+    try:
+        load_ids = parse_deletes(data)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    deleted = load_board.delete(load_ids)
+    found = set(deleted)
+    return jsonify({
+        'status': 'success',
+        'deleted': len(deleted),
+        'not_found': [load_id for load_id in dict.fromkeys(load_ids) if load_id not in found]
+    })
+
+@app.route('/loads/<load_id>', methods=['DELETE'])
+@require_api_key
+def delete_load(load_id):
+    """Remove one load from the board"""
+    if not load_board.delete([load_id.strip()]):
+        return jsonify({'status': 'error', 'message': f'Load {load_id} not found'}), 404
+    return jsonify({'status': 'success', 'deleted': 1})
+
+@app.route('/loads/<load_id>/rate-guidance', methods=['GET'])
+@require_api_key
+def get_rate_guidance(load_id):
+    """Target rate, floor and acceptance probability for a load, from past calls on its lane"""
+    def build():
+        with OPERATION_SECONDS.time('rate_guidance'):
+            guidance = rate_guidance.guidance(load_id)
+        if guidance is None:
+            return jsonify({'status': 'error', 'message': f'Load {load_id} not found'}), 404
+        return jsonify(guidance)
+
+    stamp = (load_board.version(), storage.call_metrics_state())
+    return conditional_response('rate-guidance', stamp, [load_id], build)
 
 @app.route('/call-metrics', methods=['POST'])
 @require_api_key
 def log_call_metrics():
     """Log call metrics from HappyRobot platform"""
     try:
-        # Print raw request data for debugging
-        print("Content-Type:", request.headers.get('Content-Type'))
-        print("Raw Data:", request.get_data(as_text=True))
-        
         if not request.is_json:
+            ROWS_REJECTED.inc('single', 'content_type')
             return jsonify({
                 'status': 'error',
                 'message': 'Content-Type must be application/json'
@@ -382,54 +746,344 @@ def log_call_metrics():
 
         data = request.get_json()
         if data is None:
+            ROWS_REJECTED.inc('single', 'invalid_json')
             return jsonify({
                 'status': 'error',
                 'message': 'Invalid JSON data'
             }), 400
 
-        # Create new row for call metrics
-        new_row = {
-            'timestamp': datetime.now().isoformat(),
-            'mc_number': str(data.get('mc_number', '')),  # Convert to string
-            'carrier_name': str(data.get('carrier_name', '')),
-            'call_duration': int(data.get('call_duration', 0)),
-            'load_id': str(data.get('load_id', '')),
-            'outcome': str(data.get('outcome', '')),
-            'sentiment': str(data.get('sentiment', '')),
-            'negotiation_rounds': int(data.get('negotiation_rounds', 0)),
-            'initial_rate': float(data.get('initial_rate', 0)),
-            'final_rate': float(data.get('final_rate', 0)),
-            'rate_difference': float(data.get('rate_difference', 0)),
-            'load_accepted': bool(data.get('load_accepted', False))
-        }
+        # A sampled, redacted copy of the payload replaces the old raw-body prints
+        if sample_body() and route_enabled('/call-metrics', logging.INFO):
+            log_event(log, logging.INFO, 'call_metrics.received',
+                      content_type=request.headers.get('Content-Type'), body=body_for_log(data))
+
+        # Create new row for call metrics; a bad value is the client's error, not ours
+        try:
+            new_row = build_call_metric_row(data)
+            if not new_row['call_id']:
+                try:
+                    new_row['call_id'] = call_id(request.headers.get('Idempotency-Key'))
+                except ValueError as e:
+                    raise ValueError(f'Idempotency-Key: {e}') from e
+        except ValueError as e:
+            ROWS_REJECTED.inc('single', 'invalid')
+            return jsonify({'status': 'error', 'message': str(e)}), 400
+
+        # A retried webhook: acknowledge it again without a second row
+        if not call_ids.claim([new_row['call_id']])[0]:
+            CALL_METRICS_DUPLICATES.inc('single')
+            return jsonify({'status': 'success', 'message': 'Duplicate call ignored', 'duplicate': True})
+        
+        if ASYNC_INGEST:
+            # Validated; the background writer commits it
+            if not ingest_queue.submit(new_row):
+                call_ids.release([new_row['call_id']])
+                ROWS_REJECTED.inc('single', 'queue_full')
+                return queue_full_response()
+            ROWS_INGESTED.inc('single')
+            return jsonify({
+                'status': 'accepted',
+                'message': 'Call metrics queued',
+                'queue_depth': ingest_queue.depth
+            }), 202
         
-        # Append to CSV
-        csv_path = os.path.join(os.path.dirname(__file__), 'call_metrics.csv')
-        df = pd.read_csv(csv_path)
-        df = pd.concat([df, pd.DataFrame([new_row])], ignore_index=True)
-        df.to_csv(csv_path, index=False)
+        # Append to storage
+        try:
+            storage.append_call_metrics(new_row)
+        except Exception:
+            call_ids.release([new_row['call_id']])
+            raise
+        ROWS_INGESTED.inc('single')
+        call_metrics_written()
         
         return jsonify({'status': 'success', 'message': 'Call metrics logged successfully'})
     
     except Exception as e:
+        ROWS_REJECTED.inc('single', 'error')
+        log_event(log, logging.ERROR, 'call_metrics.failed', error=str(e),
+                  content_type=request.headers.get('Content-Type'),
+                  body=body_for_log(request.get_json(silent=True), request.get_data(as_text=True)))
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
+@app.route('/call-metrics/batch', methods=['POST'])
+@require_api_key
+def log_call_metrics_batch():
+    """Log many calls at once from a JSON array or NDJSON body"""
+    content_type = request.mimetype
+    if content_type not in ('application/json', 'application/x-ndjson'):
+        return jsonify({
+            'status': 'error',
+            'message': 'Content-Type must be application/json or application/x-ndjson'
+        }), 400
+
+    try:
+        items, errors = parse_batch_body(request.get_data(as_text=True), content_type)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    if len(items) > MAX_BATCH_ROWS:
+        ROWS_REJECTED.inc('batch', 'too_large', amount=len(items))
+        return jsonify({
+            'status': 'error',
+            'message': f'Batch too large: {len(items)} rows (max {MAX_BATCH_ROWS})'
+        }), 413
+
+    if sample_body() and route_enabled('/call-metrics/batch', logging.INFO):
+        log_event(log, logging.INFO, 'call_metrics.batch_received', content_type=content_type,
+                  items=len(items), body=body_for_log(items[:BATCH_BODY_LOG_ITEMS]))
+
+    rows, errors = coerce_call_metrics_batch(items, errors)
+    if errors:
+        ROWS_REJECTED.inc('batch', 'invalid', amount=len(errors))
+
+    # Rows whose call_id is already stored (or repeated within the batch) are acknowledged, not written
+    fresh = call_ids.claim([row['call_id'] for row in rows])
+    duplicates = fresh.count(False)
+    if duplicates:
+        CALL_METRICS_DUPLICATES.inc('batch', amount=duplicates)
+        rows = [row for row, new in zip(rows, fresh) if new]
+
+    if ASYNC_INGEST and rows:
+        if not ingest_queue.submit(rows):
+            call_ids.release([row['call_id'] for row in rows])
+            ROWS_REJECTED.inc('batch', 'queue_full', amount=len(rows))
+            return queue_full_response()
+        ROWS_INGESTED.inc('batch', amount=len(rows))
+        return jsonify({
+            'status': 'accepted',
+            'accepted': len(rows),
+            'duplicates': duplicates,
+            'rejected': len(errors),
+            'errors': [{'index': i, 'message': message} for i, message in sorted(errors.items())],
+            'queue_depth': ingest_queue.depth
+        }), 202
+
+    # Every valid row goes to storage in a single write
+    try:
+        accepted = storage.append_call_metrics(rows) if rows else 0
+    except Exception as e:
+        call_ids.release([row['call_id'] for row in rows])
+        ROWS_REJECTED.inc('batch', 'error', amount=len(rows))
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+    if accepted:
+        ROWS_INGESTED.inc('batch', amount=accepted)
+        call_metrics_written()
+
+    status = 'success' if not errors else ('partial' if accepted or duplicates else 'error')
+    return jsonify({
+        'status': status,
+        'accepted': accepted,
+        'duplicates': duplicates,
+        'rejected': len(errors),
+        'errors': [{'index': i, 'message': message} for i, message in sorted(errors.items())]
+    }), 200 if accepted or duplicates or not items else 400
+
+def queue_full_response():
+    """503 with a retry hint when the ingestion queue has no room"""
+    response = jsonify({
+        'status': 'error',
+        'message': 'Ingestion queue is full, retry later',
+        'queue_depth': ingest_queue.depth
+    })
+    response.headers['Retry-After'] = str(QUEUE_FULL_RETRY_AFTER)
+    return response, 503
+
+@app.route('/call-metrics/queue', methods=['GET'])
+@require_api_key
+def call_metrics_queue():
+    """Depth and counters of the asynchronous ingestion queue"""
+    return jsonify({
+        'enabled': ASYNC_INGEST,
+        'depth': ingest_queue.depth,
+        'capacity': ingest_queue.max_rows,
+        'committed': ingest_queue.committed,
+        'dropped': ingest_queue.dropped
+    })
+
+def call_metrics_time_range(args):
+    """ISO bounds [since, until) from the since/until params; a date-only until covers that day"""
+    since = parse_time_bound(args['since']) if args.get('since') else None
+    until = parse_time_bound(args['until'], end=True) if args.get('until') else None
+    return since, until
+
+def call_metrics_query(args):
+    """Parse the filters, cursor and limit shared by the call metrics readers"""
+    load_accepted = args.get('load_accepted')
+    filters = {
+        'outcome': args.get('outcome') or None,
+        'sentiment': args.get('sentiment') or None,
+        'load_accepted': (load_accepted.lower() == 'true') if load_accepted else None,
+        'mc_number': args.get('mc_number') or None,
+        'call_id': args.get('call_id') or None
+    }
+    filters['since'], filters['until'] = call_metrics_time_range(args)
+    try:
+        cursor = int(args.get('cursor') or 0)
+        limit = int(args['limit']) if args.get('limit') else None
+    except ValueError:
+        raise ValueError('cursor and limit must be integers')
+    if limit is not None and limit < 1:
+        raise ValueError('limit must be positive')
+    storage.check_cursor(cursor)
+    return filters, cursor, limit
+
+def iter_call_metrics(filters, cursor=0, limit=None):
+    """Yield (record, next_cursor) for matching rows, one at a time"""
+    rows = storage.iter_call_metrics(cursor, filters=filters)
+    if limit is None:
+        return rows
+    return itertools.islice(rows, limit)
+
+def head_frames(frames, limit=None):
+    """Stop a stream of DataFrame chunks after limit rows"""
+    if limit is None:
+        yield from frames
+        return
+    for chunk in frames:
+        if len(chunk) >= limit:
+            yield chunk.iloc[:limit]
+            return
+        limit -= len(chunk)
+        yield chunk
+
+def batched(chunks, size=STREAM_BATCH_ROWS):
+    """Join small generator outputs into fewer, larger writes"""
+    batch = []
+    for chunk in chunks:
+        batch.append(chunk)
+        if len(batch) >= size:
+            yield b''.join(batch)
+            batch = []
+    if batch:
+        yield b''.join(batch)
+
+def stream_call_metrics(fmt, rows):
+    """Generator body of a streamed call metrics response"""
+    if fmt == 'csv':
+        yield (','.join(CALL_METRICS_COLUMNS) + '\n').encode('utf-8')
+        yield from batched(serialize_rows([record], CALL_METRICS_COLUMNS) for record, _ in rows)
+    elif fmt == 'ndjson':
+        yield from batched((json.dumps(record) + '\n').encode('utf-8') for record, _ in rows)
+    elif fmt == 'msgpack':
+        yield from batched(msgpack_records(record for record, _ in rows))
+    else:
+        yield b'['
+        yield from batched((b',' if i else b'') + json.dumps(record).encode('utf-8')
+                           for i, (record, _) in enumerate(rows))
+        yield b']'
+
+def call_metrics_format(args):
+    fmt = args.get('format')
+    if fmt:
+        return fmt
+    # Only offer the formats whose optional encoder is installed
+    offered = [mimetype for name, mimetype in STREAM_MIMETYPES.items() if not missing_format_dependency(name)]
+    best = request.accept_mimetypes.best_match(offered, default='application/json')
+    return next(name for name, mimetype in STREAM_MIMETYPES.items() if mimetype == best)
+
 @app.route('/call-metrics', methods=['GET'])
 @require_api_key
+@compressible
 def get_call_metrics():
-    """Get call metrics with optional filtering"""
-    csv_path = os.path.join(os.path.dirname(__file__), 'call_metrics.csv')
-    df = pd.read_csv(csv_path)
-    
-    # Apply filters from query parameters
-    if request.args.get('outcome'):
-        df = df[df['outcome'] == request.args.get('outcome')]
-    if request.args.get('sentiment'):
-        df = df[df['sentiment'] == request.args.get('sentiment')]
-    if request.args.get('load_accepted'):
-        df = df[df['load_accepted'] == (request.args.get('load_accepted').lower() == 'true')]
-    
-    return jsonify(df.to_dict(orient='records'))
+    """Get call metrics with optional filtering, cursor pagination and streamed export"""
+    fmt = call_metrics_format(request.args)
+    if fmt not in STREAM_MIMETYPES:
+        return jsonify({'status': 'error', 'message': f'Unsupported format: {fmt}'}), 400
+    missing = missing_format_dependency(fmt)
+    if missing:
+        return jsonify({'status': 'error', 'message': missing}), 400
+    try:
+        filters, cursor, limit = call_metrics_query(request.args)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+
+    def build():
+        if fmt == 'json' and limit is not None:
+            # One page plus the cursor to resume from
+            page_limit = min(limit, CALL_METRICS_PAGE_MAX)
+            results, next_cursor = [], None
+            for record, row_end in iter_call_metrics(filters, cursor, page_limit):
+                results.append(record)
+                next_cursor = row_end
+            if len(results) < page_limit:
+                next_cursor = None
+            return jsonify({'results': results, 'next_cursor': str(next_cursor) if next_cursor is not None else None})
+
+        if fmt == 'arrow':
+            # Record batches straight from the storage chunks, filtered column-wise
+            frames = storage.iter_call_metrics_frames(cursor, filters=filters)
+            return Response(arrow_stream(head_frames(frames, limit)), mimetype=ARROW_MIMETYPE)
+        rows = iter_call_metrics(filters, cursor, limit)
+        return Response(stream_call_metrics(fmt, rows), mimetype=STREAM_MIMETYPES[fmt])
+
+    response = conditional_response('call-metrics', storage.call_metrics_state(),
+                                    [fmt] + request_variant(request.args), build)
+    response.vary.add('Accept')
+    return response
+
+@app.route('/call-metrics/daily', methods=['GET'])
+@require_api_key
+@compressible
+def get_daily_call_metrics():
+    """Per-day call summaries, optionally between since and until"""
+    try:
+        since, until = call_metrics_time_range(request.args)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    daily = getattr(storage, 'daily_call_metrics', None)
+    if daily is not None:
+        # Partitioned storage: rolled-up days from their rollups, others from their partitions only
+        results = daily(RATE_BIN_WIDTH, since, until)
+    else:
+        summaries = summarize_frames(storage.iter_call_metrics_frames(), RATE_BIN_WIDTH, since, until)
+        results = [daily_report(summaries[day], 'raw') for day in sorted(summaries)]
+    return jsonify({'results': results})
+
+@app.route('/carriers/<mc_number>', methods=['GET'])
+@require_api_key
+def get_carrier_profile(mc_number):
+    """A carrier's call history at a glance: calls, acceptance rate, negotiation and last seen"""
+    def build():
+        profile = carrier_profiles.profile(mc_number)
+        if profile is None:
+            return jsonify({'status': 'error', 'message': f'No calls found for carrier {mc_number}'}), 404
+        return jsonify(profile)
+
+    return conditional_response('call-metrics', storage.call_metrics_state(), ['carrier', mc_number], build)
+
+def sign_export(expires):
+    return hmac.new(API_KEY.encode('utf-8'), f'call-metrics-export:{expires}'.encode('utf-8'), hashlib.sha256).hexdigest()
+
+@app.route('/call-metrics/export-link', methods=['POST'])
+@require_api_key
+def call_metrics_export_link():
+    """Issue a short-lived link the browser can download the CSV export from"""
+    expires = int(time.time()) + EXPORT_LINK_TTL
+    return jsonify({
+        'url': f'/call-metrics/export?expires={expires}&token={sign_export(expires)}',
+        'expires': expires
+    })
+
+@app.route('/call-metrics/export', methods=['GET'])
+@compressible
+def export_call_metrics():
+    """Streamed CSV download authorized by a signed export link"""
+    try:
+        expires = int(request.args.get('expires', ''))
+    except ValueError:
+        abort(401, description='Invalid or expired export link')
+    token = request.args.get('token', '')
+    if expires < time.time() or not hmac.compare_digest(token, sign_export(expires)):
+        abort(401, description='Invalid or expired export link')
+    try:
+        filters, cursor, limit = call_metrics_query(request.args)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    filename = f"call_metrics_{datetime.now().strftime('%Y-%m-%d')}.csv"
+    return Response(
+        stream_call_metrics('csv', iter_call_metrics(filters, cursor, limit)),
+        mimetype=STREAM_MIMETYPES['csv'],
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
 
 @app.route("/transfer-sales", methods=['POST'])
 @require_api_key
@@ -441,25 +1095,75 @@ def transfer_sales():
     # mock transfer
     return jsonify({'status': 'success', 'message': f"Sales transferred successfully: {data.get('message', '')}"})
 
+# The dashboard page is static: render it once, pointing at the hashed Plotly bundle
+plotly_bundle = StaticAsset.from_file(DASHBOARD_PLOTLY_BUNDLE)
+static_assets = {plotly_bundle.name: plotly_bundle}
+with app.app_context():
+    dashboard_page = StaticAsset('dashboard.html', render_template_string(
+        DASHBOARD_HTML, plotly_url=f'/assets/{plotly_bundle.hashed_name}').encode('utf-8'))
+
+def asset_response(asset, cache_control):
+    """A StaticAsset in the client's best encoding, or 304 when its copy is current"""
+    encoding = negotiate_encoding(request.accept_encodings)
+    etag = asset.etag(encoding)
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = Response(asset.body(encoding), mimetype=asset.mimetype)
+        if encoding is not None:
+            response.headers['Content-Encoding'] = encoding
+    response.set_etag(etag)
+    response.vary.add('Accept-Encoding')
+    response.headers['Cache-Control'] = cache_control
+    return response
+
 @app.route('/dashboard')
 def dashboard():
-    """Render the main dashboard"""
-    return render_template_string(DASHBOARD_HTML)
+    """Serve the main dashboard, compiled once at startup"""
+    return asset_response(dashboard_page, f'public, max-age={DASHBOARD_PAGE_MAX_AGE}')
+
+@app.route('/assets/<filename>')
+def static_asset(filename):
+    """Static files under their content-hashed names, cacheable for good"""
+    asset = static_assets.get(unhashed_name(filename))
+    if asset is None:
+        abort(404)
+    if filename != asset.hashed_name:
+        # A page cached from another deploy: send it to this one's copy
+        return redirect(f'/assets/{asset.hashed_name}')
+    return asset_response(asset, IMMUTABLE_CACHE_CONTROL)
 
 @app.route('/dashboard/data')
+@compressible
 def dashboard_data():
-    """Generate dashboard data and charts"""
-    csv_path = os.path.join(os.path.dirname(__file__), 'call_metrics.csv')
-    df = pd.read_csv(csv_path)
+    """Dashboard data and charts, or 304 when no call was logged since the client's copy"""
+    # JSON unless the client prefers MessagePack and it is installed
+    offered = ['application/json'] + ([MSGPACK_MIMETYPE] if not missing_format_dependency('msgpack') else [])
+    fmt = 'msgpack' if request.accept_mimetypes.best_match(offered) == MSGPACK_MIMETYPE else 'json'
+    response = conditional_response('call-metrics', storage.call_metrics_state(), ['dashboard', fmt],
+                                    lambda: build_dashboard_data(fmt))
+    response.vary.add('Accept')
+    return response
+
+def build_dashboard_data(fmt='json'):
+    agg = dashboard_aggregates.snapshot()
+    with OPERATION_SECONDS.time('dashboard_render'):
+        payload = dashboard_payload(agg)
+        if fmt == 'msgpack':
+            return Response(msgpack_body(payload), mimetype=MSGPACK_MIMETYPE)
+        return jsonify(payload)
+
+def dashboard_payload(agg):
+    """Generate dashboard data and charts from an aggregates snapshot"""
     
     # Helper to handle NaN values
     def safe_metric(val, is_int=False, precision=2):
-        if pd.isna(val):
+        if val is None or (isinstance(val, float) and math.isnan(val)):
             return 'N/A'
         return int(val) if is_int else round(val, precision)
 
-    if df.empty:
-        return jsonify({
+    if agg['metrics']['total_calls'] == 0:
+        return {
             'charts': {},
             'metrics': {
                 'total_calls': 0,
@@ -469,25 +1173,19 @@ def dashboard_data():
                 'avg_negotiation_rounds': 0,
                 'loads_accepted': 0
             }
-        })
-
-    # Calculate key metrics
-    total_calls = len(df)
-    successful_calls = len(df[df['outcome'] == 'successful'])
-    success_rate = (successful_calls / total_calls * 100) if total_calls > 0 else 0
-    avg_call_duration = df['call_duration'].mean() if 'call_duration' in df.columns else float('nan')
-    avg_negotiation_rounds = df['negotiation_rounds'].mean() if 'negotiation_rounds' in df.columns else float('nan')
-    loads_accepted = len(df[df['load_accepted'] == True])
+        }
+
+    # Key metrics are maintained incrementally by the aggregate store
+    metrics = agg['metrics']
     
     # Create charts
     charts = {}
     
     # 1. Call Outcomes Pie Chart
-    outcome_counts = df['outcome'].value_counts()
     charts['outcomes'] = {
         'data': [{
-            'values': outcome_counts.values.tolist(),
-            'labels': outcome_counts.index.tolist(),
+            'values': [count for _, count in agg['outcomes']],
+            'labels': [label for label, _ in agg['outcomes']],
             'type': 'pie',
             'name': 'Call Outcomes'
         }],
@@ -498,11 +1196,10 @@ def dashboard_data():
     }
     
     # 2. Sentiment Analysis
-    sentiment_counts = df['sentiment'].value_counts()
     charts['sentiment'] = {
         'data': [{
-            'x': sentiment_counts.index.tolist(),
-            'y': sentiment_counts.values.tolist(),
+            'x': [label for label, _ in agg['sentiments']],
+            'y': [count for _, count in agg['sentiments']],
             'type': 'bar',
             'name': 'Sentiment',
             'marker': {'color': ['#28a745', '#ffc107', '#dc3545']}
@@ -516,13 +1213,10 @@ def dashboard_data():
     }
     
     # 3. Daily Call Volume
-    # Fix timestamp parsing to handle fractional seconds
-    df['date'] = pd.to_datetime(df['timestamp'], errors='coerce', format='%Y-%m-%dT%H:%M:%S.%f').dt.date
-    daily_calls = df.groupby('date').size().reset_index(name='calls')
     charts['daily_volume'] = {
         'data': [{
-            'x': daily_calls['date'].astype(str).tolist(),
-            'y': daily_calls['calls'].tolist(),
+            'x': [day for day, _ in agg['daily']],
+            'y': [calls for _, calls in agg['daily']],
             'type': 'scatter',
             'mode': 'lines+markers',
             'name': 'Daily Calls'
@@ -536,13 +1230,18 @@ def dashboard_data():
     }
     
     # 4. Rate Negotiation Analysis
-    if 'rate_difference' in df.columns and not df['rate_difference'].isna().all():
+    # Counts come binned server-side (at most DASHBOARD_RATE_DISPLAY_BINS bars);
+    # the explicit xbins keep Plotly's bars on the same edges so deltas sum in
+    if agg['rate_histogram'] is not None:
+        centers, counts, width = agg['rate_histogram']
         charts['rate_negotiation'] = {
             'data': [{
-                'x': df['rate_difference'].tolist(),
+                'x': centers,
+                'y': counts,
+                'histfunc': 'sum',
                 'type': 'histogram',
                 'name': 'Rate Differences',
-                'nbinsx': 20
+                'xbins': {'start': centers[0] - width / 2, 'size': width}
             }],
             'layout': {
                 'title': 'Rate Negotiation Distribution',
@@ -553,18 +1252,19 @@ def dashboard_data():
         }
     
     # 5. Call Duration vs Success
+    # Box statistics are precomputed from the duration quantile sketches
+    def duration_trace(accepted, label, name):
+        stats = agg['duration_box'][accepted]
+        trace = {'y': [label], 'type': 'box', 'orientation': 'h', 'name': name}
+        if stats is not None:
+            trace.update({key: [value] for key, value in stats.items()})
+        return trace
+
     charts['duration_success'] = {
-        'data': [{
-            'x': df[df['load_accepted'] == True]['call_duration'].tolist(),
-            'y': ['Accepted'] * len(df[df['load_accepted'] == True]),
-            'type': 'box',
-            'name': 'Accepted Loads'
-        }, {
-            'x': df[df['load_accepted'] == False]['call_duration'].tolist(),
-            'y': ['Rejected'] * len(df[df['load_accepted'] == False]),
-            'type': 'box',
-            'name': 'Rejected Loads'
-        }],
+        'data': [
+            duration_trace(True, 'Accepted', 'Accepted Loads'),
+            duration_trace(False, 'Rejected', 'Rejected Loads')
+        ],
         'layout': {
             'title': 'Call Duration by Load Acceptance',
             'xaxis': {'title': 'Call Duration (seconds)'},
@@ -572,17 +1272,44 @@ def dashboard_data():
         }
     }
     
-    return jsonify({
+    return {
         'charts': charts,
         'metrics': {
-            'total_calls': safe_metric(total_calls, is_int=True),
-            'successful_calls': safe_metric(successful_calls, is_int=True),
-            'success_rate': safe_metric(success_rate),
-            'avg_call_duration': safe_metric(avg_call_duration),
-            'avg_negotiation_rounds': safe_metric(avg_negotiation_rounds),
-            'loads_accepted': safe_metric(loads_accepted, is_int=True)
+            'total_calls': safe_metric(metrics['total_calls'], is_int=True),
+            'successful_calls': safe_metric(metrics['successful_calls'], is_int=True),
+            'success_rate': safe_metric(metrics['success_rate']),
+            'avg_call_duration': safe_metric(metrics['avg_call_duration']),
+            'avg_negotiation_rounds': safe_metric(metrics['avg_negotiation_rounds']),
+            'loads_accepted': safe_metric(metrics['loads_accepted'], is_int=True)
         }
+    }
+
+@app.route('/dashboard/stream')
+def dashboard_stream():
+    """Server-Sent Events: a full snapshot on connect, then a small delta per change"""
+    sub = dashboard_feed.subscribe()
+
+    def events():
+        try:
+            yield from sub.messages()
+        finally:
+            dashboard_feed.unsubscribe(sub)
+
+    return Response(events(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        # Stop reverse proxies from buffering the stream
+        'X-Accel-Buffering': 'no'
     })
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=8080, debug=False)
\ No newline at end of file
+    # Turn SIGTERM into a normal exit so queued call metrics are flushed
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    port = int(os.environ.get('PORT', 8080))
+    if FAST_START:
+        # Bind first so the platform sees the machine as up, then warm caches
+        server = make_server('0.0.0.0', port, app, threaded=True)
+        threading.Thread(target=prewarm, name='prewarm', daemon=True).start()
+        log_event(log, logging.INFO, 'server.started', port=port, fast_start=True)
+        server.serve_forever()
+    else:
+        app.run(host='0.0.0.0', port=port, debug=False)
\ No newline at end of file
@@ -0,0 +1,183 @@
+import math
+import os
+import threading
+from collections import OrderedDict
+
+from telemetry import CARRIER_PROFILE_LOOKUPS, OPERATION_SECONDS
+
+# Rendered profiles kept in the hot set; the index behind it holds every carrier
+CARRIER_PROFILE_CACHE_SIZE = int(os.environ.get('CARRIER_PROFILE_CACHE_SIZE', '1024'))
+
+# Slots of a carrier's entry in the index (a plain list, to stay small per carrier)
+CALLS, ACCEPTED, ROUNDS_SUM, ROUNDS_COUNT, RATE_SUM, RATE_COUNT, FIRST_SEEN, LAST_SEEN, NAME = range(9)
+
+
+def _to_float(value):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return float('nan')
+    return value
+
+
+def _text(value):
+    return '' if value is None or (isinstance(value, float) and math.isnan(value)) else str(value)
+
+
+class CarrierProfiles:
+    """Per-carrier call history aggregates keyed by mc_number.
+
+    Follows the call metrics storage by cursor like DashboardAggregates: the
+    first refresh folds in every row, later ones only the rows appended
+    since. Profiles are rendered from the index on demand and kept in an LRU
+    hot set of CARRIER_PROFILE_CACHE_SIZE carriers; a carrier's cached
+    profile is dropped whenever new calls for it are folded in.
+    """
+
+    def __init__(self, storage, cache_size=CARRIER_PROFILE_CACHE_SIZE):
+        self.storage = storage
+        self.cache_size = cache_size
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._cursor = 0
+        self._generation = None
+        self.index = {}
+        self._hot = OrderedDict()
+
+    def __len__(self):
+        return len(self.index)
+
+    # -- ingest -----------------------------------------------------------
+
+    def refresh(self):
+        """Fold in rows appended since the last refresh; O(new rows)"""
+        with self._lock:
+            generation, end = self.storage.call_metrics_state()
+            if generation != self._generation or end < self._cursor:
+                # Storage was replaced or truncated: start over
+                self._reset()
+                self._generation = generation
+            if end == self._cursor:
+                return
+            if self._cursor == 0:
+                with OPERATION_SECONDS.time('carriers_rebuild'):
+                    for chunk in self.storage.iter_call_metrics_frames(0, end):
+                        self._add_frame(chunk)
+            else:
+                with OPERATION_SECONDS.time('carriers_fold'):
+                    for record, _ in self.storage.iter_call_metrics(self._cursor, end):
+                        self._add_row(record)
+            self._cursor = end
+
+    def _entry(self, mc_number):
+        entry = self.index.get(mc_number)
+        if entry is None:
+            entry = self.index[mc_number] = [0, 0, 0.0, 0, 0.0, 0, '', '', '']
+        self._hot.pop(mc_number, None)
+        return entry
+
+    def _add_row(self, row):
+        mc_number = _text(row.get('mc_number'))
+        if not mc_number:
+            return
+        entry = self._entry(mc_number)
+        entry[CALLS] += 1
+        if str(row.get('load_accepted')) == 'True':
+            entry[ACCEPTED] += 1
+        rounds = _to_float(row.get('negotiation_rounds'))
+        if not math.isnan(rounds):
+            entry[ROUNDS_SUM] += rounds
+            entry[ROUNDS_COUNT] += 1
+        rate_difference = _to_float(row.get('rate_difference'))
+        if not math.isnan(rate_difference):
+            entry[RATE_SUM] += rate_difference
+            entry[RATE_COUNT] += 1
+        timestamp = _text(row.get('timestamp'))
+        if timestamp:
+            if not entry[FIRST_SEEN] or timestamp < entry[FIRST_SEEN]:
+                entry[FIRST_SEEN] = timestamp
+            if timestamp >= entry[LAST_SEEN]:
+                entry[LAST_SEEN] = timestamp
+                entry[NAME] = _text(row.get('carrier_name')) or entry[NAME]
+
+    def _add_frame(self, df):
+        """Vectorized equivalent of _add_row over a whole chunk"""
+        import pandas as pd  # deferred: only needed when rebuilding from storage
+        mc_number = df['mc_number'].astype(object).where(df['mc_number'].notna(), '').astype(str)
+        keep = mc_number != ''
+        if not keep.any():
+            return
+        rounds = pd.to_numeric(df['negotiation_rounds'], errors='coerce')
+        rate_difference = pd.to_numeric(df['rate_difference'], errors='coerce')
+        timestamp = df['timestamp'].astype(object).where(df['timestamp'].notna(), '').astype(str)
+        frame = pd.DataFrame({
+            'mc_number': mc_number,
+            'accepted': df['load_accepted'].astype(str) == 'True',
+            'rounds_sum': rounds.fillna(0),
+            'rounds_count': rounds.notna(),
+            'rate_sum': rate_difference.fillna(0),
+            'rate_count': rate_difference.notna(),
+            'timestamp': timestamp,
+            'name': df['carrier_name'].astype(object).where(df['carrier_name'].notna(), '').astype(str),
+        })[keep]
+        # Stable sort, so the last row of each carrier is its latest call (ties: the later row)
+        frame = frame.sort_values('timestamp', kind='stable')
+        groups = frame.groupby('mc_number', sort=False)
+        sums = groups[['accepted', 'rounds_sum', 'rounds_count', 'rate_sum', 'rate_count']].sum()
+        calls = groups.size()
+        first = frame[frame['timestamp'] != ''].drop_duplicates('mc_number').set_index('mc_number')['timestamp']
+        latest = frame.drop_duplicates('mc_number', keep='last').set_index('mc_number')
+        named = frame[frame['name'] != ''].drop_duplicates('mc_number', keep='last').set_index('mc_number')['name']
+        for mc_number, accepted, rounds_sum, rounds_count, rate_sum, rate_count in sums.itertuples():
+            entry = self._entry(mc_number)
+            entry[CALLS] += int(calls[mc_number])
+            entry[ACCEPTED] += int(accepted)
+            entry[ROUNDS_SUM] += float(rounds_sum)
+            entry[ROUNDS_COUNT] += int(rounds_count)
+            entry[RATE_SUM] += float(rate_sum)
+            entry[RATE_COUNT] += int(rate_count)
+            seen = first.get(mc_number)
+            if seen and (not entry[FIRST_SEEN] or seen < entry[FIRST_SEEN]):
+                entry[FIRST_SEEN] = seen
+            timestamp = latest.at[mc_number, 'timestamp']
+            if timestamp and timestamp >= entry[LAST_SEEN]:
+                entry[LAST_SEEN] = timestamp
+                entry[NAME] = named.get(mc_number, '') or entry[NAME]
+
+    # -- serving ----------------------------------------------------------
+
+    def profile(self, mc_number):
+        """Refresh, then the carrier's profile dict, or None if it never called"""
+        self.refresh()
+        with self._lock:
+            cached = self._hot.get(mc_number)
+            if cached is not None:
+                self._hot.move_to_end(mc_number)
+                CARRIER_PROFILE_LOOKUPS.inc('hit')
+                return cached
+            CARRIER_PROFILE_LOOKUPS.inc('miss')
+            entry = self.index.get(mc_number)
+            if entry is None:
+                return None
+            profile = render_profile(mc_number, entry)
+            self._hot[mc_number] = profile
+            if len(self._hot) > self.cache_size:
+                self._hot.popitem(last=False)
+            return profile
+
+
+def render_profile(mc_number, entry):
+    """What GET /carriers/<mc_number> shows for one index entry"""
+    return {
+        'mc_number': mc_number,
+        'carrier_name': entry[NAME] or None,
+        'calls': entry[CALLS],
+        'loads_accepted': entry[ACCEPTED],
+        'acceptance_rate': round(entry[ACCEPTED] / entry[CALLS] * 100, 2) if entry[CALLS] else None,
+        'avg_negotiation_rounds': round(entry[ROUNDS_SUM] / entry[ROUNDS_COUNT], 2) if entry[ROUNDS_COUNT] else None,
+        'avg_rate_difference': round(entry[RATE_SUM] / entry[RATE_COUNT], 2) if entry[RATE_COUNT] else None,
+        'first_seen': entry[FIRST_SEEN] or None,
+        'last_seen': entry[LAST_SEEN] or None,
+    }
@@ -0,0 +1,29 @@
+import argparse
+from datetime import date
+
+from aggregates import RATE_BIN_WIDTH
+from storage import (CALL_METRICS_RETENTION_DAYS, CALL_METRICS_ROLLUP_AFTER_DAYS, STORAGE_DIR,
+                     PartitionedCsvStorage)
+
+
+def compact(storage, rollup_after_days=CALL_METRICS_ROLLUP_AFTER_DAYS, retention_days=CALL_METRICS_RETENTION_DAYS,
+            today=None):
+    """Roll old call metrics partitions into daily summaries and drop expired ones"""
+    rolled, expired = storage.compact_call_metrics(RATE_BIN_WIDTH, rollup_after_days, retention_days, today)
+    print(f'Rolled up {rolled} days, deleted {expired} expired partitions')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Daily rollup and retention job for partitioned call metrics '
+                                                 '(run from cron, e.g. once a night)')
+    parser.add_argument('--data-dir', default=STORAGE_DIR, help='directory holding the data files')
+    parser.add_argument('--rollup-after-days', type=int, default=CALL_METRICS_ROLLUP_AFTER_DAYS,
+                        help='roll up partitions older than this many days')
+    parser.add_argument('--retention-days', type=int, default=CALL_METRICS_RETENTION_DAYS,
+                        help='delete raw partitions older than this many days (once rolled up)')
+    parser.add_argument('--today', type=date.fromisoformat, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    storage = PartitionedCsvStorage(args.data_dir)
+    compact(storage, args.rollup_after_days, args.retention_days, args.today)
+    storage.close()
@@ -0,0 +1,21 @@
+import hashlib
+
+
+def data_etag(dataset, stamp, variant=()):
+    """Strong ETag value for a representation of a dataset at a storage version stamp.
+
+    A stamp is whatever the backend already uses to notice writes (file
+    mtime/size, a trigger-maintained counter, the call metrics end cursor),
+    so checking it costs a stat or a single query and never touches the
+    data. The ETag is a hash of the stamp and the representation (query
+    parameters, format), which every worker derives identically. No
+    Last-Modified is sent: not every stamp carries a time, and one taken
+    from when a process first saw the stamp would differ across workers.
+    """
+    digest = hashlib.sha1(repr((dataset, stamp, tuple(variant))).encode('utf-8')).hexdigest()
+    return f'{dataset}-{digest[:20]}'
+
+
+def not_modified(request, etag):
+    """True if the request's If-None-Match still matches"""
+    return bool(request.if_none_match) and request.if_none_match.contains(etag)
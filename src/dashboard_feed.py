@@ -0,0 +1,202 @@
+import json
+import logging
+import os
+import queue
+import threading
+
+from structured_logging import get_logger, log_event
+
+# Seconds between checks for rows written by other workers while anyone is watching
+STREAM_POLL_INTERVAL = float(os.environ.get('DASHBOARD_STREAM_POLL_S', '5'))
+# Seconds of silence before a keep-alive comment, which also detects gone viewers
+STREAM_HEARTBEAT = 15
+# Messages a viewer may fall behind before it is dropped (its browser reconnects)
+STREAM_MAX_PENDING = 256
+STREAM_RETRY_MS = 5000
+
+KEEPALIVE = b': keepalive\n\n'
+
+log = get_logger('dashboard_feed')
+
+
+def sse_message(event, data):
+    """One Server-Sent Events message, encoded once and shared by every viewer"""
+    return f'event: {event}\ndata: {json.dumps(data, separators=(",", ":"))}\n\n'.encode('utf-8')
+
+
+class Subscription:
+    def __init__(self, max_pending):
+        self.queue = queue.Queue(max_pending)
+        self.closed = False
+
+    def messages(self, heartbeat=STREAM_HEARTBEAT):
+        """Yield queued messages, a keep-alive when idle; stops once dropped"""
+        while not self.closed:
+            try:
+                yield self.queue.get(timeout=heartbeat)
+            except queue.Empty:
+                yield KEEPALIVE
+
+
+class Broadcaster:
+    """Fans messages out to any number of SSE viewers.
+
+    Publishing is one non-blocking put per viewer; a viewer whose queue is
+    full is dropped rather than allowed to hold up the others.
+    """
+
+    def __init__(self, max_pending=STREAM_MAX_PENDING):
+        self.max_pending = max_pending
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    @property
+    def viewers(self):
+        return len(self._subscribers)
+
+    def subscribe(self, initial=None):
+        """New subscription; initial() is called under the publish lock for its first messages"""
+        sub = Subscription(self.max_pending)
+        with self._lock:
+            for message in (initial() if initial is not None else ()):
+                sub.queue.put_nowait(message)
+            self._subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        sub.closed = True
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def publish(self, message, state_update=None):
+        """Send message to every viewer; state_update() runs under the same lock"""
+        with self._lock:
+            if state_update is not None:
+                state_update()
+            for sub in list(self._subscribers):
+                try:
+                    sub.queue.put_nowait(message)
+                except queue.Full:
+                    sub.closed = True
+                    self._subscribers.discard(sub)
+
+
+def _changed(before, after):
+    """Entries of the after mapping whose value differs from before"""
+    return {key: value for key, value in after.items() if before.get(key) != value}
+
+
+def dashboard_delta(before, after):
+    """Small patch from one aggregates snapshot to the next, or None if a full reload is needed"""
+    if after['metrics']['total_calls'] < before['metrics']['total_calls'] or before['metrics']['total_calls'] == 0:
+        return None
+    delta = {}
+    for key in ('outcomes', 'sentiments', 'daily'):
+        changed = _changed(dict(before[key]), dict(after[key]))
+        if changed:
+            delta[key] = changed
+    # Rate bins are sent as added counts, which Plotly.extendTraces sums into the histogram;
+    # bars that were re-binned (wider, or starting lower) need the full chart again
+    old_bins, new_bins = {}, {}
+    if before['rate_histogram'] and after['rate_histogram']:
+        old_centers, old_counts, old_width = before['rate_histogram']
+        new_centers, new_counts, new_width = after['rate_histogram']
+        if new_width != old_width or new_centers[0] < old_centers[0]:
+            return None
+        old_bins, new_bins = dict(zip(old_centers, old_counts)), dict(zip(new_centers, new_counts))
+    elif after['rate_histogram']:
+        new_bins = dict(zip(*after['rate_histogram'][:2]))
+    added = {center: count - old_bins.get(center, 0) for center, count in new_bins.items()
+             if count != old_bins.get(center, 0)}
+    if any(count < 0 for count in added.values()):
+        return None
+    if added:
+        delta['rate_bins'] = {'x': list(added), 'y': list(added.values())}
+    boxes = {}
+    for flag, name in ((True, 'accepted'), (False, 'rejected')):
+        if before['duration_box'][flag] != after['duration_box'][flag]:
+            boxes[name] = after['duration_box'][flag]
+    if boxes:
+        delta['duration_box'] = boxes
+    return delta
+
+
+class DashboardFeed:
+    """Live dashboard updates computed once and broadcast to every viewer.
+
+    Writers only call notify(), which sets an event when anyone is watching
+    and touches nothing else; a single background thread then refreshes the
+    aggregates, diffs them against what viewers last saw and publishes the
+    difference. While anyone is watching it also polls, so rows written by
+    other workers reach the stream within STREAM_POLL_INTERVAL. New viewers
+    first get a full snapshot taken under the publish lock, so the deltas
+    that follow always apply on top of it.
+    """
+
+    def __init__(self, aggregates, render, broadcaster=None, poll_interval=STREAM_POLL_INTERVAL):
+        self.aggregates = aggregates
+        self.render = render
+        self.broadcaster = broadcaster or Broadcaster()
+        self.poll_interval = poll_interval
+        self._state = None
+        self._wake = threading.Event()
+        self._start_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def _ensure_started(self):
+        # Started lazily (and again after a fork), like the ingest writer
+        with self._start_lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='dashboard-feed', daemon=True)
+                self._thread.start()
+
+    def notify(self):
+        """Signal that call metrics were written; never reads storage, so it is safe on the request path"""
+        if self.broadcaster.viewers:
+            self._wake.set()
+
+    def subscribe(self):
+        self._ensure_started()
+
+        def initial():
+            if self._state is None:
+                self._state = self.aggregates.snapshot()
+            return [f'retry: {STREAM_RETRY_MS}\n\n'.encode('utf-8'),
+                    sse_message('snapshot', self.render(self._state))]
+        return self.broadcaster.subscribe(initial)
+
+    def unsubscribe(self, sub):
+        self.broadcaster.unsubscribe(sub)
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            if not self.broadcaster.viewers:
+                # Nobody to diff for; the next viewer starts from a fresh snapshot
+                self._state = None
+                continue
+            try:
+                self.publish()
+            except Exception as e:
+                log_event(log, logging.ERROR, 'dashboard_feed.update_failed', error=str(e))
+
+    def publish(self):
+        """Broadcast whatever changed since viewers' last update"""
+        after = self.aggregates.snapshot()
+        before = self._state
+        # repr() so NaN averages compare equal
+        if before is not None and repr(after) == repr(before):
+            return
+        delta = dashboard_delta(before, after) if before is not None else None
+        if delta is None:
+            message = sse_message('snapshot', self.render(after))
+        else:
+            delta['metrics'] = self.render(after)['metrics']
+            message = sse_message('delta', delta)
+
+        def update():
+            self._state = after
+        self.broadcaster.publish(message, update)
@@ -0,0 +1,151 @@
+import csv
+import math
+import os
+import re
+import threading
+
+import numpy as np
+
+# Bundled offline table of US cities: city,state,lat,lon. Rows are ordered by
+# size, so a bare city name resolves to the largest city of that name
+CITIES_CSV = os.path.join(os.path.dirname(__file__), 'us_cities.csv')
+
+EARTH_RADIUS_MI = 3958.8
+MILES_PER_DEGREE_LAT = 69.0
+# Grid cell edge in degrees (~69 mi north-south)
+GRID_CELL_DEG = float(os.environ.get('LOADS_GRID_CELL_DEG', '1.0'))
+
+_COORDINATES = re.compile(r'^\s*(-?\d+(?:\.\d+)?)\s*,\s*(-?\d+(?:\.\d+)?)\s*$')
+
+_gazetteer = None
+_gazetteer_lock = threading.Lock()
+
+
+def normalize_place(value):
+    """Lowercase 'City, ST' with a single spelling of 'Saint'/'St'"""
+    value = ' '.join(str(value).replace(',', ' , ').split()).lower()
+    value = re.sub(r'\bsaint\b|\bst\b\.?', 'st.', value)
+    return value.replace(' , ', ', ')
+
+
+def gazetteer():
+    """{'city, st': (lat, lon)} plus {'city': (lat, lon)} for bare names"""
+    global _gazetteer
+    if _gazetteer is None:
+        with _gazetteer_lock:
+            if _gazetteer is None:
+                places = {}
+                with open(CITIES_CSV, newline='') as f:
+                    for row in csv.DictReader(f):
+                        point = (float(row['lat']), float(row['lon']))
+                        places[normalize_place(f"{row['city']}, {row['state']}")] = point
+                        places.setdefault(normalize_place(row['city']), point)
+                _gazetteer = places
+    return _gazetteer
+
+
+def geocode(value):
+    """(lat, lon) for 'City, ST', a bare city name or 'lat,lon'; None if unknown"""
+    match = _COORDINATES.match(str(value))
+    if match:
+        lat, lon = float(match.group(1)), float(match.group(2))
+        if -90 <= lat <= 90 and -180 <= lon <= 180:
+            return lat, lon
+        return None
+    place = normalize_place(value)
+    point = gazetteer().get(place)
+    if point is None and ',' not in place:
+        # 'Dallas TX': treat a trailing two-letter word as the state
+        city, _, state = place.rpartition(' ')
+        if city and len(state) == 2:
+            point = gazetteer().get(f'{city}, {state}')
+    return point
+
+
+def geocode_column(values):
+    """Latitude and longitude arrays for a column of places, as geocode() reads them (NaN when unknown)"""
+    lats = np.full(len(values), np.nan)
+    lons = np.full(len(values), np.nan)
+    # Load boards repeat a handful of lanes, so resolve each distinct name once,
+    # the same way a radius query's point is resolved
+    unique, inverse = np.unique(np.asarray(values, dtype=str), return_inverse=True)
+    for i, name in enumerate(unique):
+        point = geocode(name)
+        if point is not None:
+            hits = inverse == i
+            lats[hits], lons[hits] = point
+    return lats, lons
+
+
+def haversine_miles(lat, lon, lats, lons):
+    """Great-circle miles from one point to arrays of points"""
+    lat, lon = math.radians(lat), math.radians(lon)
+    lats, lons = np.radians(lats), np.radians(lons)
+    a = np.sin((lats - lat) / 2) ** 2 + math.cos(lat) * np.cos(lats) * np.sin((lons - lon) / 2) ** 2
+    return 2 * EARTH_RADIUS_MI * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class GridIndex:
+    """Fixed lat/lon grid over row coordinates for radius lookups.
+
+    A radius query only visits the cells overlapping the circle's bounding
+    box and computes exact distances for the rows in them, instead of
+    measuring every load on the board.
+    """
+
+    def __init__(self, lats, lons, cell_deg=GRID_CELL_DEG):
+        self.lats = lats
+        self.lons = lons
+        self.cell_deg = cell_deg
+        ids = np.flatnonzero(~np.isnan(lats))
+        rows = np.floor(lats[ids] / cell_deg).astype(np.int64)
+        cols = np.floor(lons[ids] / cell_deg).astype(np.int64)
+        order = np.lexsort((cols, rows))
+        ids, rows, cols = ids[order], rows[order], cols[order]
+        starts = np.flatnonzero(np.r_[True, (rows[1:] != rows[:-1]) | (cols[1:] != cols[:-1])])
+        self.cells = {
+            (int(rows[s]), int(cols[s])): chunk
+            for s, chunk in zip(starts, np.split(ids, starts[1:]))
+        }
+
+    def extended(self, lats, lons, ids):
+        """Copy over longer coordinate arrays with the new rows ids (all above the indexed ones) added"""
+        index = GridIndex.__new__(GridIndex)
+        index.lats, index.lons, index.cell_deg = lats, lons, self.cell_deg
+        index.cells = dict(self.cells)
+        ids = ids[~np.isnan(lats[ids])]
+        rows = np.floor(lats[ids] / self.cell_deg).astype(np.int64)
+        cols = np.floor(lons[ids] / self.cell_deg).astype(np.int64)
+        for row, col, row_id in zip(rows.tolist(), cols.tolist(), ids):
+            cell = index.cells.get((row, col))
+            index.cells[(row, col)] = np.append(cell, row_id) if cell is not None else np.array([row_id])
+        return index
+
+    def candidates(self, lat, lon, radius_mi):
+        """Row ids in every cell touching the circle's bounding box"""
+        dlat = radius_mi / MILES_PER_DEGREE_LAT
+        # Longitude degrees shrink towards the poles; clamp to avoid blowing up
+        dlon = radius_mi / (MILES_PER_DEGREE_LAT * max(math.cos(math.radians(lat)), 0.01))
+        row_lo, row_hi = math.floor((lat - dlat) / self.cell_deg), math.floor((lat + dlat) / self.cell_deg)
+        col_lo, col_hi = math.floor((lon - dlon) / self.cell_deg), math.floor((lon + dlon) / self.cell_deg)
+        if (row_hi - row_lo + 1) * (col_hi - col_lo + 1) > len(self.cells):
+            # Huge radius: cheaper to walk the occupied cells than the box
+            chunks = [
+                ids for (row, col), ids in self.cells.items()
+                if row_lo <= row <= row_hi and col_lo <= col <= col_hi
+            ]
+        else:
+            chunks = [
+                self.cells[(row, col)]
+                for row in range(row_lo, row_hi + 1)
+                for col in range(col_lo, col_hi + 1)
+                if (row, col) in self.cells
+            ]
+        return np.concatenate(chunks) if chunks else np.empty(0, dtype=np.int64)
+
+    def within(self, lat, lon, radius_mi):
+        """(row ids, miles) of rows within radius_mi of the point"""
+        ids = self.candidates(lat, lon, radius_mi)
+        miles = haversine_miles(lat, lon, self.lats[ids], self.lons[ids])
+        keep = miles <= radius_mi
+        return ids[keep], miles[keep]
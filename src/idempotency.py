@@ -0,0 +1,192 @@
+import hashlib
+import math
+import os
+import threading
+from collections import OrderedDict, deque
+
+import numpy as np
+
+from telemetry import CALL_ID_HISTORY_CHECKS, OPERATION_SECONDS
+
+# Newest call_ids held exactly; webhook retries land well within this window
+CALL_ID_RECENT_SIZE = int(os.environ.get('CALL_ID_RECENT_SIZE', '100000'))
+# call_ids the Bloom filter is sized for, and its false positive rate at that many
+CALL_ID_BLOOM_CAPACITY = int(os.environ.get('CALL_ID_BLOOM_CAPACITY', '2000000'))
+CALL_ID_BLOOM_ERROR = float(os.environ.get('CALL_ID_BLOOM_ERROR', '0.0001'))
+# Longest call_id / Idempotency-Key accepted
+MAX_CALL_ID_LENGTH = 200
+
+
+def call_id(value):
+    """Coerce a payload's call_id: '' when absent; raises ValueError if too long"""
+    if value is None:
+        return ''
+    value = str(value).strip()
+    if len(value) > MAX_CALL_ID_LENGTH:
+        raise ValueError(f'at most {MAX_CALL_ID_LENGTH} characters allowed')
+    return value
+
+
+def _text(value):
+    return '' if value is None or (isinstance(value, float) and math.isnan(value)) else str(value)
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings: no false negatives, about `error` false positives at `capacity` keys"""
+
+    def __init__(self, capacity, error):
+        self.size = max(64, int(-capacity * math.log(error) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = np.zeros((self.size + 7) // 8, dtype=np.uint8)
+
+    def _positions(self, keys):
+        # Double hashing: the two halves of one 128-bit digest per key
+        digests = b''.join(hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest() for key in keys)
+        h1, h2 = np.frombuffer(digests, dtype=np.uint64).reshape(-1, 2).T
+        steps = np.arange(self.hash_count, dtype=np.uint64)
+        return (h1[:, None] + steps * h2[:, None]) % np.uint64(self.size)
+
+    def add(self, keys):
+        if not len(keys):
+            return
+        positions = self._positions(keys).ravel()
+        np.bitwise_or.at(self.bits, positions >> np.uint64(3),
+                         np.left_shift(1, positions & np.uint64(7)).astype(np.uint8))
+
+    def contains(self, keys):
+        """Boolean array: which keys may have been added"""
+        if not len(keys):
+            return np.zeros(0, dtype=bool)
+        positions = self._positions(keys)
+        bits = self.bits[positions >> np.uint64(3)] & np.left_shift(1, positions & np.uint64(7)).astype(np.uint8)
+        return bits.all(axis=1)
+
+
+class CallIdIndex:
+    """Duplicate detection for call metrics by call_id (or the Idempotency-Key header).
+
+    Follows the call metrics storage by cursor like the dashboard aggregates,
+    so it is rebuilt from storage at startup and sees rows other workers
+    write. The newest CALL_ID_RECENT_SIZE call_ids are held exactly in a hash
+    index, and every call_id seen is also added to a Bloom filter, so a new
+    call_id (nearly every call) is cleared in constant time without keeping
+    the whole history in memory. A call_id the filter matches but the recent
+    index does not hold is confirmed against storage; that only happens for
+    retries of old calls and the filter's rare false positives. The check
+    runs outside the index lock, so it never holds up other writes, and
+    call_ids released after a failed write skip it: the filter cannot
+    forget them, but they are known not to be stored.
+    """
+
+    def __init__(self, storage, recent_size=CALL_ID_RECENT_SIZE, capacity=CALL_ID_BLOOM_CAPACITY,
+                 error=CALL_ID_BLOOM_ERROR):
+        self.storage = storage
+        self.recent_size = recent_size
+        self.capacity = capacity
+        self.error = error
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._cursor = 0
+        self._generation = None
+        self.recent = OrderedDict()
+        # call_ids whose write failed; in the Bloom filter but known not to be stored
+        self.released = OrderedDict()
+        self.bloom = BloomFilter(self.capacity, self.error)
+
+    def __len__(self):
+        return len(self.recent)
+
+    # -- ingest -----------------------------------------------------------
+
+    def refresh(self):
+        """Fold in call_ids of rows appended since the last refresh; O(new rows)"""
+        with self._lock:
+            generation, end = self.storage.call_metrics_state()
+            if generation != self._generation or end < self._cursor:
+                # Storage was replaced or truncated: start over
+                self._reset()
+                self._generation = generation
+            if end == self._cursor:
+                return
+            if self._cursor == 0:
+                with OPERATION_SECONDS.time('call_ids_rebuild'):
+                    newest = deque(maxlen=self.recent_size)
+                    for chunk in self.storage.iter_call_metrics_frames(0, end):
+                        if 'call_id' in chunk.columns:
+                            keys = chunk['call_id'].dropna().astype(str)
+                            keys = keys[keys != ''].tolist()
+                            self.bloom.add(keys)
+                            newest.extend(keys)
+                    self.recent = OrderedDict.fromkeys(newest)
+            else:
+                keys = [_text(record.get('call_id')) for record, _ in self.storage.iter_call_metrics(self._cursor, end)]
+                self._add([key for key in keys if key])
+            self._cursor = end
+
+    def _add(self, keys):
+        self.bloom.add(keys)
+        for key in keys:
+            self.released.pop(key, None)
+        # Only the newest keys can stay in the recent index
+        for key in keys[-self.recent_size:]:
+            self.recent[key] = None
+            self.recent.move_to_end(key)
+        while len(self.recent) > self.recent_size:
+            self.recent.popitem(last=False)
+
+    # -- checks -----------------------------------------------------------
+
+    def claim(self, call_ids):
+        """Per call_id, True if it is new (and now reserved for the caller's write) or empty, False for a duplicate.
+
+        A reserved call_id counts as stored right away, so a retry racing the
+        first write is caught too; release() it if the write fails.
+        """
+        self.refresh()
+        with self._lock:
+            candidates = [key for key in dict.fromkeys(call_ids)
+                          if key and key not in self.recent and key not in self.released]
+            maybe = [key for key, hit in zip(candidates, self.bloom.contains(candidates)) if hit]
+            end = self._cursor
+        # Bloom matches outside the recent index: confirmed against storage without the lock
+        stored = self._stored(maybe, end) if maybe else set()
+        with self._lock:
+            fresh, added = [], []
+            for key in call_ids:
+                if not key:
+                    fresh.append(True)
+                    continue
+                # recent is checked again: a racing claim may have reserved the key meanwhile
+                duplicate = key in self.recent or key in stored
+                if not duplicate:
+                    added.append(key)
+                    self.recent[key] = None
+                fresh.append(not duplicate)
+            self._add(added)
+            return fresh
+
+    def _stored(self, keys, end):
+        # One vectorised pass over rows [0, end) for all the keys, stopping once every key is found
+        found = set()
+        with OPERATION_SECONDS.time('call_ids_history_check'):
+            for chunk in self.storage.iter_call_metrics_frames(0, end):
+                if 'call_id' in chunk.columns:
+                    ids = chunk['call_id'].dropna().astype(str)
+                    found.update(ids[ids.isin(keys)])
+                    if len(found) == len(keys):
+                        break
+        for key in keys:
+            CALL_ID_HISTORY_CHECKS.inc('duplicate' if key in found else 'false_positive')
+        return found
+
+    def release(self, call_ids):
+        """Forget reservations whose write failed, so a retry is accepted"""
+        with self._lock:
+            for key in call_ids:
+                if key:
+                    self.recent.pop(key, None)
+                    self.released[key] = None
+            while len(self.released) > self.recent_size:
+                self.released.popitem(last=False)
@@ -0,0 +1,218 @@
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+from idempotency import call_id
+from structured_logging import get_logger, log_event
+
+# (field, type, default) of every call metric taken from a webhook payload,
+# coerced exactly like the original single-call new_row dict
+CALL_METRIC_FIELDS = [
+    ('mc_number', str, ''),
+    ('carrier_name', str, ''),
+    ('call_duration', int, 0),
+    ('load_id', str, ''),
+    ('outcome', str, ''),
+    ('sentiment', str, ''),
+    ('negotiation_rounds', int, 0),
+    ('initial_rate', float, 0),
+    ('final_rate', float, 0),
+    ('rate_difference', float, 0),
+    ('load_accepted', bool, False),
+    # Optional; a retried webhook carries the same one (see idempotency.py)
+    ('call_id', call_id, ''),
+]
+
+MAX_BATCH_ROWS = 10000
+
+# Opt-in asynchronous ingestion: answer 202 and let a background writer commit
+ASYNC_INGEST = os.environ.get('CALL_METRICS_ASYNC', '').lower() in ('1', 'true', 'yes')
+ASYNC_QUEUE_ROWS = int(os.environ.get('CALL_METRICS_QUEUE_ROWS', '50000'))
+ASYNC_BATCH_ROWS = int(os.environ.get('CALL_METRICS_QUEUE_BATCH_ROWS', '1000'))
+ASYNC_FLUSH_INTERVAL = float(os.environ.get('CALL_METRICS_QUEUE_FLUSH_MS', '50')) / 1000
+COMMIT_ATTEMPTS = 3
+
+_STOP = object()
+
+log = get_logger('ingest')
+
+
+def build_call_metric_row(data, timestamp=None):
+    """Row stored for one call; raises ValueError naming the field on a bad value"""
+    row = {'timestamp': timestamp or datetime.now().isoformat()}
+    for field, kind, default in CALL_METRIC_FIELDS:
+        try:
+            row[field] = kind(data.get(field, default))
+        except (TypeError, ValueError, OverflowError) as e:
+            raise ValueError(f'{field}: {e}') from e
+    return row
+
+
+def parse_batch_body(body, content_type):
+    """Split a JSON array or NDJSON body into items; bad NDJSON lines become errors"""
+    if content_type == 'application/x-ndjson':
+        items, errors = [], {}
+        for line in body.splitlines():
+            if not line.strip():
+                continue
+            try:
+                items.append(json.loads(line))
+            except ValueError as e:
+                errors[len(items)] = f'Invalid JSON: {e}'
+                items.append(None)
+        return items, errors
+    items = json.loads(body)
+    if not isinstance(items, list):
+        raise ValueError('Body must be a JSON array of call metrics')
+    return items, {}
+
+
+def _coerce_column(values, kind, field, errors):
+    try:
+        return [kind(v) for v in values]
+    except (TypeError, ValueError, OverflowError):
+        pass
+    # Slow path only for columns that actually hold a bad value
+    out = []
+    for i, v in enumerate(values):
+        try:
+            out.append(kind(v))
+        except (TypeError, ValueError, OverflowError) as e:
+            errors.setdefault(i, f'{field}: {e}')
+            out.append(None)
+    return out
+
+
+def _row_timestamp(item, received):
+    # Replayed backlogs may carry the original call time
+    value = item.get('timestamp')
+    if value in (None, ''):
+        return received
+    return datetime.fromisoformat(str(value)).isoformat()
+
+
+def coerce_call_metrics_batch(items, errors=None):
+    """Coerce a batch column by column; returns (rows, {index: error message})"""
+    errors = dict(errors or {})
+    for i, item in enumerate(items):
+        if i not in errors and not isinstance(item, dict):
+            errors[i] = 'Each call metric must be a JSON object'
+    objects = [item if isinstance(item, dict) else {} for item in items]
+
+    received = datetime.now().isoformat()
+    columns = {'timestamp': _coerce_column(objects, lambda item: _row_timestamp(item, received), 'timestamp', errors)}
+    for field, kind, default in CALL_METRIC_FIELDS:
+        columns[field] = _coerce_column([item.get(field, default) for item in objects], kind, field, errors)
+
+    rows = [
+        {field: values[i] for field, values in columns.items()}
+        for i in range(len(items)) if i not in errors
+    ]
+    return rows, errors
+
+
+class IngestQueue:
+    """Bounded in-process queue drained by a background group-commit writer.
+
+    Requests hand over already-validated rows and return immediately; the
+    writer thread takes everything queued (up to batch_rows) and commits it
+    with a single storage append, then calls on_commit. When the queue is full
+    submit() refuses the rows so the caller can push back instead of blocking
+    the webhook. on_drop is called with the rows of a batch that could not be
+    committed.
+    """
+
+    def __init__(self, storage, on_commit=None, max_rows=ASYNC_QUEUE_ROWS,
+                 batch_rows=ASYNC_BATCH_ROWS, flush_interval=ASYNC_FLUSH_INTERVAL, on_drop=None):
+        self.storage = storage
+        self.on_commit = on_commit
+        self.on_drop = on_drop
+        self.max_rows = max_rows
+        self.batch_rows = batch_rows
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue()
+        self._depth = 0
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self.committed = 0
+        self.dropped = 0
+
+    @property
+    def depth(self):
+        """Rows accepted but not yet committed"""
+        return self._depth
+
+    def _ensure_started(self):
+        # Started lazily (and again after a fork) so each worker has its own writer
+        if self._thread is None or self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='call-metrics-writer', daemon=True)
+            self._thread.start()
+
+    def submit(self, rows):
+        """Queue rows for the writer; returns False if there is no room"""
+        if isinstance(rows, dict):
+            rows = [rows]
+        with self._lock:
+            if self._depth + len(rows) > self.max_rows:
+                return False
+            self._ensure_started()
+            self._depth += len(rows)
+        self._queue.put(rows)
+        return True
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            batch = list(item)
+            stop = False
+            # Group commit: take whatever else is already waiting, up to batch_rows
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_rows:
+                try:
+                    item = self._queue.get(timeout=max(0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.extend(item)
+            self._commit(batch)
+            if stop:
+                return
+
+    def _commit(self, batch):
+        committed = False
+        for attempt in range(COMMIT_ATTEMPTS):
+            try:
+                self.storage.append_call_metrics(batch)
+                committed = True
+                break
+            except Exception as e:
+                log_event(log, logging.WARNING, 'call_metrics.commit_failed',
+                          attempt=attempt + 1, rows=len(batch), error=str(e))
+                time.sleep(0.1 * 2 ** attempt)
+        with self._lock:
+            self._depth -= len(batch)
+        if not committed:
+            self.dropped += len(batch)
+            log_event(log, logging.ERROR, 'call_metrics.dropped', rows=len(batch))
+            if self.on_drop is not None:
+                self.on_drop(batch)
+            return
+        self.committed += len(batch)
+        if self.on_commit is not None:
+            self.on_commit()
+
+    def close(self, timeout=10):
+        """Flush everything queued, then stop the writer"""
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
@@ -0,0 +1,513 @@
+import copy
+import re
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from geo import GridIndex, geocode, geocode_column
+from load_changes import LOADS_WAL_COMPACT_ENTRIES
+from ranking import rate_per_mile, score, top_k
+from telemetry import OPERATION_SECONDS
+
+# Columns served from sorted indexes, queried as <col>_min/<col>_max
+NUMERIC_RANGE_COLUMNS = ['loadboard_rate', 'miles', 'weight']
+# Datetime columns, queried as <prefix>_after/<prefix>_before
+DATETIME_RANGE_COLUMNS = {'pickup': 'pickup_datetime', 'delivery': 'delivery_datetime'}
+# Categorical columns matched exactly (case-insensitive) through a hash index
+EXACT_COLUMNS = ['equipment_type']
+# Radius search params -> place column, queried with radius_mi around a city or lat,lon
+NEAR_COLUMNS = {'origin_near': 'origin', 'dest_near': 'destination'}
+DEFAULT_RADIUS_MI = 100.0
+MAX_RADIUS_MI = 3000.0
+
+_RELATIVE_TIME = re.compile(r'^now(?:\s*([+-])\s*(\d+(?:\.\d+)?)\s*([hd]))?$', re.IGNORECASE)
+
+
+def parse_datetime(value):
+    """ISO datetime, or a time relative to now such as 'now+48h' / 'now-2d'"""
+    value = str(value).strip()
+    if value.lower().startswith('now'):
+        # An unencoded '+' in a query string arrives as a space
+        value = value.replace(' ', '+')
+    match = _RELATIVE_TIME.match(value)
+    if match:
+        moment = datetime.now()
+        if match.group(1):
+            amount = float(match.group(2))
+            delta = timedelta(hours=amount) if match.group(3).lower() == 'h' else timedelta(days=amount)
+            moment = moment + delta if match.group(1) == '+' else moment - delta
+        return np.datetime64(moment, 'ns').astype(np.int64)
+    try:
+        return np.datetime64(datetime.fromisoformat(value), 'ns').astype(np.int64)
+    except ValueError:
+        raise ValueError(f"Invalid datetime '{value}', expected ISO format or now+<n>h/now+<n>d")
+
+
+def parse_number(value):
+    try:
+        return float(value)
+    except ValueError:
+        raise ValueError(f"Invalid number '{value}'")
+
+
+def _missing(values):
+    # values: float64 with NaN, or int64 nanoseconds with NaT, for missing entries
+    return np.isnat(values.view('datetime64[ns]')) if values.dtype == np.int64 else np.isnan(values)
+
+
+def _lowered(series):
+    # Missing values read 'nan' (pandas 3 keeps them NaN through astype(str))
+    return series.astype(str).fillna('nan').str.lower().to_numpy()
+
+
+def _lowered_rows(series):
+    """_lowered for a handful of rows, without the per-call cost of the string accessor"""
+    return [str(value).lower() for value in series.to_numpy(dtype=object)]
+
+
+def _typed(series, col):
+    """Float values, or int64 nanoseconds for datetime columns (NaN/NaT when unparseable)"""
+    import pandas as pd
+    if col in NUMERIC_RANGE_COLUMNS:
+        return pd.to_numeric(series, errors='coerce').to_numpy(dtype=float)
+    values = pd.to_datetime(series, errors='coerce', format='ISO8601').to_numpy(dtype='datetime64[ns]')
+    return values.view(np.int64)
+
+
+def _conformed(rows, df):
+    """New rows with all-missing columns given df's dtypes (float for int columns), so concat keeps them"""
+    for col, kind in rows.dtypes.items():
+        if kind == object and rows[col].isna().all():
+            kind = df[col].dtype
+            rows[col] = rows[col].astype(float if kind.kind in 'iub' else kind)
+    return rows
+
+
+class _Appendable:
+    """Object column grown in place for successive snapshots.
+
+    Each snapshot holds a read-only view of its own length, so appending
+    past the end never changes what an older snapshot sees, and the buffer
+    doubles when full so an append costs only the new values.
+    """
+
+    def __init__(self, values):
+        self._data = values
+        self._length = len(values)
+
+    def view(self):
+        values = self._data[:self._length]
+        values.flags.writeable = False
+        return values
+
+    def extended(self, length, values):
+        """Buffer holding its first length values followed by values"""
+        buffer = self
+        if length != self._length:
+            # Another snapshot of ours already appended: branch off a copy
+            buffer = _Appendable(self._data[:length].copy())
+        end = length + len(values)
+        if end > len(buffer._data):
+            data = np.empty(max(end, 2 * len(buffer._data)), dtype=object)
+            data[:length] = buffer._data[:length]
+            buffer._data = data
+        buffer._data[length:end] = values
+        buffer._length = end
+        return buffer
+
+
+class SortedIndex:
+    """Row ids ordered by a column's value, for O(log n) range lookups"""
+
+    def __init__(self, values):
+        ids = np.flatnonzero(~_missing(values))
+        row_ids = ids[np.argsort(values[ids], kind='stable')]
+        self._set(row_ids, values[row_ids])
+
+    def _set(self, row_ids, keys):
+        self.row_ids = row_ids
+        self.keys = keys
+        self.row_ids.flags.writeable = False
+        self.keys.flags.writeable = False
+
+    def inserted(self, values, ids):
+        """Copy with new rows ids (all above the indexed ones) added at values (NaN/NaT: left out).
+
+        Each row is placed by binary search after its equal keys, as a stable
+        sort would, and the arrays are copied once per batch.
+        """
+        present = ~_missing(values)
+        values, ids = values[present], ids[present]
+        order = np.lexsort((ids, values))
+        values, ids = values[order], ids[order]
+        positions = np.searchsorted(self.keys, values, side='right')
+        index = SortedIndex.__new__(SortedIndex)
+        index._set(np.insert(self.row_ids, positions, ids), np.insert(self.keys, positions, values))
+        return index
+
+    def range(self, lo=None, hi=None):
+        """Row ids with lo <= value <= hi (either bound optional)"""
+        start = 0 if lo is None else np.searchsorted(self.keys, lo, side='left')
+        end = len(self.keys) if hi is None else np.searchsorted(self.keys, hi, side='right')
+        return self.row_ids[start:end]
+
+
+class LoadBoardSnapshot:
+    """Immutable, pre-processed view of the load board at one data version.
+
+    Logged changes (see load_changes.py) are applied by applied(), which
+    returns a new snapshot: a changed load's old row is hidden through the
+    alive mask and its new version appended, as if it had just been posted.
+    """
+
+    def __init__(self, df, version):
+        import pandas as pd  # deferred: the snapshot is built off the boot path
+
+        self.df = df
+        self.version = version
+        # Changes applied on top of the data read from storage, and an identity
+        # shared with every snapshot applied() derives from this one
+        self.changes_applied = 0
+        self.lineage = object()
+        self.alive = np.ones(len(df), dtype=bool)
+        self.alive.flags.writeable = False
+        # Live row of every load_id (the last one, should the data repeat an id).
+        # Shared with the snapshots applied() derives and kept current for the
+        # newest one, which is the only one changes are applied to.
+        self.ids_by_load = dict(zip(df['load_id'].astype(str), range(len(df)))) if 'load_id' in df.columns else {}
+        # Lowercased string form of every column, built once per reload so
+        # request-time filtering never re-casts the data
+        self._lowered = {col: _Appendable(_lowered(df[col])) for col in df.columns}
+        self.lowered = {col: buffer.view() for col, buffer in self._lowered.items()}
+
+        # Typed columns in row order (float, or int64 nanoseconds), and sorted
+        # indexes over them for range queries
+        self.typed = {}
+        self.range_indexes = {}
+        for col in NUMERIC_RANGE_COLUMNS + list(DATETIME_RANGE_COLUMNS.values()):
+            if col in df.columns:
+                self.typed[col] = _typed(df[col], col)
+        for col, values in self.typed.items():
+            values.flags.writeable = False
+            self.range_indexes[col] = SortedIndex(values)
+        # Precomputed for /loads/top scoring
+        self.rate_per_mile = self._rate_per_mile(np.arange(len(df)))
+        self.rate_per_mile.flags.writeable = False
+
+        # Hash indexes for exact matches: lowercased value -> row ids
+        self.exact_indexes = {}
+        for col in EXACT_COLUMNS:
+            if col in df.columns:
+                self.exact_indexes[col] = dict(pd.Series(np.arange(len(df))).groupby(self.lowered[col]).indices)
+
+        # Grid indexes over geocoded origin/destination for radius searches
+        self.geo_indexes = {}
+        for col in NEAR_COLUMNS.values():
+            if col in df.columns:
+                self.geo_indexes[col] = GridIndex(*geocode_column(df[col].astype(str).to_numpy()))
+
+    def __len__(self):
+        return int(self.alive.sum())
+
+    def _rate_per_mile(self, ids):
+        missing = np.full(len(ids), np.nan)
+        return rate_per_mile(self.typed['loadboard_rate'][ids] if 'loadboard_rate' in self.typed else missing,
+                             self.typed['miles'][ids] if 'miles' in self.typed else missing)
+
+    def live_frame(self):
+        """The board as storage should now hold it"""
+        return self.df[self.alive].reset_index(drop=True)
+
+    def applied(self, changes, version):
+        """New snapshot with logged changes applied, sharing everything they leave alone.
+
+        Only the new rows are parsed and geocoded, and each index takes them
+        in by binary search and one copy of its arrays, never a rebuild. The
+        result answers queries exactly as a snapshot of live_frame() would.
+        """
+        import pandas as pd
+
+        # Replay in log order: the fields each touched load ends up with (None
+        # once deleted), and its last change, which orders the appended rows
+        final, last = {}, {}
+        for seq, change in enumerate(changes):
+            fields = change.get('load') or {}
+            load_id = str(fields.get('load_id', change.get('load_id')))
+            if change.get('op') == 'delete':
+                final[load_id] = None
+            else:
+                current = final[load_id] if load_id in final else self._fields(load_id)
+                final[load_id] = {**(current or dict.fromkeys(self.df.columns)), **fields}
+            last[load_id] = seq
+        removed = [self.ids_by_load[load_id] for load_id in final if load_id in self.ids_by_load]
+        appended = [final[load_id] for load_id in sorted(final, key=last.get) if final[load_id] is not None]
+
+        snap = copy.copy(self)
+        snap.version = version
+        snap.changes_applied = self.changes_applied + len(changes)
+        n = len(self.df)
+        ids = np.arange(n, n + len(appended))
+        rows = _conformed(pd.DataFrame(appended, columns=self.df.columns, index=ids), self.df)
+        snap.df = pd.concat([self.df, rows]) if len(rows) else self.df
+        snap.alive = np.concatenate([self.alive, np.ones(len(ids), dtype=bool)])
+        snap.alive[removed] = False
+        snap.alive.flags.writeable = False
+
+        snap._lowered, snap.lowered = {}, {}
+        for col in snap.df.columns:
+            if snap.df[col].dtype != self.df[col].dtype:
+                # e.g. an int column that now holds a float: every row renders differently
+                snap._lowered[col] = _Appendable(_lowered(snap.df[col]))
+            else:
+                snap._lowered[col] = self._lowered[col].extended(n, _lowered_rows(rows[col]))
+            snap.lowered[col] = snap._lowered[col].view()
+
+        snap.typed, snap.range_indexes = {}, {}
+        for col, values in self.typed.items():
+            added = _typed(rows[col], col)
+            snap.typed[col] = np.concatenate([values, added])
+            snap.typed[col].flags.writeable = False
+            snap.range_indexes[col] = self.range_indexes[col].inserted(added, ids)
+        snap.rate_per_mile = np.concatenate([self.rate_per_mile, snap._rate_per_mile(ids)])
+        snap.rate_per_mile.flags.writeable = False
+
+        snap.exact_indexes = {}
+        for col, groups in self.exact_indexes.items():
+            if snap.df[col].dtype != self.df[col].dtype:
+                groups = pd.Series(np.arange(len(snap.df))).groupby(snap.lowered[col]).indices
+            else:
+                added = {}
+                for key, row in zip(snap.lowered[col][ids], ids.tolist()):
+                    added.setdefault(key, []).append(row)
+                groups = dict(groups)
+                for key, rows_for_key in added.items():
+                    groups[key] = np.append(groups.get(key, np.empty(0, dtype=np.int64)), rows_for_key)
+            snap.exact_indexes[col] = dict(groups)
+
+        snap.geo_indexes = {}
+        for col, index in self.geo_indexes.items():
+            lats, lons = geocode_column(rows[col].astype(str).to_numpy())
+            snap.geo_indexes[col] = index.extended(np.concatenate([index.lats, lats]),
+                                                   np.concatenate([index.lons, lons]), ids)
+
+        # A lookup of its own: readers still holding this snapshot must only see its rows
+        snap.ids_by_load = dict(self.ids_by_load)
+        for load_id in final:
+            snap.ids_by_load.pop(load_id, None)
+        snap.ids_by_load.update(zip(map(str, rows['load_id']), ids.tolist()))
+        return snap
+
+    def _fields(self, load_id):
+        """Current column values of a live load, or None"""
+        row = self.ids_by_load.get(load_id)
+        return None if row is None else self.df.iloc[row].to_dict()
+
+    def typed_conditions(self, params):
+        """Split query params into range bounds, exact matches, radius searches and substring filters"""
+        bounds, exact, near, substring = {}, {}, {}, {}
+        radius = parse_number(params['radius_mi']) if 'radius_mi' in params else DEFAULT_RADIUS_MI
+        if not 0 <= radius <= MAX_RADIUS_MI:
+            raise ValueError(f'radius_mi must be between 0 and {MAX_RADIUS_MI:g}')
+        for key, value in params.items():
+            if key == 'radius_mi':
+                continue
+            if key in NEAR_COLUMNS:
+                point = geocode(value)
+                if point is None:
+                    raise ValueError(f"Unknown location '{value}', expected 'City, ST' or 'lat,lon'")
+                near[NEAR_COLUMNS[key]] = (point, radius)
+                continue
+            if key in self.exact_indexes:
+                exact[key] = str(value).strip().lower()
+                continue
+            col, _, op = key.rpartition('_')
+            if col in NUMERIC_RANGE_COLUMNS and op in ('min', 'max'):
+                lo, hi = bounds.get(col, (None, None))
+                bound = parse_number(value)
+                bounds[col] = (bound, hi) if op == 'min' else (lo, bound)
+            elif col in DATETIME_RANGE_COLUMNS and op in ('after', 'before'):
+                col = DATETIME_RANGE_COLUMNS[col]
+                lo, hi = bounds.get(col, (None, None))
+                bound = parse_datetime(value)
+                bounds[col] = (bound, hi) if op == 'after' else (lo, bound)
+            else:
+                substring[key] = value
+        return bounds, exact, near, substring
+
+    def match(self, params):
+        """Boolean mask of rows matching every condition, plus miles from each radius search point.
+
+        Range, exact and radius conditions come straight from the indexes; the
+        case-insensitive substring match only looks at rows that survived them.
+        Distances are NaN for rows outside the radius. Raises ValueError on a
+        malformed typed parameter.
+        """
+        bounds, exact, near, substring = self.typed_conditions(params)
+        mask = self.alive.copy()
+        distances = {}
+        for col, ((lat, lon), radius) in near.items():
+            if col not in self.geo_indexes:
+                continue
+            ids, miles = self.geo_indexes[col].within(lat, lon, radius)
+            distances[col] = np.full(len(self.df), np.nan)
+            distances[col][ids] = miles
+            hits = np.zeros(len(self.df), dtype=bool)
+            hits[ids] = True
+            mask &= hits
+        for col, (lo, hi) in bounds.items():
+            if col not in self.range_indexes:
+                continue
+            hits = np.zeros(len(self.df), dtype=bool)
+            hits[self.range_indexes[col].range(lo, hi)] = True
+            mask &= hits
+        for col, value in exact.items():
+            hits = np.zeros(len(self.df), dtype=bool)
+            hits[self.exact_indexes[col].get(value, [])] = True
+            mask &= hits
+        for key, value in substring.items():
+            column = self.lowered.get(key)
+            if column is None:
+                continue
+            needle = str(value).lower()
+            idx = np.flatnonzero(mask)
+            hits = np.fromiter((needle in column[i] for i in idx), dtype=bool, count=len(idx))
+            mask[idx[~hits]] = False
+        return mask, distances
+
+    def match_mask(self, params):
+        """Boolean mask of rows matching the query parameters"""
+        return self.match(params)[0]
+
+    def filter(self, params):
+        """Return the rows matching the query parameters.
+
+        Radius searches add deadhead_miles (origin_near) and dest_miles
+        (dest_near) columns and order the rows by deadhead, then destination
+        distance.
+        """
+        mask, distances = self.match(params)
+        if not distances:
+            return self.df[mask]
+        ids = np.flatnonzero(mask)
+        # np.lexsort sorts by the last key first
+        keys = [distances[col][ids] for col in ('destination', 'origin') if col in distances]
+        return self.rows(ids[np.lexsort(keys)], distances)
+
+    def rows(self, ids, distances=None, extra=None):
+        """Rows by id, in the given order, with any radius search distances (and extra) as columns"""
+        rows = self.df.iloc[ids]
+        columns = {
+            name: np.round(distances[col][ids], 1)
+            for name, col in (('deadhead_miles', 'origin'), ('dest_miles', 'destination'))
+            if distances and col in distances
+        }
+        columns.update(extra or {})
+        return rows.assign(**columns) if columns else rows
+
+    def top(self, params, k, weights, equipment=None, as_of=None):
+        """(best k matching rows with their scores, number of matches).
+
+        Only matching rows are scored, in one pass over the typed columns;
+        equipment is the carrier's equipment type and as_of the int64
+        nanosecond time urgency is measured from (default now). Raises
+        ValueError like match().
+        """
+        if as_of is None:
+            as_of = parse_datetime('now')
+        mask, distances = self.match(params)
+        ids = np.flatnonzero(mask)
+        pickup = self.typed.get('pickup_datetime')
+        if pickup is None:
+            pickup = np.full(len(self.df), np.iinfo(np.int64).min)  # NaT
+        matches = np.zeros(len(self.df), dtype=bool)
+        if equipment and 'equipment_type' in self.exact_indexes:
+            matches[self.exact_indexes['equipment_type'].get(str(equipment).strip().lower(), [])] = True
+        total, components = score(self.rate_per_mile[ids], pickup[ids], matches[ids], as_of, weights)
+        best = top_k(total, k)
+        scores = {'score': np.round(total[best], 4)}
+        scores.update((f'{name}_score', np.round(values[best], 4)) for name, values in components.items())
+        return self.rows(ids[best], distances, scores), len(ids)
+
+
+class LoadBoard:
+    """Process-wide holder of the current load board snapshot.
+
+    The board is only re-read when the storage backend reports a new loads
+    version (file mtime/size for CSV and Parquet, a trigger-maintained
+    counter for SQLite); the new snapshot is built off to the side and swapped
+    in with a single reference assignment, so readers always see a complete
+    board. Upserts and deletes go through the change log instead: they are
+    applied on top of the current snapshot, and every LOADS_WAL_COMPACT_ENTRIES
+    changes the board is written back into storage and the log emptied.
+    """
+
+    def __init__(self, storage, changes=None):
+        self.storage = storage
+        # LoadChangeLog, or None for a board that is only ever read
+        self.changes = changes
+        self._snapshot = None
+        self._lock = threading.Lock()
+
+    def version(self):
+        """(storage loads version, change log inode, change log end): changes whenever the board does"""
+        return (self.storage.loads_version(),) + (self.changes.state() if self.changes is not None else (None, 0))
+
+    def snapshot(self):
+        version = self.version()
+        snap = self._snapshot
+        if snap is not None and snap.version == version:
+            return snap
+        with self._lock:
+            snap = self._snapshot
+            if (snap is not None and snap.version[0] == version[0] and snap.version[1] in (None, version[1])
+                    and snap.version[2] < version[2]):
+                # Only new changes were logged (perhaps to a log that did not exist yet): apply them to what we have
+                changes = self.changes.read(snap.version[2], version[2])
+                with OPERATION_SECONDS.time('loads_snapshot_apply'):
+                    snap = snap.applied(changes, version)
+                self._snapshot = snap
+            elif snap is None or snap.version != version:
+                # Version is taken before reading so a write racing with the
+                # read just triggers another reload on the next request
+                df = self.storage.read_loads()
+                changes = self.changes.read(0, version[2]) if version[2] else []
+                with OPERATION_SECONDS.time('loads_snapshot_build'):
+                    snap = LoadBoardSnapshot(df, version)
+                    if changes:
+                        snap = snap.applied(changes, version)
+                self._snapshot = snap
+        return snap
+
+    def upsert(self, loads):
+        """Log and apply validated loads (see load_changes.parse_upserts); (created, updated) counts"""
+        with self.changes.locked():
+            live = self.snapshot().ids_by_load
+            load_ids = {load['load_id'] for load in loads}
+            created = sum(1 for load_id in load_ids if load_id not in live)
+            self.changes.append([{'op': 'upsert', 'load': load} for load in loads])
+            self._written()
+        return created, len(load_ids) - created
+
+    def delete(self, load_ids):
+        """Log and apply deletes; the load_ids that were on the board"""
+        with self.changes.locked():
+            live = self.snapshot().ids_by_load
+            found = [load_id for load_id in dict.fromkeys(load_ids) if load_id in live]
+            if found:
+                self.changes.append([{'op': 'delete', 'load_id': load_id} for load_id in found])
+                self._written()
+        return found
+
+    def _written(self):
+        if self.snapshot().changes_applied >= LOADS_WAL_COMPACT_ENTRIES:
+            self.compact()
+
+    def compact(self):
+        """Write the board, logged changes included, into storage and empty the log; call under changes.locked()"""
+        snap = self.snapshot()
+        if not snap.changes_applied:
+            return
+        with OPERATION_SECONDS.time('loads_compact'):
+            self.storage.write_loads(snap.live_frame())
+            self.changes.reset()
@@ -0,0 +1,147 @@
+import json
+import math
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows dev boxes: fall back to the in-process lock only
+    fcntl = None
+
+from storage import LOADS_COLUMNS, complete_rows_end
+
+# Pending load board changes live next to the loads data until compaction
+LOADS_WAL_FILE = 'loads_wal.ndjson'
+# Changes logged before the board is rewritten into storage and the log emptied
+LOADS_WAL_COMPACT_ENTRIES = int(os.environ.get('LOADS_WAL_COMPACT_ENTRIES', '10000'))
+# Most changes one POST/DELETE /loads request may carry
+MAX_LOAD_CHANGES = 1000
+
+NUMBER_FIELDS = {'loadboard_rate', 'weight', 'num_of_pieces', 'miles'}
+DATETIME_FIELDS = {'pickup_datetime', 'delivery_datetime'}
+
+
+def _load_id(value):
+    if value is None or isinstance(value, (bool, dict, list)) or not str(value).strip():
+        raise ValueError('load_id is required')
+    return str(value).strip()
+
+
+def parse_upserts(payload):
+    """Validated load dicts from a POST /loads body (one load or a list); raises ValueError.
+
+    Only the fields given are changed on an existing load; a new load gets
+    empty values for the rest.
+    """
+    loads = payload if isinstance(payload, list) else [payload]
+    if not loads:
+        raise ValueError('No loads given')
+    if len(loads) > MAX_LOAD_CHANGES:
+        raise ValueError(f'At most {MAX_LOAD_CHANGES} loads per request')
+    parsed = []
+    for i, load in enumerate(loads):
+        where = f'loads[{i}]: ' if isinstance(payload, list) else ''
+        if not isinstance(load, dict):
+            raise ValueError(f'{where}expected a JSON object')
+        unknown = sorted(set(load) - set(LOADS_COLUMNS))
+        if unknown:
+            raise ValueError(f"{where}Unknown field(s): {', '.join(unknown)}")
+        try:
+            fields = {'load_id': _load_id(load.get('load_id'))}
+            for key, value in load.items():
+                if key == 'load_id':
+                    continue
+                if value is None:
+                    fields[key] = None
+                elif key in NUMBER_FIELDS:
+                    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+                        raise ValueError(f'{key} must be a number')
+                    fields[key] = value
+                elif key in DATETIME_FIELDS:
+                    try:
+                        datetime.fromisoformat(str(value))
+                    except ValueError:
+                        raise ValueError(f"{key} must be an ISO datetime, got '{value}'")
+                    fields[key] = str(value)
+                else:
+                    fields[key] = str(value)
+        except ValueError as e:
+            raise ValueError(f'{where}{e}')
+        parsed.append(fields)
+    return parsed
+
+
+def parse_deletes(payload):
+    """load_ids from a DELETE /loads body ({"load_ids": [...]}); raises ValueError"""
+    load_ids = payload.get('load_ids') if isinstance(payload, dict) else None
+    if not isinstance(load_ids, list) or not load_ids:
+        raise ValueError('Expected {"load_ids": [...]}')
+    if len(load_ids) > MAX_LOAD_CHANGES:
+        raise ValueError(f'At most {MAX_LOAD_CHANGES} loads per request')
+    return [_load_id(value) for value in load_ids]
+
+
+class LoadChangeLog:
+    """Write-ahead log of load board upserts and deletes, one JSON object per line.
+
+    Every change is appended and fsynced before it is acknowledged, and each
+    worker replays the lines it has not seen onto its in-memory board, so a
+    change costs one small append instead of rewriting the loads file.
+    Positions are (inode, byte offset) pairs like call metrics cursors; the
+    log is replaced by an empty file (a new inode) once its changes have
+    been written into storage.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def locked(self):
+        """Serialize writers (threads and worker processes) around an append or a compaction"""
+        with self._lock, open(f'{self.path}.lock', 'a') as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            yield
+
+    def state(self):
+        """(inode, end of the last complete line); (None, 0) while there is no log"""
+        return complete_rows_end(self.path)
+
+    def append(self, changes):
+        """Append changes ({'op': 'upsert', 'load': {...}} / {'op': 'delete', 'load_id': ...}); call under locked()"""
+        data = ''.join(json.dumps(change, separators=(',', ':')) + '\n' for change in changes).encode('utf-8')
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            end = self.state()[1]
+            if os.fstat(fd).st_size > end:
+                # A torn line from a crashed writer: end it, read() skips it
+                data = b'\n' + data
+            os.write(fd, data)
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def read(self, start, end):
+        """Changes logged between two byte offsets of the current log"""
+        if end <= start:
+            return []
+        with open(self.path, 'rb') as f:
+            f.seek(start)
+            data = f.read(end - start)
+        changes = []
+        for line in data.splitlines():
+            try:
+                changes.append(json.loads(line))
+            except ValueError:
+                continue  # blank, or torn by a writer that crashed before acknowledging it
+        return changes
+
+    def reset(self):
+        """Start an empty log; call under locked() once its changes are in storage"""
+        tmp = f'{self.path}.tmp'
+        with open(tmp, 'wb') as f:
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
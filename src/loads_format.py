@@ -0,0 +1,81 @@
+import json
+
+import numpy as np
+
+# GET /loads response shapes: the original "col: value" text blob, or JSON records
+LOADS_FORMATS = ('text', 'json')
+
+
+def output_options(args, columns):
+    """(format, fields, offset, limit) from the query string; raises ValueError.
+
+    fields is None (every column) or the requested columns in order; limit
+    is None for no limit.
+    """
+    fmt = (args.get('format') or 'text').strip().lower()
+    if fmt not in LOADS_FORMATS:
+        raise ValueError(f"Unsupported format '{fmt}', expected one of: {', '.join(LOADS_FORMATS)}")
+    fields = None
+    if args.get('fields'):
+        fields = list(dict.fromkeys(f.strip() for f in args['fields'].split(',') if f.strip()))
+        unknown = [f for f in fields if f not in columns]
+        if unknown:
+            raise ValueError(f"Unknown field(s): {', '.join(unknown)}; available: {', '.join(columns)}")
+    try:
+        offset = int(args.get('offset') or 0)
+        limit = int(args['limit']) if args.get('limit') else None
+    except ValueError:
+        raise ValueError('offset and limit must be integers')
+    if offset < 0:
+        raise ValueError('offset must not be negative')
+    if limit is not None and limit < 1:
+        raise ValueError('limit must be positive')
+    return fmt, fields, offset, limit
+
+
+def select(df, fields=None, offset=0, limit=None):
+    """The requested page of rows, projected to fields"""
+    if offset or limit is not None:
+        df = df.iloc[offset:None if limit is None else offset + limit]
+    if fields is not None:
+        df = df[fields]
+    return df
+
+
+def _column_strings(series):
+    """str() of every value in a column, as an object array"""
+    import pandas as pd  # deferred: not needed on the boot path
+
+    if isinstance(series.dtype, pd.StringDtype):
+        # Already strings; missing values print as 'nan', like str(float('nan'))
+        return series.to_numpy(dtype=object, na_value='nan')
+    return series.to_numpy().astype(str).astype(object)
+
+
+def text_results(df):
+    """Rows as "col: value, col: value" lines, identical to formatting each
+    df.iterrows() row, but built a column at a time"""
+    if df.empty:
+        return ''
+    dtypes = set(df.dtypes)
+    if len(dtypes) > 1 and all(dtype.kind in 'biuf' for dtype in dtypes):
+        # iterrows() upcasts all-numeric rows to one dtype (ints print as floats)
+        df = df.astype(np.result_type(*dtypes))
+    lines = None
+    for i, col in enumerate(df.columns):
+        part = (f', {col}: ' if i else f'{col}: ') + _column_strings(df[col])
+        lines = part if lines is None else lines + part
+    return '\n'.join(lines.tolist())
+
+
+def json_records(df):
+    """Rows as a JSON array of objects (NaN as null), encoded in one pass"""
+    if df.empty:
+        return '[]'
+    return df.to_json(orient='records', double_precision=15, date_format='iso')
+
+
+def json_body(envelope, records):
+    """envelope serialized with the pre-encoded records array added as 'results'"""
+    head = json.dumps(envelope)
+    return head[:-1] + (', ' if envelope else '') + '"results": ' + records + '}'
@@ -0,0 +1,151 @@
+import csv
+import io
+import math
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from metrics_writer import CALL_METRICS_CSV
+
+# Column types of a call metrics row; everything else is kept as a string
+CALL_METRICS_TYPES = {
+    'call_duration': int,
+    'negotiation_rounds': int,
+    'initial_rate': float,
+    'final_rate': float,
+    'rate_difference': float,
+    'load_accepted': bool,
+}
+
+
+def _coerce(value, kind):
+    if value == '':
+        return None
+    try:
+        if kind is bool:
+            return value == 'True'
+        if kind is int:
+            return int(float(value))
+        value = float(value)
+        return None if math.isnan(value) else value
+    except ValueError:
+        return value
+
+
+def parse_record(header, values):
+    """Typed dict for one CSV row"""
+    return {
+        col: _coerce(value, CALL_METRICS_TYPES[col]) if col in CALL_METRICS_TYPES else value
+        for col, value in zip(header, values)
+    }
+
+
+def _read_record(f):
+    # A quoted field may contain newlines; keep reading until quotes balance
+    line = f.readline()
+    while line and line.count(b'"') % 2:
+        more = f.readline()
+        if not more:
+            break
+        line += more
+    return line
+
+
+def read_header(path=CALL_METRICS_CSV):
+    with open(path, 'rb') as f:
+        return next(csv.reader([f.readline().decode('utf-8')]), [])
+
+
+def check_cursor(path, cursor):
+    """Raise ValueError unless cursor is a row boundary in the file"""
+    with open(path, 'rb') as f:
+        f.seek(0, 2)
+        size = f.tell()
+        if cursor < 0 or cursor > size:
+            raise ValueError('cursor is out of range')
+        if cursor > 0:
+            f.seek(cursor - 1)
+            if f.read(1) != b'\n':
+                raise ValueError('cursor does not point at a row boundary')
+
+
+def iter_rows(path=CALL_METRICS_CSV, cursor=0):
+    """Yield (raw_line, values, next_cursor) for each data row from cursor on.
+
+    Cursors are byte offsets of row starts, so resuming a scan costs a seek
+    rather than re-reading the rows before it. Only one row is held at a time.
+    """
+    with open(path, 'rb') as f:
+        _read_record(f)  # header
+        if cursor > f.tell():
+            f.seek(cursor)
+        while True:
+            line = _read_record(f)
+            if not line:
+                return
+            if not line.endswith(b'\n'):
+                # Row still being appended
+                return
+            values = next(csv.reader(io.StringIO(line.decode('utf-8'))), None)
+            if values:
+                yield line, values, f.tell()
+
+
+def parse_time_bound(value, end=False):
+    """ISO string bound for comparing timestamps, from a date or datetime.
+
+    A date-only end bound covers that whole day. Raises ValueError.
+    """
+    value = str(value).strip()
+    try:
+        moment = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid date '{value}', expected YYYY-MM-DD or an ISO datetime")
+    if moment.tzinfo is not None:
+        # Stored timestamps are the server's local time
+        moment = moment.astimezone().replace(tzinfo=None)
+    if end and len(value) == 10:
+        moment += timedelta(days=1)
+    return moment.isoformat()
+
+
+def row_filter(outcome=None, sentiment=None, load_accepted=None, mc_number=None, call_id=None,
+               since=None, until=None):
+    """Predicate over typed records matching the GET /call-metrics filters.
+
+    since/until are ISO bounds from parse_time_bound: since inclusive, until exclusive.
+    """
+    def matches(record):
+        if outcome is not None and record.get('outcome') != outcome:
+            return False
+        if sentiment is not None and record.get('sentiment') != sentiment:
+            return False
+        if load_accepted is not None and record.get('load_accepted') != load_accepted:
+            return False
+        if mc_number is not None and record.get('mc_number') != mc_number:
+            return False
+        if call_id is not None and record.get('call_id') != call_id:
+            return False
+        if since is not None and str(record.get('timestamp') or '') < since:
+            return False
+        if until is not None and str(record.get('timestamp') or '') >= until:
+            return False
+        return True
+    return matches
+
+
+def frame_filter(df, outcome=None, sentiment=None, load_accepted=None, mc_number=None, call_id=None,
+                 since=None, until=None):
+    """Boolean mask of the rows of a call metrics chunk that row_filter would match"""
+    mask = np.ones(len(df), dtype=bool)
+    for col, value in (('outcome', outcome), ('sentiment', sentiment), ('load_accepted', load_accepted),
+                       ('mc_number', mc_number), ('call_id', call_id)):
+        if value is not None:
+            mask &= (df[col] == value).to_numpy(dtype=bool) if col in df.columns else False
+    if since is not None or until is not None:
+        timestamps = df['timestamp'].fillna('').astype(str)
+        if since is not None:
+            mask &= (timestamps >= since).to_numpy(dtype=bool)
+        if until is not None:
+            mask &= (timestamps < until).to_numpy(dtype=bool)
+    return mask
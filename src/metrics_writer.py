@@ -0,0 +1,166 @@
+import csv
+import io
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows dev boxes: fall back to the in-process lock only
+    fcntl = None
+
+CALL_METRICS_CSV = os.path.join(os.path.dirname(__file__), 'call_metrics.csv')
+CALL_METRICS_COLUMNS = [
+    'timestamp', 'mc_number', 'carrier_name', 'call_duration',
+    'load_id', 'outcome', 'sentiment', 'negotiation_rounds',
+    'initial_rate', 'final_rate', 'rate_difference', 'load_accepted', 'call_id'
+]
+
+# fsync policy: 'always' (every append), 'batch' (group commit) or 'never' (leave it to the OS)
+FSYNC_MODE = os.environ.get('CALL_METRICS_FSYNC', 'batch')
+FSYNC_ROWS = int(os.environ.get('CALL_METRICS_FSYNC_ROWS', '100'))
+FSYNC_INTERVAL = float(os.environ.get('CALL_METRICS_FSYNC_INTERVAL_MS', '1000')) / 1000
+
+
+def serialize_rows(rows, columns):
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator='\n')
+    for row in rows:
+        writer.writerow([row.get(col, '') for col in columns])
+    return buf.getvalue().encode('utf-8')
+
+
+class CallMetricsWriter:
+    """Append-only CSV row writer shared by every request in the process.
+
+    Each append is a single O_APPEND write under an exclusive flock, so
+    concurrent workers (threads or processes) never interleave or drop rows
+    and the cost does not depend on how large the file already is. fsync is
+    grouped according to the configured policy; in batch mode a timer syncs
+    a leftover tail fsync_interval after the last group commit, so rows are
+    durable within that bound even if no further append arrives.
+    """
+
+    def __init__(self, path=CALL_METRICS_CSV, columns=CALL_METRICS_COLUMNS,
+                 fsync_mode=FSYNC_MODE, fsync_rows=FSYNC_ROWS, fsync_interval=FSYNC_INTERVAL):
+        if fsync_mode not in ('always', 'batch', 'never'):
+            raise ValueError(f'Unknown fsync mode: {fsync_mode}')
+        self.path = path
+        self.columns = list(columns)
+        self.fsync_mode = fsync_mode
+        self.fsync_rows = fsync_rows
+        self.fsync_interval = fsync_interval
+        self._lock = threading.Lock()
+        self._fd = None
+        self._ino = None
+        # Columns of the open file's header: a file written before columns
+        # were added keeps its own, so its rows stay aligned
+        self._file_columns = self.columns
+        self._check_tail = True
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._timer = None
+
+    def _open(self):
+        # Reopen if the file was replaced or removed underneath us
+        try:
+            ino = os.stat(self.path).st_ino
+        except FileNotFoundError:
+            ino = None
+        if self._fd is None or ino != self._ino:
+            if self._fd is not None:
+                os.close(self._fd)
+            self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            self._ino = os.fstat(self._fd).st_ino
+            self._check_tail = True
+            self._file_columns = self._read_columns()
+        return self._fd
+
+    def _read_columns(self):
+        with open(self.path, 'rb') as f:
+            header = f.readline()
+        if not header.endswith(b'\n'):
+            return self.columns
+        return next(csv.reader([header.decode('utf-8')]), None) or self.columns
+
+    def _write_locked(self, fd, rows):
+        """Append rows under the flock; False if the file was replaced while waiting for it"""
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            try:
+                if os.stat(self.path).st_ino != os.fstat(fd).st_ino:
+                    return False
+            except FileNotFoundError:
+                return False
+            data = serialize_rows(rows, self._file_columns)
+            size = os.fstat(fd).st_size
+            if size == 0:
+                data = serialize_rows([dict(zip(self.columns, self.columns))], self.columns) + data
+            elif self._check_tail and not self._ends_with_newline(size):
+                data = b'\n' + data
+            if data:
+                os.write(fd, data)
+            # Every writer terminates its rows, so the tail only needs checking once per open
+            self._check_tail = False
+            return True
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+
+    def _ends_with_newline(self, size):
+        with open(self.path, 'rb') as f:
+            f.seek(size - 1)
+            return f.read(1) == b'\n'
+
+    def ensure_header(self):
+        """Create the file with its header row if it is missing or empty"""
+        with self._lock:
+            while not self._write_locked(self._open(), []):
+                pass
+
+    def append(self, rows):
+        """Append one or more row dicts; returns the number of rows written"""
+        if isinstance(rows, dict):
+            rows = [rows]
+        if not rows:
+            return 0
+        with self._lock:
+            fd = self._open()
+            while not self._write_locked(fd, rows):
+                fd = self._open()
+            self._unsynced += len(rows)
+            self._maybe_sync(fd)
+        return len(rows)
+
+    def _maybe_sync(self, fd):
+        if self.fsync_mode == 'never':
+            return
+        now = time.monotonic()
+        if (self.fsync_mode == 'always' or self._unsynced >= self.fsync_rows
+                or now - self._last_sync >= self.fsync_interval):
+            os.fsync(fd)
+            self._unsynced = 0
+            self._last_sync = now
+        elif self._timer is None or not self._timer.is_alive():
+            # Group commit deadline for the tail; a thread from before a fork is never alive
+            self._timer = threading.Timer(max(0.0, self.fsync_interval - (now - self._last_sync)), self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        """fsync anything written since the last group commit"""
+        with self._lock:
+            if self._fd is not None and self._unsynced:
+                os.fsync(self._fd)
+                self._unsynced = 0
+                self._last_sync = time.monotonic()
+
+    def close(self):
+        if self._timer is not None:
+            self._timer.cancel()
+        self.flush()
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
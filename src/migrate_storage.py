@@ -0,0 +1,32 @@
+import argparse
+
+from storage import BACKENDS, STORAGE_DIR, frame_records, get_storage
+
+
+def migrate(source, target):
+    """Copy the load board and full call history from one backend into another"""
+    loads = source.read_loads()
+    target.write_loads(loads)
+    print(f'Copied {len(loads)} loads')
+
+    target.init_call_metrics()
+    copied = 0
+    for chunk in source.iter_call_metrics_frames():
+        copied += target.append_call_metrics(frame_records(chunk))
+    print(f'Copied {copied} call metrics rows')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='One-shot migration between storage backends')
+    parser.add_argument('target', choices=sorted(BACKENDS), help='backend to migrate into')
+    parser.add_argument('--source', default='csv', choices=sorted(BACKENDS), help='backend to read from (default: csv)')
+    parser.add_argument('--data-dir', default=STORAGE_DIR, help='directory holding the data files')
+    args = parser.parse_args()
+    if args.source == args.target:
+        parser.error('source and target backends must differ')
+
+    source = get_storage(args.source, args.data_dir)
+    target = get_storage(args.target, args.data_dir)
+    migrate(source, target)
+    source.close()
+    target.close()
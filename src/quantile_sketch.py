@@ -0,0 +1,75 @@
+import math
+import os
+from collections import Counter
+
+import numpy as np
+
+# Relative accuracy of the call duration sketches: every quantile read back is
+# within this fraction of a value actually seen
+DURATION_ACCURACY = float(os.environ.get('DASHBOARD_DURATION_ACCURACY', '0.01'))
+
+# Values below MIN_VALUE (zero-length calls) share one bucket
+MIN_VALUE = 1e-3
+ZERO_KEY = -1_000_000
+
+
+# Mergeable quantile sketch with relative-error buckets (the DDSketch scheme):
+# a value v lands in bucket ceil(log_gamma(v)), so a sketch is a plain
+# {bucket: count} Counter. Merging is Counter.update, the number of buckets
+# grows with log(max / min) rather than with the number of calls, and the
+# Counters persist in rollups like any other histogram.
+
+def _log_gamma(accuracy):
+    return math.log((1 + accuracy) / (1 - accuracy))
+
+
+def sketch_key(value, accuracy=DURATION_ACCURACY):
+    """Bucket of one value"""
+    if value < MIN_VALUE:
+        return ZERO_KEY
+    return math.ceil(math.log(value) / _log_gamma(accuracy))
+
+
+def sketch_keys(values, accuracy=DURATION_ACCURACY):
+    """Buckets of an array of (non-NaN) values"""
+    values = np.asarray(values, dtype=float)
+    keys = np.ceil(np.log(np.maximum(values, MIN_VALUE)) / _log_gamma(accuracy)).astype(np.int64)
+    keys[values < MIN_VALUE] = ZERO_KEY
+    return keys
+
+
+def sketch_value(key, accuracy=DURATION_ACCURACY):
+    """Representative value of a bucket (within accuracy of anything in it)"""
+    if key == ZERO_KEY:
+        return 0.0
+    gamma = (1 + accuracy) / (1 - accuracy)
+    return 2 * gamma ** key / (gamma + 1)
+
+
+def sketch_values(sketch, accuracy=DURATION_ACCURACY):
+    """{representative value: count} of a sketch, e.g. for aggregates.box_stats"""
+    return {sketch_value(key, accuracy): count for key, count in sketch.items()}
+
+
+def resketched(sketch, from_accuracy, to_accuracy=DURATION_ACCURACY):
+    """A sketch re-keyed for another accuracy; accuracy 0 means whole-second bins"""
+    if from_accuracy == to_accuracy:
+        return sketch
+    out = Counter()
+    for key, count in sketch.items():
+        value = key if not from_accuracy else sketch_value(key, from_accuracy)
+        out[sketch_key(value, to_accuracy)] += count
+    return out
+
+
+def sketch_quantile(sketch, q, accuracy=DURATION_ACCURACY):
+    """q-quantile (nearest rank) of a sketch, or None if it is empty"""
+    total = sum(sketch.values())
+    if not total:
+        return None
+    rank = q * (total - 1)
+    seen = 0
+    for key in sorted(sketch):
+        seen += sketch[key]
+        if seen > rank:
+            return sketch_value(key, accuracy)
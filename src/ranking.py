@@ -0,0 +1,86 @@
+import os
+
+import numpy as np
+
+# Relevance of a load to a carrier, as a weighted sum of components in [0, 1]:
+#   rate_per_mile - loadboard_rate / miles, min-max scaled over the candidates
+#   urgency       - halves every LOADS_URGENCY_HALF_LIFE_H hours until pickup; 0 once pickup has passed
+#   equipment     - 1 when equipment_type is the carrier's equipment
+RANK_COMPONENTS = ('rate_per_mile', 'urgency', 'equipment')
+# Default weights, e.g. "rate_per_mile=2,urgency=1,equipment=3"; a request can override any with weights=
+LOADS_TOP_WEIGHTS = os.environ.get('LOADS_TOP_WEIGHTS', 'rate_per_mile=1,urgency=1,equipment=1')
+URGENCY_HALF_LIFE_H = float(os.environ.get('LOADS_URGENCY_HALF_LIFE_H', '24'))
+DEFAULT_TOP_K = int(os.environ.get('LOADS_TOP_K', '5'))
+MAX_TOP_K = 100
+
+NS_PER_HOUR = 3600 * 10 ** 9
+
+
+def parse_weights(spec, base=None):
+    """Weights from "name=value" (or "name:value") pairs over base; raises ValueError"""
+    weights = dict(base) if base is not None else dict.fromkeys(RANK_COMPONENTS, 0.0)
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        name, sep, value = item.replace(':', '=').partition('=')
+        name = name.strip()
+        if name not in RANK_COMPONENTS or not sep:
+            raise ValueError(f"Invalid weight '{item}', expected <name>=<number> for: {', '.join(RANK_COMPONENTS)}")
+        try:
+            weights[name] = float(value)
+        except ValueError:
+            raise ValueError(f"Invalid weight '{item}', expected <name>=<number>")
+    return weights
+
+
+DEFAULT_WEIGHTS = parse_weights(LOADS_TOP_WEIGHTS)
+
+
+def _scaled(values):
+    """Min-max scale to [0, 1]; NaN (and a constant column) score 0"""
+    finite = np.isfinite(values)
+    if not finite.any():
+        return np.zeros(len(values))
+    lo, hi = values[finite].min(), values[finite].max()
+    if hi == lo:
+        return np.zeros(len(values))
+    return np.where(finite, (values - lo) / (hi - lo), 0.0)
+
+
+def rate_per_mile(rate, miles):
+    """loadboard_rate / miles, NaN where miles is missing or not positive"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(miles > 0, rate / miles, np.nan)
+
+
+def score(per_mile, pickup_ns, equipment_match, as_of_ns, weights, half_life_h=URGENCY_HALF_LIFE_H):
+    """(total, {component: values}) for parallel arrays of candidate loads.
+
+    pickup_ns is int64 nanoseconds with NaT for unknown pickups.
+    """
+    hours = (pickup_ns - as_of_ns) / NS_PER_HOUR
+    known = ~np.isnat(pickup_ns.view('datetime64[ns]')) & (hours >= 0)
+    components = {
+        'rate_per_mile': _scaled(per_mile),
+        'urgency': np.where(known, np.exp(np.where(known, hours, 0) * (-np.log(2) / half_life_h)), 0.0),
+        'equipment': equipment_match.astype(float),
+    }
+    total = np.zeros(len(per_mile))
+    for name, values in components.items():
+        if weights.get(name):
+            total += weights[name] * values
+    return total, components
+
+
+def top_k(scores, k):
+    """Positions of the k highest scores, best first; equal scores among them keep row order.
+
+    argpartition finds the k best in O(n); only those k are then sorted.
+    """
+    n = len(scores)
+    if k <= 0 or n == 0:
+        return np.empty(0, dtype=np.intp)
+    if k < n:
+        best = np.argpartition(-scores, k - 1)[:k]
+    else:
+        best = np.arange(n)
+    # np.lexsort sorts by the last key first
+    return best[np.lexsort((best, -scores[best]))]
@@ -0,0 +1,229 @@
+import math
+import os
+import threading
+from collections import Counter
+
+import numpy as np
+
+from quantile_sketch import sketch_key, sketch_keys, sketch_quantile
+from telemetry import OPERATION_SECONDS
+
+# Relative accuracy of the final_rate / initial_rate sketches
+RATE_GUIDANCE_ACCURACY = float(os.environ.get('RATE_GUIDANCE_ACCURACY', '0.005'))
+# Priced, accepted calls a lane or equipment type needs before its own rates are used
+RATE_GUIDANCE_MIN_CALLS = int(os.environ.get('RATE_GUIDANCE_MIN_CALLS', '10'))
+# Weight, in calls, of the wider level's acceptance rate when smoothing a narrower one
+RATE_GUIDANCE_PRIOR_CALLS = float(os.environ.get('RATE_GUIDANCE_PRIOR_CALLS', '10'))
+# Quantile of the accepted rates reported as the floor; the target is the median
+RATE_GUIDANCE_FLOOR_QUANTILE = float(os.environ.get('RATE_GUIDANCE_FLOOR_QUANTILE', '0.25'))
+
+LANE_COLUMNS = ('origin', 'destination', 'equipment_type')
+
+# Slots of a stats entry (a plain list): calls, accepted calls, sketch of
+# final_rate / initial_rate over accepted calls and, for a load, its lane
+CALLS, ACCEPTED, RATIOS, LANE = range(4)
+
+
+def _stats():
+    return [0, 0, Counter()]
+
+
+def _add(stats, calls, accepted, ratios, sign=1):
+    stats[CALLS] += sign * calls
+    stats[ACCEPTED] += sign * accepted
+    if sign > 0:
+        stats[RATIOS].update(ratios)
+    else:
+        stats[RATIOS].subtract(ratios)
+        for key in ratios:
+            if stats[RATIOS][key] <= 0:
+                del stats[RATIOS][key]
+
+
+def _text(value):
+    return '' if value is None or (isinstance(value, float) and math.isnan(value)) else str(value)
+
+
+def _ratio(initial, final):
+    try:
+        ratio = float(final) / float(initial)
+    except (TypeError, ValueError, ZeroDivisionError):
+        return None
+    return ratio if math.isfinite(ratio) and ratio > 0 else None
+
+
+class RateGuidance:
+    """Negotiation outcomes by lane and equipment type, for rate guidance mid-call.
+
+    Follows the call metrics storage by cursor like CarrierProfiles, and the
+    load board by snapshot. Every call is counted against its load_id, and
+    each load's totals are also added to its lane (origin, destination,
+    equipment_type) and its equipment type, so a lookup is a few dict reads.
+    Calls for a load that is not on the board count only overall until the
+    load is posted. A load keeps the lane it was last seen on once it is
+    deleted, since booked loads are the history that matters; if it is
+    re-posted on another lane, its totals move with it.
+    """
+
+    def __init__(self, storage, load_board):
+        self.storage = storage
+        self.load_board = load_board
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._cursor = 0
+        self._generation = None
+        self._board = None
+        self.loads = {}
+        self.lanes = {}
+        self.equipment = {}
+        self.overall = _stats()
+
+    # -- ingest -----------------------------------------------------------
+
+    def refresh(self):
+        """Catch up with the load board, then fold in call rows appended since the last refresh"""
+        with self._lock:
+            generation, end = self.storage.call_metrics_state()
+            if generation != self._generation or end < self._cursor:
+                # Storage was replaced or truncated: start over
+                self._reset()
+                self._generation = generation
+            snap = self.load_board.snapshot()
+            if snap is not self._board:
+                self._follow(snap)
+            if end == self._cursor:
+                return
+            if self._cursor == 0:
+                with OPERATION_SECONDS.time('rate_guidance_rebuild'):
+                    for chunk in self.storage.iter_call_metrics_frames(0, end):
+                        self._add_frame(chunk, snap)
+            else:
+                with OPERATION_SECONDS.time('rate_guidance_fold'):
+                    for record, _ in self.storage.iter_call_metrics(self._cursor, end):
+                        self._add_row(record, snap)
+            self._cursor = end
+
+    def _follow(self, snap):
+        """Move the totals of loads whose lane changed on the new board"""
+        old, self._board = self._board, snap
+        if old is not None and old.lineage is snap.lineage and old.changes_applied <= snap.changes_applied:
+            # Same board with changes applied: only the rows appended since are new or changed loads
+            load_ids = snap.df['load_id'].iloc[len(old.df):].astype(str)
+        else:
+            load_ids = list(self.loads)
+        for load_id in load_ids:
+            entry = self.loads.get(load_id)
+            if entry is None:
+                continue
+            _, lane = self._lane(snap, load_id)
+            if lane is not None and lane != entry[LANE]:
+                if entry[LANE] is not None:
+                    for stats in self._tables(entry[LANE]):
+                        _add(stats, entry[CALLS], entry[ACCEPTED], entry[RATIOS], -1)
+                entry[LANE] = lane
+                for stats in self._tables(lane):
+                    _add(stats, entry[CALLS], entry[ACCEPTED], entry[RATIOS])
+
+    def _lane(self, snap, load_id):
+        """(row, (origin, destination, equipment_type) lowercased) of a load on the board, or (None, None)"""
+        row = snap.ids_by_load.get(load_id)
+        if row is None or row >= len(snap.df):
+            # Not on the board (or only on a newer one, which the next refresh follows)
+            return None, None
+        return row, tuple(snap.lowered[col][row] if col in snap.lowered else 'nan' for col in LANE_COLUMNS)
+
+    def _tables(self, lane):
+        return self.lanes.setdefault(lane, _stats()), self.equipment.setdefault(lane[2], _stats())
+
+    def _count(self, load_id, calls, accepted, ratios, snap):
+        _add(self.overall, calls, accepted, ratios)
+        if not load_id:
+            return
+        entry = self.loads.get(load_id)
+        if entry is None:
+            entry = self.loads[load_id] = _stats() + [self._lane(snap, load_id)[1]]
+        _add(entry, calls, accepted, ratios)
+        if entry[LANE] is not None:
+            for stats in self._tables(entry[LANE]):
+                _add(stats, calls, accepted, ratios)
+
+    def _add_row(self, row, snap):
+        accepted = str(row.get('load_accepted')) == 'True'
+        ratio = _ratio(row.get('initial_rate'), row.get('final_rate')) if accepted else None
+        ratios = Counter() if ratio is None else Counter({sketch_key(ratio, RATE_GUIDANCE_ACCURACY): 1})
+        self._count(_text(row.get('load_id')), 1, int(accepted), ratios, snap)
+
+    def _add_frame(self, df, snap):
+        """Vectorized equivalent of _add_row over a whole chunk"""
+        import pandas as pd  # deferred: only needed when rebuilding from storage
+        load_id = df['load_id'].astype(object).where(df['load_id'].notna(), '').astype(str)
+        accepted = df['load_accepted'].astype(str) == 'True'
+        initial = pd.to_numeric(df['initial_rate'], errors='coerce')
+        final = pd.to_numeric(df['final_rate'], errors='coerce')
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = final / initial
+        priced = accepted & np.isfinite(ratio) & (ratio > 0)
+        keys = pd.DataFrame({'load_id': load_id[priced],
+                             'key': sketch_keys(ratio[priced].to_numpy(), RATE_GUIDANCE_ACCURACY)})
+        ratios = {}
+        for (key_load, key), count in keys.value_counts(sort=False).items():
+            ratios.setdefault(key_load, Counter())[int(key)] = int(count)
+        totals = pd.DataFrame({'load_id': load_id, 'accepted': accepted}).groupby('load_id', sort=False)['accepted']
+        for key_load, calls, accepted_calls in totals.agg(['size', 'sum']).itertuples():
+            self._count(key_load, int(calls), int(accepted_calls), ratios.get(key_load, Counter()), snap)
+
+    # -- serving ----------------------------------------------------------
+
+    def guidance(self, load_id):
+        """Refresh, then target, floor and acceptance probability for a load on the board, or None"""
+        self.refresh()
+        with self._lock:
+            snap = self._board
+            # The row is looked up once, in this snapshot, and used for everything below
+            row, lane = self._lane(snap, load_id)
+            if lane is None:
+                return None
+            levels = [('lane', self.lanes.get(lane)), ('equipment', self.equipment.get(lane[2])),
+                      ('all', self.overall)]
+
+            # Acceptance rate of the narrowest level, each level shrunk toward the wider one
+            probability = None
+            for _, stats in reversed(levels):
+                if stats is None or not stats[CALLS]:
+                    continue
+                if probability is None:
+                    probability = stats[ACCEPTED] / stats[CALLS]
+                else:
+                    probability = ((stats[ACCEPTED] + RATE_GUIDANCE_PRIOR_CALLS * probability)
+                                   / (stats[CALLS] + RATE_GUIDANCE_PRIOR_CALLS))
+
+            # Rates from the narrowest level with enough priced calls (overall as a last resort)
+            level, stats = next(((level, stats) for level, stats in levels
+                                 if stats is not None and sum(stats[RATIOS].values()) >= RATE_GUIDANCE_MIN_CALLS),
+                                levels[-1])
+            ratios = stats[RATIOS]
+            rate = float(snap.typed['loadboard_rate'][row]) if 'loadboard_rate' in snap.typed else float('nan')
+            fields = snap.df.iloc[row]
+
+            def priced(q):
+                ratio = sketch_quantile(ratios, q, RATE_GUIDANCE_ACCURACY)
+                return None if ratio is None or math.isnan(rate) else round(rate * ratio, 2)
+
+            return {
+                'load_id': load_id,
+                'origin': _text(fields.get('origin')) or None,
+                'destination': _text(fields.get('destination')) or None,
+                'equipment_type': _text(fields.get('equipment_type')) or None,
+                'loadboard_rate': None if math.isnan(rate) else rate,
+                'target_rate': priced(0.5),
+                'floor_rate': priced(RATE_GUIDANCE_FLOOR_QUANTILE),
+                'acceptance_probability': None if probability is None else round(probability, 3),
+                'basis': {
+                    'level': level,
+                    'calls': stats[CALLS],
+                    'accepted': stats[ACCEPTED],
+                    'priced': sum(ratios.values()),
+                },
+            }
@@ -0,0 +1,198 @@
+import csv
+import json
+import math
+import os
+from collections import Counter
+
+from quantile_sketch import DURATION_ACCURACY, resketched, sketch_keys
+
+# One summary row per day of call metrics. Besides the counts and stats the
+# daily report shows, each row keeps the histograms the dashboard is built
+# from, so it can be folded into DashboardAggregates in place of the raw rows.
+# durations_accepted/_rejected are quantile sketches kept at duration_accuracy
+# (rollups written before the sketches have no such column: whole-second bins).
+# raw_end is the byte offset of the day's raw partition the summary covers, so
+# rows written to the day later are summarized on their own and merged in
+# (empty in rollups written before it: the whole partition at the time).
+ROLLUP_COLUMNS = [
+    'date', 'calls', 'successful_calls', 'loads_accepted', 'outcomes', 'sentiments',
+    'duration_count', 'duration_sum', 'duration_min', 'duration_max',
+    'rounds_count', 'rounds_sum',
+    'rate_difference_count', 'rate_difference_sum', 'rate_difference_min', 'rate_difference_max',
+    'final_rate_count', 'final_rate_sum',
+    'rate_bin_width', 'rate_bins', 'duration_accuracy', 'durations_accepted', 'durations_rejected', 'raw_end',
+]
+# Columns holding {key: count} maps, stored as JSON
+_MAP_COLUMNS = {'outcomes': str, 'sentiments': str, 'rate_bins': int, 'durations_accepted': int,
+                'durations_rejected': int}
+_INT_COLUMNS = {'calls', 'successful_calls', 'loads_accepted', 'duration_count', 'rounds_count',
+                'rate_difference_count', 'final_rate_count'}
+
+
+def empty_summary(day, rate_bin_width):
+    summary = {col: 0 for col in _INT_COLUMNS}
+    summary.update({col: Counter() for col in _MAP_COLUMNS})
+    summary.update(date=day, rate_bin_width=rate_bin_width, duration_accuracy=DURATION_ACCURACY, duration_sum=0.0,
+                   rounds_sum=0.0, rate_difference_sum=0.0, final_rate_sum=0.0, duration_min=None, duration_max=None,
+                   rate_difference_min=None, rate_difference_max=None, raw_end=None)
+    return summary
+
+
+def merge_summary(summary, other):
+    """Fold another summary of the same day into summary, in place"""
+    for col in _INT_COLUMNS:
+        summary[col] += other[col]
+    for name in ('duration', 'rounds', 'rate_difference', 'final_rate'):
+        summary[f'{name}_sum'] += other[f'{name}_sum']
+    for name in ('duration', 'rate_difference'):
+        for bound, pick in (('min', min), ('max', max)):
+            values = [v for v in (summary[f'{name}_{bound}'], other[f'{name}_{bound}']) if v is not None]
+            summary[f'{name}_{bound}'] = pick(values) if values else None
+    summary['outcomes'].update(other['outcomes'])
+    summary['sentiments'].update(other['sentiments'])
+    summary['rate_bins'].update(rebinned(other['rate_bins'], other['rate_bin_width'], summary['rate_bin_width']))
+    for col in ('durations_accepted', 'durations_rejected'):
+        summary[col] = (resketched(summary[col], summary['duration_accuracy'])
+                        + resketched(other[col], other['duration_accuracy']))
+    summary['duration_accuracy'] = DURATION_ACCURACY
+    return summary
+
+
+def _stat(summary, name, values):
+    """Fold a numeric column (NaN dropped) into name_count/_sum/_min/_max"""
+    values = values.dropna()
+    if not len(values):
+        return
+    summary[f'{name}_count'] += int(len(values))
+    summary[f'{name}_sum'] += float(values.sum())
+    if f'{name}_min' in summary:
+        lo, hi = float(values.min()), float(values.max())
+        summary[f'{name}_min'] = lo if summary[f'{name}_min'] is None else min(summary[f'{name}_min'], lo)
+        summary[f'{name}_max'] = hi if summary[f'{name}_max'] is None else max(summary[f'{name}_max'], hi)
+
+
+def _add_frame(summary, df):
+    """Fold a DataFrame of one day's call metrics into summary (same rules as DashboardAggregates)"""
+    import numpy as np
+    import pandas as pd  # deferred: only compaction and reports summarize
+
+    summary['calls'] += len(df)
+    outcomes = df['outcome'].dropna()
+    summary['outcomes'].update(outcomes[outcomes != ''].value_counts().to_dict())
+    summary['successful_calls'] += int((df['outcome'] == 'successful').sum())
+    sentiments = df['sentiment'].dropna()
+    summary['sentiments'].update(sentiments[sentiments != ''].value_counts().to_dict())
+
+    duration = pd.to_numeric(df['call_duration'], errors='coerce')
+    _stat(summary, 'duration', duration)
+    _stat(summary, 'rounds', pd.to_numeric(df['negotiation_rounds'], errors='coerce'))
+    rate_difference = pd.to_numeric(df['rate_difference'], errors='coerce')
+    _stat(summary, 'rate_difference', rate_difference)
+    _stat(summary, 'final_rate', pd.to_numeric(df['final_rate'], errors='coerce'))
+    rate_difference = rate_difference.dropna()
+    bins = np.floor(rate_difference / summary['rate_bin_width']).astype(int)
+    summary['rate_bins'].update(bins.value_counts().to_dict())
+
+    accepted = df['load_accepted'].astype(str)
+    summary['loads_accepted'] += int((accepted == 'True').sum())
+    for flag, name in ((True, 'durations_accepted'), (False, 'durations_rejected')):
+        values = duration[(accepted == str(flag)) & duration.notna()]
+        keys, counts = np.unique(sketch_keys(values.to_numpy(), summary['duration_accuracy']), return_counts=True)
+        summary[name].update(dict(zip(keys.tolist(), counts.tolist())))
+
+
+def summarize_frames(frames, rate_bin_width, since=None, until=None):
+    """{date: summary} over call metrics chunks, grouped by the timestamp's date.
+
+    Rows outside [since, until) (ISO bounds) are skipped.
+    """
+    summaries = {}
+    for df in frames:
+        stamps = df['timestamp'].astype(str)
+        keep = stamps.str.match(r'^\d{4}-\d{2}-\d{2}')
+        if since is not None:
+            keep &= stamps >= since
+        if until is not None:
+            keep &= stamps < until
+        for key, group in df[keep].groupby(stamps[keep].str[:10], sort=False):
+            if key not in summaries:
+                summaries[key] = empty_summary(key, rate_bin_width)
+            _add_frame(summaries[key], group)
+    return summaries
+
+
+def daily_report(summary, source):
+    """What GET /call-metrics/daily shows for one day"""
+    def mean(name):
+        return summary[f'{name}_sum'] / summary[f'{name}_count'] if summary[f'{name}_count'] else None
+    return {
+        'date': summary['date'],
+        'source': source,
+        'calls': summary['calls'],
+        'successful_calls': summary['successful_calls'],
+        'loads_accepted': summary['loads_accepted'],
+        'outcomes': dict(summary['outcomes']),
+        'sentiments': dict(summary['sentiments']),
+        'avg_call_duration': mean('duration'),
+        'min_call_duration': summary['duration_min'],
+        'max_call_duration': summary['duration_max'],
+        'avg_negotiation_rounds': mean('rounds'),
+        'avg_rate_difference': mean('rate_difference'),
+        'min_rate_difference': summary['rate_difference_min'],
+        'max_rate_difference': summary['rate_difference_max'],
+        'avg_final_rate': mean('final_rate'),
+    }
+
+
+def write_rollups(path, summaries):
+    """Replace the rollups file with summaries (ordered by date), atomically"""
+    tmp = f'{path}.tmp'
+    with open(tmp, 'w', newline='') as f:
+        writer = csv.writer(f, lineterminator='\n')
+        writer.writerow(ROLLUP_COLUMNS)
+        for summary in sorted(summaries, key=lambda s: s['date']):
+            writer.writerow([
+                json.dumps({str(k): int(v) for k, v in summary[col].items()}, sort_keys=True) if col in _MAP_COLUMNS
+                else '' if summary[col] is None else summary[col]
+                for col in ROLLUP_COLUMNS
+            ])
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def read_rollups(path):
+    """Summaries from a rollups file, ordered by date; [] if there is none"""
+    try:
+        f = open(path, newline='')
+    except FileNotFoundError:
+        return []
+    summaries = []
+    with f:
+        for row in csv.DictReader(f):
+            summary = {}
+            for col in ROLLUP_COLUMNS:
+                value = row.get(col, '')
+                if col in _MAP_COLUMNS:
+                    kind = _MAP_COLUMNS[col]
+                    summary[col] = Counter({kind(k): v for k, v in json.loads(value or '{}').items()})
+                elif col == 'date':
+                    summary[col] = value
+                elif col == 'raw_end':
+                    summary[col] = int(value) if value else None
+                elif value == '':
+                    summary[col] = None if col.endswith(('_min', '_max')) else 0
+                else:
+                    summary[col] = int(value) if col in _INT_COLUMNS else float(value)
+            summaries.append(summary)
+    return sorted(summaries, key=lambda s: s['date'])
+
+
+def rebinned(rate_bins, from_width, to_width):
+    """Rate difference bins re-keyed for another bin width (by bin center)"""
+    if from_width == to_width:
+        return rate_bins
+    out = Counter()
+    for key, count in rate_bins.items():
+        out[math.floor((key + 0.5) * from_width / to_width)] += count
+    return out
@@ -0,0 +1,62 @@
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+
+from telemetry import OPERATION_SECONDS
+from wire_formats import compress_bytes
+
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets')
+# The <digest> component StaticAsset puts before the extension
+DIGEST_PATTERN = re.compile(r'[0-9a-f]{16}')
+
+# Static bodies only change with a deploy, so they are compressed harder than
+# dynamic responses: once per process and encoding, on first use
+STATIC_GZIP_LEVEL = 9
+STATIC_BROTLI_QUALITY = 9
+
+
+class StaticAsset:
+    """A static body held in memory under a content-hashed name.
+
+    The hashed name (plotly.min.<digest>.js) changes whenever the content
+    does, so it can be cached as immutable, and the digest doubles as a
+    strong ETag. Each encoding's body is compressed once, on first request.
+    """
+
+    def __init__(self, name, data, mimetype=None):
+        self.name = name
+        self.data = data
+        self.digest = hashlib.sha256(data).hexdigest()[:16]
+        root, ext = os.path.splitext(name)
+        self.hashed_name = f'{root}.{self.digest}{ext}'
+        self.mimetype = mimetype or mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        self._bodies = {None: data}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, 'rb') as f:
+            return cls(os.path.basename(path), f.read())
+
+    def etag(self, encoding=None):
+        """Strong ETag of the body in one encoding (None for uncompressed)"""
+        return self.digest if encoding is None else f'{self.digest}-{encoding}'
+
+    def body(self, encoding=None):
+        """The body compressed with encoding, compressing it on first use"""
+        with self._lock:
+            body = self._bodies.get(encoding)
+            if body is None:
+                with OPERATION_SECONDS.time('static_asset_compress'):
+                    body = compress_bytes(self.data, encoding, STATIC_GZIP_LEVEL, STATIC_BROTLI_QUALITY)
+                self._bodies[encoding] = body
+            return body
+
+
+def unhashed_name(hashed_name):
+    """plotly.min.<digest>.js -> plotly.min.js; names without a digest are returned as is"""
+    base, ext = os.path.splitext(hashed_name)
+    root, _, digest = base.rpartition('.')
+    return root + ext if root and DIGEST_PATTERN.fullmatch(digest) else hashed_name
@@ -0,0 +1,868 @@
+import csv
+import io
+import os
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+import numpy as np
+
+from metrics_reader import (CALL_METRICS_TYPES, check_cursor, frame_filter, iter_rows, parse_record, read_header,
+                            row_filter)
+from metrics_writer import CALL_METRICS_COLUMNS, CallMetricsWriter
+from rollups import daily_report, empty_summary, merge_summary, read_rollups, summarize_frames, write_rollups
+
+try:
+    import fcntl
+except ImportError:  # Windows dev boxes: fall back to the in-process lock only
+    fcntl = None
+
+# Which backend the app uses and where it keeps its files
+STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'csv')
+STORAGE_DIR = os.environ.get('STORAGE_DIR', os.path.dirname(__file__))
+
+LOADS_COLUMNS = [
+    'load_id', 'origin', 'destination', 'pickup_datetime', 'delivery_datetime',
+    'equipment_type', 'loadboard_rate', 'notes', 'weight', 'commodity_type',
+    'num_of_pieces', 'miles', 'dimensions'
+]
+FRAME_CHUNK_ROWS = 200000
+
+# Partitioned backend: days a raw call metrics partition waits before it is
+# rolled up into a daily summary, and days it is kept at all
+CALL_METRICS_ROLLUP_AFTER_DAYS = int(os.environ.get('CALL_METRICS_ROLLUP_AFTER_DAYS', '7'))
+CALL_METRICS_RETENTION_DAYS = int(os.environ.get('CALL_METRICS_RETENTION_DAYS', '90'))
+
+# pandas is imported inside the functions that need it: it is the slowest
+# import in the app and nothing on the boot path uses it
+
+
+def file_version(path):
+    """Cheap change detector for a data file: (mtime_ns, size)"""
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size)
+
+
+def normalize_call_metrics_frame(df):
+    """Give a call metrics chunk the same dtypes whatever backend it came from"""
+    import pandas as pd
+    for col in df.columns:
+        kind = CALL_METRICS_TYPES.get(col)
+        if kind is bool:
+            df[col] = df[col].map({True: True, False: False, 1: True, 0: False, 'True': True, 'False': False})
+        elif kind is float:
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype(float)
+        elif kind is None:
+            df[col] = df[col].astype(object).where(df[col].notna(), np.nan)
+    return df
+
+
+def filter_frames(frames, filters):
+    """Only the rows of each chunk matching the GET /call-metrics filters; chunks left empty are skipped"""
+    filters = {key: value for key, value in (filters or {}).items() if value is not None}
+    for chunk in frames:
+        if filters:
+            chunk = chunk[frame_filter(chunk, **filters)]
+        if len(chunk):
+            yield chunk
+
+
+def frame_records(df):
+    """DataFrame rows as dicts with None in place of NaN"""
+    return df.astype(object).where(df.notna(), None).to_dict(orient='records')
+
+
+def write_csv_atomically(df, path):
+    tmp = f'{path}.tmp'
+    df.to_csv(tmp, index=False)
+    os.replace(tmp, path)
+
+
+class _BoundedReader(io.RawIOBase):
+    """File wrapper that stops at a fixed byte offset"""
+
+    def __init__(self, f, limit):
+        self._f = f
+        self._left = limit
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        n = min(len(b), self._left)
+        if n <= 0:
+            return 0
+        data = self._f.read(n)
+        b[:len(data)] = data
+        self._left -= len(data)
+        return len(data)
+
+
+def complete_rows_end(path):
+    """(inode, byte offset just past the last whole row); a row still being written is left out"""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return (None, 0)
+    with open(path, 'rb') as f:
+        block = min(st.st_size, 64 * 1024)
+        f.seek(st.st_size - block)
+        idx = f.read(block).rfind(b'\n')
+    return (st.st_ino, st.st_size - block + idx + 1 if idx >= 0 else 0)
+
+
+def upgrade_call_metrics_csv(path, columns=CALL_METRICS_COLUMNS):
+    """Rewrite a call metrics CSV whose header predates columns added since; True if it was rewritten.
+
+    Columns are only ever added at the end, so older rows are padded with
+    empty values. Runs under the writers' flock; they notice the new file
+    (a new inode, so incremental readers start over) before their next append.
+    """
+    try:
+        f = open(path, 'rb')
+    except FileNotFoundError:
+        return False
+    with f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        header = read_header(path)
+        if not header or header == columns or header != columns[:len(header)]:
+            return False
+        end = complete_rows_end(path)[1]
+        f.readline()
+        text = io.TextIOWrapper(io.BufferedReader(_BoundedReader(f, max(end - f.tell(), 0))),
+                                encoding='utf-8', newline='')
+        padding = [''] * (len(columns) - len(header))
+        tmp = f'{path}.tmp'
+        with open(tmp, 'w', encoding='utf-8', newline='') as out:
+            writer = csv.writer(out, lineterminator='\n')
+            writer.writerow(columns)
+            for row in csv.reader(text):
+                if row:
+                    writer.writerow(row + padding)
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(tmp, path)
+    return True
+
+
+def read_csv_frames(path, cursor, end, chunksize=FRAME_CHUNK_ROWS):
+    """Yield DataFrame chunks of a call metrics CSV's rows from byte cursor up to end"""
+    import pandas as pd
+    header = read_header(path)
+    with open(path, 'rb') as f:
+        f.readline()
+        start = max(cursor, f.tell())
+        if end <= start:
+            return
+        f.seek(start)
+        reader = io.BufferedReader(_BoundedReader(f, end - start))
+        dtype = {col: str for col in header if col not in CALL_METRICS_TYPES}
+        for chunk in pd.read_csv(reader, names=header, header=None, dtype=dtype, chunksize=chunksize):
+            yield normalize_call_metrics_frame(chunk)
+
+
+class CsvStorage:
+    """Flat CSV files next to the app; the original layout.
+
+    Call metrics cursors are byte offsets of row starts in call_metrics.csv.
+    """
+
+    name = 'csv'
+
+    def __init__(self, data_dir=STORAGE_DIR, loads_file='sample_loads.csv', call_metrics_file='call_metrics.csv'):
+        self.loads_path = os.path.join(data_dir, loads_file)
+        self.call_metrics_path = os.path.join(data_dir, call_metrics_file)
+        self.writer = CallMetricsWriter(self.call_metrics_path)
+
+    # -- loads ------------------------------------------------------------
+
+    def loads_version(self):
+        return file_version(self.loads_path)
+
+    def read_loads(self):
+        import pandas as pd
+        return pd.read_csv(self.loads_path)
+
+    def write_loads(self, df):
+        write_csv_atomically(df, self.loads_path)
+
+    # -- call metrics -----------------------------------------------------
+
+    def init_call_metrics(self):
+        # Header is written exactly once; every later write is a plain append
+        upgrade_call_metrics_csv(self.call_metrics_path)
+        self.writer.ensure_header()
+
+    def append_call_metrics(self, rows):
+        return self.writer.append(rows)
+
+    def call_metrics_state(self):
+        """(generation, end cursor); generation changes if the file is replaced"""
+        # Only count whole rows; a row still being written is picked up next time
+        return complete_rows_end(self.call_metrics_path)
+
+    def check_cursor(self, cursor):
+        check_cursor(self.call_metrics_path, cursor)
+
+    def iter_call_metrics(self, cursor=0, end=None, filters=None):
+        """Yield (record, next_cursor) for rows from cursor up to end"""
+        header = read_header(self.call_metrics_path)
+        matches = row_filter(**(filters or {}))
+        for _, values, next_cursor in iter_rows(self.call_metrics_path, cursor):
+            if end is not None and next_cursor > end:
+                return
+            record = parse_record(header, values)
+            if matches(record):
+                yield record, next_cursor
+
+    def iter_call_metrics_frames(self, cursor=0, end=None, chunksize=FRAME_CHUNK_ROWS, filters=None):
+        """Yield DataFrame chunks of rows from cursor up to end, optionally only those matching filters"""
+        if end is None:
+            end = self.call_metrics_state()[1]
+        yield from filter_frames(read_csv_frames(self.call_metrics_path, cursor, end, chunksize), filters)
+
+    def close(self):
+        self.writer.close()
+
+
+SQLITE_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS loads (
+    load_id TEXT PRIMARY KEY,
+    origin TEXT,
+    destination TEXT,
+    pickup_datetime TEXT,
+    delivery_datetime TEXT,
+    equipment_type TEXT,
+    loadboard_rate NUMERIC,
+    notes TEXT,
+    weight NUMERIC,
+    commodity_type TEXT,
+    num_of_pieces NUMERIC,
+    miles NUMERIC,
+    dimensions TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_loads_origin ON loads (origin COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_loads_destination ON loads (destination COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_loads_equipment_type ON loads (equipment_type COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_loads_pickup_datetime ON loads (pickup_datetime);
+CREATE INDEX IF NOT EXISTS idx_loads_loadboard_rate ON loads (loadboard_rate);
+
+CREATE TABLE IF NOT EXISTS call_metrics (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT,
+    mc_number TEXT,
+    carrier_name TEXT,
+    call_duration INTEGER,
+    load_id TEXT,
+    outcome TEXT,
+    sentiment TEXT,
+    negotiation_rounds INTEGER,
+    initial_rate REAL,
+    final_rate REAL,
+    rate_difference REAL,
+    load_accepted INTEGER,
+    call_id TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_call_metrics_timestamp ON call_metrics (timestamp);
+CREATE INDEX IF NOT EXISTS idx_call_metrics_outcome ON call_metrics (outcome);
+CREATE INDEX IF NOT EXISTS idx_call_metrics_sentiment ON call_metrics (sentiment);
+CREATE INDEX IF NOT EXISTS idx_call_metrics_load_accepted ON call_metrics (load_accepted);
+CREATE INDEX IF NOT EXISTS idx_call_metrics_mc_number ON call_metrics (mc_number);
+CREATE INDEX IF NOT EXISTS idx_call_metrics_load_id ON call_metrics (load_id);
+
+-- Bumped by triggers so readers can tell the load board changed without scanning it
+CREATE TABLE IF NOT EXISTS data_versions (name TEXT PRIMARY KEY, version INTEGER NOT NULL);
+INSERT OR IGNORE INTO data_versions (name, version) VALUES ('loads', 0);
+CREATE TRIGGER IF NOT EXISTS loads_version_insert AFTER INSERT ON loads
+BEGIN UPDATE data_versions SET version = version + 1 WHERE name = 'loads'; END;
+CREATE TRIGGER IF NOT EXISTS loads_version_update AFTER UPDATE ON loads
+BEGIN UPDATE data_versions SET version = version + 1 WHERE name = 'loads'; END;
+CREATE TRIGGER IF NOT EXISTS loads_version_delete AFTER DELETE ON loads
+BEGIN UPDATE data_versions SET version = version + 1 WHERE name = 'loads'; END;
+'''
+
+
+class SqliteStorage:
+    """Single SQLite database with indexes on the columns endpoints filter by.
+
+    Call metrics cursors are the id of the last row consumed.
+    """
+
+    name = 'sqlite'
+
+    def __init__(self, data_dir=STORAGE_DIR, filename='loads.db'):
+        self.path = os.path.join(data_dir, filename)
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.executescript(SQLITE_SCHEMA)
+            # Databases created before call_id was added get the column (NULL for older rows)
+            if 'call_id' not in [row[1] for row in conn.execute('PRAGMA table_info(call_metrics)')]:
+                conn.execute('ALTER TABLE call_metrics ADD COLUMN call_id TEXT')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_call_metrics_call_id ON call_metrics (call_id)')
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def _connection(self):
+        # One connection per thread; sqlite3 connections are not shareable across threads
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    # -- loads ------------------------------------------------------------
+
+    def loads_version(self):
+        row = self._connection().execute("SELECT version FROM data_versions WHERE name = 'loads'").fetchone()
+        return (os.stat(self.path).st_ino, row[0])
+
+    def read_loads(self):
+        import pandas as pd
+        df = pd.read_sql_query(f"SELECT {', '.join(LOADS_COLUMNS)} FROM loads ORDER BY rowid", self._connection())
+        return df.fillna(np.nan)
+
+    def write_loads(self, df):
+        df = df.reindex(columns=LOADS_COLUMNS)
+        with self._connection() as conn:
+            conn.execute('DELETE FROM loads')
+            conn.executemany(
+                f"INSERT INTO loads ({', '.join(LOADS_COLUMNS)}) VALUES ({', '.join('?' * len(LOADS_COLUMNS))})",
+                [tuple(r[col] for col in LOADS_COLUMNS) for r in frame_records(df)])
+
+    # -- call metrics -----------------------------------------------------
+
+    def init_call_metrics(self):
+        pass
+
+    def append_call_metrics(self, rows):
+        if isinstance(rows, dict):
+            rows = [rows]
+        values = [
+            tuple(int(r[col]) if col == 'load_accepted' and r.get(col) is not None else r.get(col)
+                  for col in CALL_METRICS_COLUMNS)
+            for r in rows
+        ]
+        with self._connection() as conn:
+            conn.executemany(
+                f"INSERT INTO call_metrics ({', '.join(CALL_METRICS_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(CALL_METRICS_COLUMNS))})", values)
+        return len(values)
+
+    def call_metrics_state(self):
+        row = self._connection().execute('SELECT COALESCE(MAX(id), 0) FROM call_metrics').fetchone()
+        return (os.stat(self.path).st_ino, row[0])
+
+    def check_cursor(self, cursor):
+        if cursor < 0:
+            raise ValueError('cursor is out of range')
+
+    def _select(self, cursor, end, filters):
+        sql = f"SELECT id, {', '.join(CALL_METRICS_COLUMNS)} FROM call_metrics WHERE id > ?"
+        params = [cursor]
+        if end is not None:
+            sql += ' AND id <= ?'
+            params.append(end)
+        for col, value in (filters or {}).items():
+            if value is None:
+                continue
+            if col in ('since', 'until'):
+                # ISO timestamps compare correctly as text, through the timestamp index
+                sql += ' AND timestamp >= ?' if col == 'since' else ' AND timestamp < ?'
+                params.append(value)
+            else:
+                sql += f' AND {col} = ?'
+                params.append(int(value) if col == 'load_accepted' else value)
+        return sql + ' ORDER BY id', params
+
+    def iter_call_metrics(self, cursor=0, end=None, filters=None):
+        """Yield (record, next_cursor) for rows after cursor up to end"""
+        sql, params = self._select(cursor, end, filters)
+        # A private connection so a suspended streaming response never shares a cursor
+        conn = self._connect()
+        try:
+            rows = conn.execute(sql, params)
+            while True:
+                batch = rows.fetchmany(1000)
+                if not batch:
+                    return
+                for row in batch:
+                    record = dict(zip(CALL_METRICS_COLUMNS, row[1:]))
+                    if record['load_accepted'] is not None:
+                        record['load_accepted'] = bool(record['load_accepted'])
+                    yield record, row[0]
+        finally:
+            conn.close()
+
+    def iter_call_metrics_frames(self, cursor=0, end=None, chunksize=FRAME_CHUNK_ROWS, filters=None):
+        """Yield DataFrame chunks of rows after cursor up to end, optionally only those matching filters"""
+        import pandas as pd
+        sql, params = self._select(cursor, end, filters)
+        conn = self._connect()
+        try:
+            for chunk in pd.read_sql_query(sql, conn, params=params, chunksize=chunksize):
+                yield normalize_call_metrics_frame(chunk.drop(columns=['id']))
+        finally:
+            conn.close()
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class ParquetStorage:
+    """Columnar files for analytics jobs; needs pyarrow.
+
+    Call metrics live in a directory of immutable parts named by the global
+    row number they start at, so a cursor is simply a row number. Each
+    append writes one part, which suits batch loads rather than one-row
+    webhooks; compact() merges small parts.
+    """
+
+    name = 'parquet'
+
+    def __init__(self, data_dir=STORAGE_DIR, loads_file='sample_loads.parquet', call_metrics_dir='call_metrics.parquet'):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise RuntimeError('The parquet storage backend requires pyarrow (pip install pyarrow)')
+        self.loads_path = os.path.join(data_dir, loads_file)
+        self.call_metrics_dir = os.path.join(data_dir, call_metrics_dir)
+        os.makedirs(self.call_metrics_dir, exist_ok=True)
+        self._lock = threading.Lock()
+
+    # -- loads ------------------------------------------------------------
+
+    def loads_version(self):
+        return file_version(self.loads_path)
+
+    def read_loads(self):
+        import pandas as pd
+        return pd.read_parquet(self.loads_path)
+
+    def write_loads(self, df):
+        tmp = f'{self.loads_path}.tmp'
+        df.to_parquet(tmp, index=False)
+        os.replace(tmp, self.loads_path)
+
+    # -- call metrics -----------------------------------------------------
+
+    def _parts(self):
+        """Sorted (start, count, path) of every part"""
+        parts = []
+        for name in os.listdir(self.call_metrics_dir):
+            if name.startswith('part-') and name.endswith('.parquet'):
+                start, count = name[len('part-'):-len('.parquet')].split('-')
+                parts.append((int(start), int(count), os.path.join(self.call_metrics_dir, name)))
+        return sorted(parts)
+
+    @contextmanager
+    def _locked(self):
+        # Serializes part numbering across threads and worker processes
+        with self._lock, open(os.path.join(self.call_metrics_dir, '.lock'), 'a') as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            yield
+
+    def _write_part(self, df, start):
+        path = os.path.join(self.call_metrics_dir, f'part-{start:012d}-{len(df):09d}.parquet')
+        tmp = os.path.join(self.call_metrics_dir, f'.tmp-{start:012d}')
+        df.to_parquet(tmp, index=False)
+        os.replace(tmp, path)
+
+    def init_call_metrics(self):
+        pass
+
+    def append_call_metrics(self, rows):
+        import pandas as pd
+        if isinstance(rows, dict):
+            rows = [rows]
+        if not rows:
+            return 0
+        df = normalize_call_metrics_frame(pd.DataFrame(rows, columns=CALL_METRICS_COLUMNS))
+        with self._locked():
+            parts = self._parts()
+            start = parts[-1][0] + parts[-1][1] if parts else 0
+            self._write_part(df, start)
+        return len(df)
+
+    def compact(self):
+        """Merge every part into one; row numbers (and so cursors) are unchanged"""
+        import pandas as pd
+        with self._locked():
+            parts = self._parts()
+            if len(parts) < 2:
+                return
+            df = pd.concat([pd.read_parquet(path) for _, _, path in parts], ignore_index=True)
+            self._write_part(df, 0)
+            for _, _, path in parts:
+                os.remove(path)
+
+    def call_metrics_state(self):
+        parts = self._parts()
+        return (os.stat(self.call_metrics_dir).st_ino, parts[-1][0] + parts[-1][1] if parts else 0)
+
+    def check_cursor(self, cursor):
+        if cursor < 0 or cursor > self.call_metrics_state()[1]:
+            raise ValueError('cursor is out of range')
+
+    def _iter_chunks(self, cursor, end, chunksize):
+        # (chunk, row number of its first row) for rows in [cursor, end)
+        import pandas as pd
+        for start, count, path in self._parts():
+            if start + count <= cursor or (end is not None and start >= end):
+                continue
+            df = pd.read_parquet(path)
+            lo = max(cursor - start, 0)
+            hi = count if end is None else min(count, end - start)
+            for offset in range(lo, hi, chunksize):
+                chunk = df.iloc[offset:min(offset + chunksize, hi)].reset_index(drop=True)
+                yield normalize_call_metrics_frame(chunk), start + offset
+
+    def iter_call_metrics_frames(self, cursor=0, end=None, chunksize=FRAME_CHUNK_ROWS, filters=None):
+        """Yield DataFrame chunks of rows from cursor up to end, optionally only those matching filters"""
+        yield from filter_frames((chunk for chunk, _ in self._iter_chunks(cursor, end, chunksize)), filters)
+
+    def iter_call_metrics(self, cursor=0, end=None, filters=None):
+        """Yield (record, next_cursor) for rows from cursor up to end"""
+        matches = row_filter(**(filters or {}))
+        for chunk, position in self._iter_chunks(cursor, end, FRAME_CHUNK_ROWS):
+            for record in frame_records(chunk):
+                position += 1
+                if matches(record):
+                    yield record, position
+
+    def close(self):
+        pass
+
+
+class PartitionedCsvStorage(CsvStorage):
+    """CSV load board with call metrics split into one CSV per day.
+
+    call_metrics/YYYY-MM-DD.csv holds the rows whose timestamp falls on that
+    day, appended exactly like call_metrics.csv. A cursor packs the
+    partition's day with a byte offset inside it (day ordinal << 40 |
+    offset), so cursors keep increasing from one day to the next and a date
+    range only opens the partitions it covers. compact_call_metrics() rolls
+    partitions older than CALL_METRICS_ROLLUP_AFTER_DAYS into rollups.csv and
+    deletes raw partitions older than CALL_METRICS_RETENTION_DAYS.
+    """
+
+    name = 'partitioned'
+    OFFSET_BITS = 40
+    PARTITION_NAME = re.compile(r'^(\d{4}-\d{2}-\d{2})\.csv$')
+    # Writers kept open; rows only reach older days around midnight or in backfills
+    OPEN_WRITERS = 2
+
+    def __init__(self, data_dir=STORAGE_DIR, loads_file='sample_loads.csv', call_metrics_dir='call_metrics'):
+        self.loads_path = os.path.join(data_dir, loads_file)
+        self.call_metrics_dir = os.path.join(data_dir, call_metrics_dir)
+        self.rollups_path = os.path.join(self.call_metrics_dir, 'rollups.csv')
+        self.generation_path = os.path.join(self.call_metrics_dir, 'generation')
+        os.makedirs(self.call_metrics_dir, exist_ok=True)
+        self._writers = {}
+        self._latest = None
+        self._listing = (None, [])
+        self._lock = threading.Lock()
+
+    # -- partitions and cursors -------------------------------------------
+
+    def _path(self, day):
+        return os.path.join(self.call_metrics_dir, f'{day.isoformat()}.csv')
+
+    def _partitions(self):
+        """Sorted (day, path) of every raw partition"""
+        # The directory is only listed again once a file was created or removed in it
+        mtime = os.stat(self.call_metrics_dir).st_mtime_ns
+        listed, parts = self._listing
+        if listed != mtime:
+            parts = []
+            for name in os.listdir(self.call_metrics_dir):
+                match = self.PARTITION_NAME.match(name)
+                if match:
+                    parts.append((date.fromisoformat(match.group(1)), os.path.join(self.call_metrics_dir, name)))
+            parts.sort()
+            self._listing = (mtime, parts)
+        return parts
+
+    def _pack(self, day, offset):
+        return (day.toordinal() << self.OFFSET_BITS) | offset
+
+    def _unpack(self, cursor):
+        """(day or None for the very start, byte offset)"""
+        ordinal = cursor >> self.OFFSET_BITS
+        return (date.fromordinal(ordinal) if ordinal else None), cursor & ((1 << self.OFFSET_BITS) - 1)
+
+    @contextmanager
+    def _locked(self):
+        # Serializes compaction and generation bumps across threads and worker processes
+        with open(os.path.join(self.call_metrics_dir, '.lock'), 'a') as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            yield
+
+    def _generation(self):
+        try:
+            with open(self.generation_path) as f:
+                return int(f.read() or 0)
+        except FileNotFoundError:
+            return 0
+
+    def _generation_stamp(self):
+        # Every bump replaces the file, so its inode identifies the generation without reading it
+        try:
+            return os.stat(self.generation_path).st_ino
+        except FileNotFoundError:
+            return 0
+
+    def _bump_generation(self):
+        """Tell incremental readers to start over (rows landed behind their cursors)"""
+        with self._locked():
+            tmp = f'{self.generation_path}.tmp'
+            with open(tmp, 'w') as f:
+                f.write(str(self._generation() + 1))
+            os.replace(tmp, self.generation_path)
+
+    def _writer(self, day):
+        writer = self._writers.get(day)
+        if writer is None:
+            writer = self._writers[day] = CallMetricsWriter(self._path(day))
+            for old in sorted(self._writers)[:-self.OPEN_WRITERS]:
+                self._writers.pop(old).close()
+        return writer
+
+    # -- call metrics -----------------------------------------------------
+
+    def init_call_metrics(self):
+        os.makedirs(self.call_metrics_dir, exist_ok=True)
+        # Only the newest day is still written to; older days keep their header
+        parts = self._partitions()
+        if parts:
+            upgrade_call_metrics_csv(parts[-1][1])
+
+    def append_call_metrics(self, rows):
+        if isinstance(rows, dict):
+            rows = [rows]
+        if not rows:
+            return 0
+        by_day = {}
+        for row in rows:
+            try:
+                day = date.fromisoformat(str(row.get('timestamp') or '')[:10])
+            except ValueError:
+                day = date.today()
+            by_day.setdefault(day, []).append(row)
+        behind = False
+        with self._lock:
+            for day in sorted(by_day):
+                self._writer(day).append(by_day[day])
+                # A reader may already have moved on to a later partition
+                if (self._latest is not None and day < self._latest) or os.path.exists(self._path(day + timedelta(1))):
+                    behind = True
+                self._latest = max(day, self._latest or day)
+        if behind:
+            self._bump_generation()
+        return len(rows)
+
+    def call_metrics_state(self):
+        """(generation, end cursor); the generation changes when rows land behind the end"""
+        generation = (os.stat(self.call_metrics_dir).st_ino, self._generation_stamp())
+        parts = self._partitions()
+        if not parts:
+            return (generation, 0)
+        day, path = parts[-1]
+        return (generation, self._pack(day, complete_rows_end(path)[1]))
+
+    def check_cursor(self, cursor):
+        if cursor < 0:
+            raise ValueError('cursor is out of range')
+        day, offset = self._unpack(cursor)
+        if day is None:
+            return
+        if os.path.exists(self._path(day)):
+            check_cursor(self._path(day), offset)
+        elif day > date.today() + timedelta(1):
+            raise ValueError('cursor is out of range')
+        # A partition removed by retention: reading resumes at the next one
+
+    def _day_bounds(self, since, until):
+        """(first day, day to stop before) touched by ISO bounds [since, until)"""
+        first = date.fromisoformat(since[:10]) if since else None
+        stop = None
+        if until:
+            stop = date.fromisoformat(until[:10])
+            # until is exclusive: a bound at midnight does not reach into that day
+            if until[11:].strip('0:.') != '':
+                stop += timedelta(1)
+        return first, stop
+
+    def _ranges(self, cursor, end=None, since=None, until=None):
+        """(day, path, start offset, end offset or None) of each partition to read"""
+        start_day, start_offset = self._unpack(cursor)
+        end_day, end_offset = self._unpack(end) if end is not None else (None, None)
+        first, stop = self._day_bounds(since, until)
+        for day, path in self._partitions():
+            if (start_day is not None and day < start_day) or (first is not None and day < first):
+                continue
+            if (end is not None and day > end_day) or (stop is not None and day >= stop):
+                return
+            lo = start_offset if day == start_day else 0
+            hi = end_offset if end is not None and day == end_day else None
+            yield day, path, lo, hi
+
+    def iter_call_metrics(self, cursor=0, end=None, filters=None):
+        """Yield (record, next_cursor) for rows from cursor up to end, opening only partitions in range"""
+        filters = filters or {}
+        matches = row_filter(**filters)
+        for day, path, lo, hi in self._ranges(cursor, end, filters.get('since'), filters.get('until')):
+            header = read_header(path)
+            for _, values, offset in iter_rows(path, lo):
+                if hi is not None and offset > hi:
+                    break
+                record = parse_record(header, values)
+                if matches(record):
+                    yield record, self._pack(day, offset)
+
+    def iter_call_metrics_frames(self, cursor=0, end=None, chunksize=FRAME_CHUNK_ROWS, filters=None):
+        """Yield DataFrame chunks of rows from cursor up to end, opening only partitions in the filters' range"""
+        filters = filters or {}
+        for _, path, lo, hi in self._ranges(cursor, end, filters.get('since'), filters.get('until')):
+            frames = read_csv_frames(path, lo, complete_rows_end(path)[1] if hi is None else hi, chunksize)
+            yield from filter_frames(frames, filters)
+
+    # -- rollups and retention --------------------------------------------
+
+    def _summarize_partition(self, day, path, start, end, rate_bin_width):
+        """Summary of a partition's rows from byte offset start up to end"""
+        key = day.isoformat()
+        frames = read_csv_frames(path, start, end)
+        return summarize_frames(frames, rate_bin_width).get(key) or empty_summary(key, rate_bin_width)
+
+    def _current_rollups(self):
+        """Rollups with rows written to their days after the last compaction merged in"""
+        summaries = read_rollups(self.rollups_path)
+        parts = dict(self._partitions())
+        for summary in summaries:
+            path = parts.get(date.fromisoformat(summary['date']))
+            if path is None or summary['raw_end'] is None:
+                continue
+            end = complete_rows_end(path)[1]
+            if end > summary['raw_end']:
+                late = self._summarize_partition(date.fromisoformat(summary['date']), path, summary['raw_end'], end,
+                                                 summary['rate_bin_width'])
+                if late['calls']:
+                    merge_summary(summary, late)
+        return summaries
+
+    def call_metrics_rollups(self):
+        """(daily summaries, cursor raw rows take over from) for rebuilding aggregates"""
+        summaries = self._current_rollups()
+        if not summaries:
+            return summaries, 0
+        last = date.fromisoformat(summaries[-1]['date'])
+        return summaries, self._pack(last + timedelta(1), 0)
+
+    def daily_call_metrics(self, rate_bin_width, since=None, until=None):
+        """Per-day reports in [since, until): rollups where they exist, raw partitions otherwise"""
+        first, stop = self._day_bounds(since, until)
+        reports = {}
+        for summary in self._current_rollups():
+            day = date.fromisoformat(summary['date'])
+            if (first is None or day >= first) and (stop is None or day < stop):
+                reports[summary['date']] = daily_report(summary, 'rollup')
+        for day, path, _, _ in self._ranges(0, None, since, until):
+            if day.isoformat() in reports:
+                continue
+            frames = read_csv_frames(path, 0, complete_rows_end(path)[1])
+            for key, summary in summarize_frames(frames, rate_bin_width, since, until).items():
+                reports[key] = daily_report(summary, 'raw')
+        return [reports[key] for key in sorted(reports)]
+
+    def compact_call_metrics(self, rate_bin_width, rollup_after_days=CALL_METRICS_ROLLUP_AFTER_DAYS,
+                             retention_days=CALL_METRICS_RETENTION_DAYS, today=None):
+        """Roll up raw partitions older than rollup_after_days, then delete rolled-up
+        partitions older than retention_days. Returns (days rolled up, partitions deleted)."""
+        today = today or date.today()
+        roll_before = today - timedelta(rollup_after_days)
+        expire_before = today - timedelta(max(retention_days, rollup_after_days))
+        rolled, expired = 0, 0
+        with self._locked():
+            rollups = {summary['date']: summary for summary in read_rollups(self.rollups_path)}
+            rollups_mtime = os.path.getmtime(self.rollups_path) if rollups else 0
+            parts = dict(self._partitions())
+            changed = False
+            for summary in rollups.values():
+                if summary['raw_end'] and date.fromisoformat(summary['date']) not in parts:
+                    # Its partition was deleted (a run died before recording it): a new one starts at 0
+                    summary['raw_end'] = 0
+                    changed = True
+            for day, path in sorted(parts.items()):
+                if day >= roll_before:
+                    break
+                key = day.isoformat()
+                summary = rollups.get(key)
+                end = complete_rows_end(path)[1]
+                if summary is not None and summary['raw_end'] is None:
+                    # Rolled up before raw_end was kept: it covers the whole partition unless rows came later
+                    if os.path.getmtime(path) > rollups_mtime:
+                        summary = None
+                    else:
+                        summary['raw_end'] = end
+                        changed = True
+                start = summary['raw_end'] if summary is not None else 0
+                if end > start:
+                    # Only rows not summarized yet, so a day rolled up (and even deleted) before keeps its totals
+                    fresh = self._summarize_partition(day, path, start, end, rate_bin_width)
+                    summary = fresh if summary is None else merge_summary(summary, fresh)
+                    summary['raw_end'] = end
+                    rollups[key] = summary
+                    rolled += 1
+            if rolled or changed:
+                # Saved before any partition goes, so a run that dies midway loses no rows
+                write_rollups(self.rollups_path, rollups.values())
+            for day, path in sorted(parts.items()):
+                if day >= expire_before:
+                    break
+                summary = rollups.get(day.isoformat())
+                if summary is not None and summary['raw_end'] == complete_rows_end(path)[1]:
+                    with self._lock:
+                        writer = self._writers.pop(day, None)
+                        if writer is not None:
+                            writer.close()
+                    os.remove(path)
+                    # Rows written to the day from now on go to a new partition
+                    summary['raw_end'] = 0
+                    expired += 1
+            if expired:
+                write_rollups(self.rollups_path, rollups.values())
+        return rolled, expired
+
+    def close(self):
+        with self._lock:
+            for writer in self._writers.values():
+                writer.close()
+            self._writers.clear()
+
+
+BACKENDS = {
+    'csv': CsvStorage,
+    'sqlite': SqliteStorage,
+    'parquet': ParquetStorage,
+    'partitioned': PartitionedCsvStorage,
+}
+
+
+def get_storage(name=STORAGE_BACKEND, data_dir=STORAGE_DIR):
+    """Instantiate the configured storage backend"""
+    try:
+        backend = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown storage backend '{name}', expected one of {', '.join(BACKENDS)}")
+    return backend(data_dir)
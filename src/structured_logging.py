@@ -0,0 +1,207 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+from datetime import datetime, timezone
+
+from telemetry import REGISTRY, Gauge
+
+# Structured JSON logs written by a background thread. Request threads only
+# build a LogRecord and put it on a bounded queue; formatting, encoding and
+# the stdout write (unbuffered under PYTHONUNBUFFERED) happen off the hot path.
+LOGGER_NAME = 'loads_api'
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').strip().upper()
+# Per-route overrides, e.g. "/call-metrics=DEBUG,/metrics=WARNING"
+LOG_ROUTE_LEVELS = os.environ.get('LOG_ROUTE_LEVELS', '')
+# Share of ingest requests whose (redacted) body is logged
+LOG_BODY_SAMPLE_RATE = float(os.environ.get('LOG_BODY_SAMPLE_RATE', '0.01'))
+LOG_BODY_MAX_CHARS = int(os.environ.get('LOG_BODY_MAX_CHARS', '2048'))
+LOG_REDACT_FIELDS = os.environ.get('LOG_REDACT_FIELDS', 'api_key,authorization,password,token')
+LOG_QUEUE_RECORDS = int(os.environ.get('LOG_QUEUE_RECORDS', '10000'))
+LOG_BATCH_RECORDS = 500
+
+REDACTED = '[redacted]'
+_STOP = object()
+
+
+# (setting, value) of level names that were not recognised; warned about once logging is configured
+_INVALID_LEVELS = []
+
+
+def _level(name):
+    """Numeric level for a name such as 'DEBUG', or None if it is not a logging level"""
+    level = logging.getLevelName(name.strip().upper())
+    return level if isinstance(level, int) else None
+
+
+def _parse_route_levels(spec):
+    levels = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        route, _, level = item.partition('=')
+        if _level(level) is None:
+            _INVALID_LEVELS.append(('LOG_ROUTE_LEVELS', item))
+            continue
+        levels[route.strip()] = _level(level)
+    return levels
+
+
+if _level(LOG_LEVEL) is None:
+    _INVALID_LEVELS.append(('LOG_LEVEL', LOG_LEVEL))
+    LOG_LEVEL = 'INFO'
+ROUTE_LEVELS = _parse_route_levels(LOG_ROUTE_LEVELS)
+REDACT_FIELDS = frozenset(field.strip().lower() for field in LOG_REDACT_FIELDS.split(',') if field.strip())
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, event and the record's fields"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'event': record.getMessage(),
+        }
+        entry.update(getattr(record, 'fields', None) or {})
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class BackgroundHandler(logging.Handler):
+    """Queues records for a writer thread; never blocks the caller.
+
+    When the queue is full the record is dropped and counted rather than
+    making a webhook wait on stdout. The writer drains whatever is queued
+    and emits it as a single write.
+    """
+
+    def __init__(self, stream=None, max_records=LOG_QUEUE_RECORDS, batch_records=LOG_BATCH_RECORDS):
+        super().__init__()
+        self.stream = stream
+        self.batch_records = batch_records
+        self._queue = queue.Queue(max_records)
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self.dropped = 0
+
+    def _ensure_started(self):
+        # Started lazily (and again after a fork) like the other background writers
+        if self._thread is None or self._pid != os.getpid():
+            with self._start_lock:
+                if self._thread is None or self._pid != os.getpid():
+                    self._pid = os.getpid()
+                    self._thread = threading.Thread(target=self._run, name='log-writer', daemon=True)
+                    self._thread.start()
+
+    def emit(self, record):
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        while True:
+            records = [self._queue.get()]
+            while len(records) < self.batch_records:
+                try:
+                    records.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = _STOP in records
+            lines = []
+            for record in records:
+                if record is _STOP:
+                    continue
+                try:
+                    lines.append(self.format(record))
+                except Exception:
+                    self.handleError(record)
+            if lines:
+                stream = self.stream or sys.stdout
+                try:
+                    stream.write('\n'.join(lines) + '\n')
+                    stream.flush()
+                except Exception:
+                    pass
+            if stop:
+                return
+
+    def close(self, timeout=5):
+        """Write out everything queued, then stop the writer"""
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+        super().close()
+
+
+_handler = None
+
+
+def configure_logging():
+    """Send the service's loggers through one background JSON handler (idempotent)"""
+    global _handler
+    if _handler is not None:
+        return _handler
+    _handler = BackgroundHandler()
+    _handler.setFormatter(JsonFormatter())
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.addHandler(_handler)
+    logger.setLevel(min([logging.getLevelName(LOG_LEVEL)] + list(ROUTE_LEVELS.values())))
+    logger.propagate = False
+    atexit.register(_handler.close)
+    for setting, value in _INVALID_LEVELS:
+        log_event(logger, logging.WARNING, 'log_level.invalid', setting=setting, value=value,
+                  message=f'{setting}: {value!r} is not a logging level; using INFO' if setting == 'LOG_LEVEL'
+                  else f'{setting}: ignoring {value!r}, not a logging level')
+    REGISTRY.register(Gauge('log_records_dropped', 'Log records shed because the log writer fell behind',
+                            lambda: _handler.dropped))
+    return _handler
+
+
+def get_logger(name):
+    return logging.getLogger(f'{LOGGER_NAME}.{name}')
+
+
+def log_event(logger, level, event, **fields):
+    """Log a structured event; the fields become top-level JSON keys"""
+    if logger.isEnabledFor(level):
+        logger.log(level, event, extra={'fields': fields})
+
+
+def route_level(route):
+    """Minimum level logged for a route"""
+    return ROUTE_LEVELS.get(route, logging.getLevelName(LOG_LEVEL))
+
+
+def route_enabled(route, level):
+    return level >= route_level(route)
+
+
+def sample_body():
+    """Whether this request's body should be logged"""
+    return LOG_BODY_SAMPLE_RATE > 0 and random.random() < LOG_BODY_SAMPLE_RATE
+
+
+def redact(value):
+    """Copy of a parsed JSON body with configured fields masked"""
+    if isinstance(value, dict):
+        return {key: REDACTED if str(key).lower() in REDACT_FIELDS else redact(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [redact(item) for item in value]
+    return value
+
+
+def body_for_log(parsed=None, raw=None):
+    """Redacted JSON body, or the raw text truncated to LOG_BODY_MAX_CHARS"""
+    if parsed is not None:
+        return redact(parsed)
+    if raw is None:
+        return None
+    return raw if len(raw) <= LOG_BODY_MAX_CHARS else raw[:LOG_BODY_MAX_CHARS] + '...'
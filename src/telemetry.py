@@ -0,0 +1,182 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Prometheus text exposition (format 0.0.4) without a client library: a few
+# counters and histograms kept in plain dicts, rendered on scrape. Values are
+# per process; each worker exposes its own.
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Seconds; covers sub-millisecond index lookups up to multi-second rebuilds
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{value}"' for name, value in extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        with self._lock:
+            items = sorted(self._values.items())
+        lines.extend(f'{self.name}{_labels(self.labelnames, labels)} {_number(value)}' for labels, value in items)
+        return lines
+
+
+class Gauge:
+    """Value read from a callback at scrape time"""
+
+    def __init__(self, name, help, callback):
+        self.name = name
+        self.help = help
+        self.callback = callback
+
+    def render(self):
+        return [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} gauge',
+                f'{self.name} {_number(self.callback())}']
+
+
+class Histogram:
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (last is +Inf), sum]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    @contextmanager
+    def time(self, *labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            items = sorted((labels, (list(counts), total)) for labels, (counts, total) in self._series.items())
+        for labels, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = (('le', _number(bound)),)
+                lines.append(f'{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}')
+            lines.append(f'{self.name}_count{_labels(self.labelnames, labels)} {cumulative}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    'http_request_duration_seconds', 'Time to produce a response (streamed bodies excluded)',
+    ('route', 'method', 'status')))
+STORAGE_SECONDS = REGISTRY.register(Histogram(
+    'storage_operation_duration_seconds', 'Time spent in storage reads and writes', ('backend', 'operation')))
+OPERATION_SECONDS = REGISTRY.register(Histogram(
+    'app_operation_duration_seconds', 'Time spent in in-memory index, aggregate and formatting work',
+    ('operation',)))
+ROWS_INGESTED = REGISTRY.register(Counter(
+    'call_metrics_rows_ingested_total', 'Call metric rows accepted for storage', ('endpoint',)))
+ROWS_REJECTED = REGISTRY.register(Counter(
+    'call_metrics_rows_rejected_total', 'Call metric rows refused', ('endpoint', 'reason')))
+CALL_METRICS_DUPLICATES = REGISTRY.register(Counter(
+    'call_metrics_duplicates_total', 'Call metric rows acknowledged without a write: call_id already stored',
+    ('endpoint',)))
+CALL_ID_HISTORY_CHECKS = REGISTRY.register(Counter(
+    'call_id_history_checks_total', 'call_ids matched by the Bloom filter only, checked against storage, by result',
+    ('result',)))
+CARRIER_PROFILE_LOOKUPS = REGISTRY.register(Counter(
+    'carrier_profile_lookups_total', 'GET /carriers/<mc_number> lookups by profile hot set result', ('result',)))
+
+
+class TimedStorage:
+    """Storage backend wrapper timing every load board and call metrics read/write.
+
+    Everything else is passed straight through. Row-by-row iteration
+    (iter_call_metrics) is left untimed, since a timer per row would cost
+    more than the read it measures; chunked frame reads are timed as a whole.
+    """
+
+    TIMED = ('read_loads', 'write_loads', 'append_call_metrics')
+
+    def __init__(self, storage):
+        self._storage = storage
+
+    def __getattr__(self, name):
+        attr = getattr(self._storage, name)
+        if name in self.TIMED:
+            def timed(*args, **kwargs):
+                with STORAGE_SECONDS.time(self._storage.name, name):
+                    return attr(*args, **kwargs)
+            return timed
+        return attr
+
+    def iter_call_metrics_frames(self, *args, **kwargs):
+        # Only time spent inside the backend, not in the consumer between chunks
+        frames = self._storage.iter_call_metrics_frames(*args, **kwargs)
+        elapsed = 0.0
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    frame = next(frames)
+                except StopIteration:
+                    return
+                finally:
+                    elapsed += time.perf_counter() - start
+                yield frame
+        finally:
+            STORAGE_SECONDS.observe(elapsed, self._storage.name, 'iter_call_metrics_frames')
@@ -0,0 +1,155 @@
+import importlib.util
+import io
+import os
+import zlib
+
+import numpy as np
+
+from metrics_reader import CALL_METRICS_TYPES
+from metrics_writer import CALL_METRICS_COLUMNS
+
+try:
+    import brotli
+except ImportError:  # optional: pip install brotli
+    brotli = None
+
+try:
+    import msgpack
+except ImportError:  # optional: pip install msgpack
+    msgpack = None
+
+# Smallest body worth compressing; streamed bodies are always compressed
+COMPRESS_MIN_BYTES = int(os.environ.get('RESPONSE_COMPRESS_MIN_BYTES', '1024'))
+# Fast settings: responses are compressed on every request, not once ahead of time
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+MSGPACK_MIMETYPE = 'application/msgpack'
+ARROW_MIMETYPE = 'application/vnd.apache.arrow.stream'
+
+
+def content_encodings():
+    """Content-Encodings this process can produce, preferred first"""
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def negotiate_encoding(accept_encodings):
+    """Best of content_encodings() a request's Accept-Encoding allows, or None to send the body as is"""
+    return accept_encodings.best_match(content_encodings())
+
+
+def missing_format_dependency(fmt):
+    """Install hint when an optional encoder for fmt is missing, else None"""
+    if fmt == 'msgpack' and msgpack is None:
+        return 'format=msgpack requires msgpack (pip install msgpack)'
+    if fmt == 'arrow' and importlib.util.find_spec('pyarrow') is None:
+        return 'format=arrow requires pyarrow (pip install pyarrow)'
+    return None
+
+
+def _compressor(encoding, gzip_level=GZIP_LEVEL, brotli_quality=BROTLI_QUALITY):
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=brotli_quality)
+        return compressor.process, compressor.finish
+    # wbits 31: a gzip header and trailer around the deflate stream
+    compressor = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+    return compressor.compress, compressor.flush
+
+
+def compress_bytes(data, encoding, gzip_level=GZIP_LEVEL, brotli_quality=BROTLI_QUALITY):
+    """A whole body compressed with a content encoding from content_encodings()"""
+    compress, finish = _compressor(encoding, gzip_level, brotli_quality)
+    return compress(data) + finish()
+
+
+def _compress_chunks(chunks, encoding):
+    compress, finish = _compressor(encoding)
+    for chunk in chunks:
+        data = compress(chunk)
+        if data:
+            yield data
+    yield finish()
+
+
+def compress_response(response, encoding):
+    """Compress a 200 response's body with the negotiated encoding, in place.
+
+    A streamed body is compressed chunk by chunk as it is sent; a buffered
+    one only if it is at least COMPRESS_MIN_BYTES.
+    """
+    response.vary.add('Accept-Encoding')
+    if encoding is None or response.status_code != 200 or 'Content-Encoding' in response.headers:
+        return response
+    if response.is_streamed:
+        response.response = _compress_chunks(response.iter_encoded(), encoding)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < COMPRESS_MIN_BYTES:
+            return response
+        response.set_data(compress_bytes(data, encoding))
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+# -- MessagePack ----------------------------------------------------------
+
+def msgpack_body(payload):
+    return msgpack.packb(payload)
+
+
+def msgpack_records(records):
+    """One MessagePack map per record, back to back (read them with msgpack.Unpacker)"""
+    packer = msgpack.Packer()
+    for record in records:
+        yield packer.pack(record)
+
+
+# -- Arrow IPC ------------------------------------------------------------
+
+def call_metrics_arrow_schema():
+    import pyarrow as pa
+    types = {int: pa.int64(), float: pa.float64(), bool: pa.bool_()}
+    return pa.schema([(col, types.get(CALL_METRICS_TYPES.get(col), pa.string())) for col in CALL_METRICS_COLUMNS])
+
+
+def _arrow_frame(df):
+    """A call metrics chunk with every column, in the dtypes of call_metrics_arrow_schema()"""
+    import pandas as pd
+    df = df.reindex(columns=CALL_METRICS_COLUMNS)
+    for col in CALL_METRICS_COLUMNS:
+        kind = CALL_METRICS_TYPES.get(col)
+        values = df[col]
+        if kind is int:
+            # Truncated like parse_record does; unparseable values become nulls
+            df[col] = np.trunc(pd.to_numeric(values, errors='coerce')).astype('Int64')
+        elif kind is float:
+            df[col] = pd.to_numeric(values, errors='coerce')
+        elif kind is None:
+            df[col] = values.where(values.isna(), values.astype(str))
+    return df
+
+
+def _drain(sink):
+    data = sink.getvalue()
+    sink.seek(0)
+    sink.truncate()
+    return data
+
+
+def arrow_stream(frames):
+    """Arrow IPC stream of call metrics DataFrame chunks, one record batch per chunk.
+
+    Each batch is converted column by column from the chunk, never through
+    per-row records.
+    """
+    import pyarrow as pa
+    schema = call_metrics_arrow_schema()
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        yield _drain(sink)
+        for df in frames:
+            writer.write_table(pa.Table.from_pandas(_arrow_frame(df), schema=schema, preserve_index=False))
+            yield _drain(sink)
+    # End-of-stream marker
+    yield _drain(sink)
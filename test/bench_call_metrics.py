@@ -0,0 +1,87 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import pandas as pd
+
+BASE_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.dirname(BASE_DIR)
+sys.path.insert(0, os.path.join(PROJECT_ROOT, 'src'))
+
+from metrics_writer import CALL_METRICS_COLUMNS, CallMetricsWriter  # noqa: E402
+
+ROW = {
+    'timestamp': datetime(2025, 10, 6, 8, 15, 23).isoformat(),
+    'mc_number': '123456',
+    'carrier_name': 'TransLogistics LLC',
+    'call_duration': 245,
+    'load_id': 'L001',
+    'outcome': 'successful',
+    'sentiment': 'positive',
+    'negotiation_rounds': 2,
+    'initial_rate': 2200.0,
+    'final_rate': 2150.0,
+    'rate_difference': -50.0,
+    'load_accepted': True,
+}
+
+
+def prefill(path, n):
+    line = ','.join(str(ROW[col]) for col in CALL_METRICS_COLUMNS) + '\n'
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(','.join(CALL_METRICS_COLUMNS) + '\n')
+        chunk = line * 10000
+        for _ in range(n // 10000):
+            f.write(chunk)
+        f.write(line * (n % 10000))
+
+
+def legacy_append(path, row):
+    """The read-concat-rewrite path log_call_metrics used before the writer"""
+    df = pd.read_csv(path)
+    df = pd.concat([df, pd.DataFrame([row])], ignore_index=True)
+    df.to_csv(path, index=False)
+
+
+def p50_p99(samples):
+    samples = sorted(samples)
+    return (samples[len(samples) // 2] * 1000,
+            samples[min(len(samples) - 1, int(0.99 * len(samples)))] * 1000)
+
+
+def time_appends(fn, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return p50_p99(samples)
+
+
+def run(sizes, iterations, legacy_max, fsync_mode):
+    print(f'{"rows":>10}{"path":>10}{"p50 ms":>10}{"p99 ms":>10}')
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'call_metrics.csv')
+            prefill(path, size)
+            writer = CallMetricsWriter(path, fsync_mode=fsync_mode)
+            p50, p99 = time_appends(lambda: writer.append(ROW), iterations)
+            writer.close()
+            print(f'{size:>10}{"append":>10}{p50:>10.3f}{p99:>10.3f}')
+            if size <= legacy_max:
+                p50, p99 = time_appends(lambda: legacy_append(path, ROW), max(1, iterations // 20))
+                print(f'{size:>10}{"rewrite":>10}{p50:>10.3f}{p99:>10.3f}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Insert latency of POST /call-metrics storage as history grows')
+    parser.add_argument('--sizes', default='0,10000,100000,1000000')
+    parser.add_argument('--iterations', type=int, default=500)
+    parser.add_argument('--legacy-max', type=int, default=100000,
+                        help='skip the rewrite path above this many rows (it is O(N) per insert)')
+    parser.add_argument('--fsync', default='batch', choices=['always', 'batch', 'never'])
+    args = parser.parse_args()
+    run([int(s) for s in args.sizes.split(',')], args.iterations, args.legacy_max, args.fsync)
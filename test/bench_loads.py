@@ -0,0 +1,169 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+BASE_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.dirname(BASE_DIR)
+sys.path.insert(0, os.path.join(PROJECT_ROOT, 'src'))
+
+from load_board import LoadBoard, LoadBoardSnapshot, parse_datetime  # noqa: E402
+from load_changes import LoadChangeLog  # noqa: E402
+from loads_format import json_records, text_results  # noqa: E402
+from ranking import DEFAULT_WEIGHTS  # noqa: E402
+from storage import CsvStorage  # noqa: E402
+
+CITIES = [
+    'Los Angeles, CA', 'Las Vegas, NV', 'Chicago, IL', 'Detroit, MI', 'Houston, TX',
+    'Atlanta, GA', 'Seattle, WA', 'Portland, OR', 'Miami, FL', 'Orlando, FL',
+    'Newark, NJ', 'Boston, MA', 'Phoenix, AZ', 'Denver, CO', 'Dallas, TX',
+]
+EQUIPMENT = ['Dry Van', 'Reefer', 'Flatbed']
+
+QUERIES = [
+    {},
+    {'origin': 'dallas'},
+    {'equipment_type': 'reefer', 'destination': 'CA'},
+    {'load_id': 'L0042'},
+]
+
+# Typed queries served from the sorted/hash indexes
+RANGE_QUERIES = [
+    {'loadboard_rate_min': '1200'},
+    {'loadboard_rate_min': '1200', 'miles_max': '500'},
+    {'pickup_after': '2025-10-10', 'pickup_before': '2025-10-12', 'equipment_type': 'Reefer'},
+    {'weight_min': '20000', 'weight_max': '21000'},
+]
+
+# Radius searches served from the grid indexes
+RADIUS_QUERIES = [
+    {'origin_near': 'Dallas, TX', 'radius_mi': '250'},
+    {'origin_near': 'Los Angeles, CA', 'dest_near': 'Phoenix, AZ', 'radius_mi': '150'},
+    {'origin_near': '41.88,-87.63', 'radius_mi': '50', 'equipment_type': 'Reefer'},
+]
+
+# Broad queries ranked by /loads/top
+TOP_QUERIES = [
+    {},
+    {'equipment_type': 'Reefer'},
+    {'origin_near': 'Dallas, TX', 'radius_mi': '500'},
+]
+
+
+def write_loads(path, n):
+    rng = random.Random(42)
+    rows = []
+    for i in range(n):
+        rows.append({
+            'load_id': f'L{i:05d}',
+            'origin': rng.choice(CITIES),
+            'destination': rng.choice(CITIES),
+            'pickup_datetime': f'2025-10-{rng.randint(1, 28):02d} {rng.randint(0, 23):02d}:00',
+            'delivery_datetime': f'2025-11-{rng.randint(1, 28):02d} {rng.randint(0, 23):02d}:00',
+            'equipment_type': rng.choice(EQUIPMENT),
+            'loadboard_rate': rng.randint(200, 4000),
+            'notes': '',
+            'weight': rng.randint(1000, 45000),
+            'commodity_type': 'General',
+            'num_of_pieces': rng.randint(1, 500),
+            'miles': rng.randint(10, 2500),
+            'dimensions': '48x40x60',
+        })
+    pd.DataFrame(rows).to_csv(path, index=False)
+
+
+def legacy_filter(path, params):
+    """The per-request path get_loads used before the snapshot"""
+    df = pd.read_csv(path)
+    for key, value in params.items():
+        if key in df.columns:
+            df = df[df[key].astype(str).str.contains(value, case=False, na=False)]
+    return df
+
+
+def legacy_format(df):
+    """The per-row string building get_loads used before loads_format"""
+    rows = []
+    for _, row in df.iterrows():
+        rows.append(', '.join(f"{col}: {row[col]}" for col in df.columns))
+    return '\n'.join(rows)
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    pick = lambda q: samples[min(len(samples) - 1, int(q * len(samples)))]
+    return pick(0.50) * 1000, pick(0.99) * 1000
+
+
+def time_calls(fn, iterations, queries=QUERIES):
+    samples = []
+    for i in range(iterations):
+        params = queries[i % len(queries)]
+        start = time.perf_counter()
+        fn(params)
+        samples.append(time.perf_counter() - start)
+    return percentiles(samples)
+
+
+def run(rows, iterations):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'sample_loads.csv')
+        write_loads(path, rows)
+        board = LoadBoard(CsvStorage(tmp))
+        board.snapshot()  # warm, as the first request after a reload would
+
+        for params in QUERIES:
+            assert len(legacy_filter(path, params)) == len(board.snapshot().filter(params)), params
+
+        legacy = time_calls(lambda p: legacy_filter(path, p), iterations)
+        snapshot = time_calls(lambda p: board.snapshot().filter(p), iterations)
+        ranges = time_calls(lambda p: board.snapshot().match_mask(p), iterations, RANGE_QUERIES)
+        radius = time_calls(lambda p: board.snapshot().match(p), iterations, RADIUS_QUERIES)
+        as_of = parse_datetime('2025-10-10')
+        top = time_calls(lambda p: board.snapshot().top(p, 5, DEFAULT_WEIGHTS, 'Reefer', as_of), iterations, TOP_QUERIES)
+
+        # Formatting every matched row; the empty query matches the whole board
+        matched = board.snapshot().filter({})
+        assert text_results(matched) == legacy_format(matched)
+        format_runs = max(5, iterations // 20)
+        iterrows = time_calls(lambda p: legacy_format(matched), format_runs)
+        text = time_calls(lambda p: text_results(matched), format_runs)
+        records = time_calls(lambda p: json_records(matched), format_runs)
+
+        # One rate change per write: logged and applied vs rebuilding the whole board
+        rng = random.Random(7)
+        writer = LoadBoard(CsvStorage(tmp), LoadChangeLog(os.path.join(tmp, 'loads_wal.ndjson')))
+        writer.snapshot()
+        write_runs = max(5, iterations // 4)
+        upsert = lambda p: (writer.upsert([{'load_id': f'L{rng.randrange(rows):05d}',
+                                             'loadboard_rate': rng.randint(500, 4000)}]), writer.snapshot())
+        incremental = time_calls(upsert, write_runs)
+        frame = writer.snapshot().live_frame()
+        rebuild = time_calls(lambda p: LoadBoardSnapshot(frame, None), max(3, write_runs // 20))
+
+    print(f'{rows} loads, {iterations} requests')
+    print(f'{"path":<12}{"p50 ms":>10}{"p99 ms":>10}')
+    print(f'{"read_csv":<12}{legacy[0]:>10.3f}{legacy[1]:>10.3f}')
+    print(f'{"snapshot":<12}{snapshot[0]:>10.3f}{snapshot[1]:>10.3f}')
+    print(f'{"ranges":<12}{ranges[0]:>10.3f}{ranges[1]:>10.3f}')
+    print(f'{"radius":<12}{radius[0]:>10.3f}{radius[1]:>10.3f}')
+    print(f'{"top 5":<12}{top[0]:>10.3f}{top[1]:>10.3f}')
+    print(f'formatting {len(matched)} matched rows, {format_runs} runs')
+    print(f'{"iterrows":<12}{iterrows[0]:>10.3f}{iterrows[1]:>10.3f}')
+    print(f'{"text":<12}{text[0]:>10.3f}{text[1]:>10.3f}')
+    print(f'{"json":<12}{records[0]:>10.3f}{records[1]:>10.3f}')
+    print(f'one load upserted, {write_runs} writes')
+    print(f'{"applied":<12}{incremental[0]:>10.3f}{incremental[1]:>10.3f}')
+    print(f'{"rebuilt":<12}{rebuild[0]:>10.3f}{rebuild[1]:>10.3f}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare GET /loads filtering paths')
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--iterations', type=int, default=200)
+    args = parser.parse_args()
+    run(args.rows, args.iterations)
@@ -0,0 +1,78 @@
+import argparse
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+BASE_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.dirname(BASE_DIR)
+SRC_DIR = os.path.join(PROJECT_ROOT, 'src')
+
+IMPORT_SNIPPET = 'import time; t = time.perf_counter(); import app; print(time.perf_counter() - t)'
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def app_env(data_dir, fast_start, port=None):
+    env = dict(os.environ, STORAGE_DIR=data_dir, FAST_START='1' if fast_start else '0')
+    if port is not None:
+        env['PORT'] = str(port)
+    return env
+
+
+def import_time(data_dir, fast_start):
+    out = subprocess.run([sys.executable, '-c', IMPORT_SNIPPET], cwd=SRC_DIR, env=app_env(data_dir, fast_start),
+                         capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def time_to_first_loads(data_dir, fast_start, timeout=60):
+    """Seconds from process spawn to the first 200 from GET /loads"""
+    port = free_port()
+    url = f'http://127.0.0.1:{port}/loads'
+    headers = {'x-api-key': os.environ.get('ACME_API_KEY', 'testkey123')}
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, 'app.py'], cwd=SRC_DIR, env=app_env(data_dir, fast_start, port),
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                with urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=5) as resp:
+                    if resp.status == 200:
+                        return time.perf_counter() - start
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.005)
+        raise RuntimeError(f'No /loads response within {timeout}s')
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def run(runs):
+    with tempfile.TemporaryDirectory() as data_dir:
+        for name in ('sample_loads.csv', 'call_metrics.csv'):
+            shutil.copy(os.path.join(SRC_DIR, name), data_dir)
+
+        print(f'{"mode":<8}{"import ms":>12}{"first /loads ms":>18}   (median of {runs})')
+        for fast_start in (False, True):
+            imports = [import_time(data_dir, fast_start) for _ in range(runs)]
+            first = [time_to_first_loads(data_dir, fast_start) for _ in range(runs)]
+            mode = 'fast' if fast_start else 'eager'
+            print(f'{mode:<8}{statistics.median(imports) * 1000:>12.1f}{statistics.median(first) * 1000:>18.1f}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Import time and time-to-first-/loads for eager vs fast start')
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+    run(args.runs)
@@ -0,0 +1,244 @@
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+BASE_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.dirname(BASE_DIR)
+SRC_DIR = os.path.join(PROJECT_ROOT, 'src')
+sys.path.insert(0, BASE_DIR)
+
+from synthetic_data import SEED, write_dataset  # noqa: E402
+
+API_KEY = os.environ.get('ACME_API_KEY', 'testkey123')
+BASELINE = os.path.join(BASE_DIR, 'bench_baseline.json')
+
+# name -> (loads, call metrics rows)
+SIZES = {
+    'small': (10000, 100000),
+    'large': (100000, 1000000),
+}
+
+LOADS_QUERIES = [
+    'origin=dallas&destination=atlanta',
+    'equipment_type=Reefer&loadboard_rate_min=9000&miles_max=2500',
+    'origin_near=Chicago,%20IL&radius_mi=60&equipment_type=Flatbed',
+    'pickup_after=2025-10-10T08:00&pickup_before=2025-10-10T09:00&weight_max=20000',
+    'load_id=L000042',
+]
+CALL_METRICS_PAGES = [
+    'limit=100',
+    'limit=100&outcome=successful&sentiment=positive',
+    'limit=1000&load_accepted=true',
+]
+
+
+def call_metric_body(rng):
+    return json.dumps({
+        'mc_number': str(100000 + rng.randrange(5000) * 137),
+        'carrier_name': 'Bench Carrier LLC',
+        'call_duration': rng.randint(30, 900),
+        'load_id': f'L{rng.randint(1, 10000):06d}',
+        'outcome': rng.choice(['successful', 'failed', 'transferred', 'no_match']),
+        'sentiment': rng.choice(['positive', 'neutral', 'negative']),
+        'negotiation_rounds': rng.randint(0, 4),
+        'initial_rate': 2500.0,
+        'final_rate': 2400.0,
+        'rate_difference': -100.0,
+        'load_accepted': rng.random() < 0.4,
+    })
+
+
+def scenarios(target):
+    """(endpoint name, iterations divisor, request factory) for every benchmarked endpoint"""
+    rng = random.Random(SEED)
+    auth = {'x-api-key': API_KEY}
+    json_auth = dict(auth, **{'Content-Type': 'application/json'})
+    cycle = lambda items: (lambda i: items[i % len(items)])
+    loads = cycle(LOADS_QUERIES)
+    pages = cycle(CALL_METRICS_PAGES)
+    etag = []
+
+    def revalidate(i):
+        # Taken when the scenario starts, after the POSTs above changed the data
+        if not etag:
+            etag.append(target.request('GET', '/dashboard/data', {}, None)[1].get('ETag', ''))
+        return ('GET', '/dashboard/data', {'If-None-Match': etag[0]}, None)
+
+    return [
+        ('GET /loads', 1, lambda i: ('GET', f'/loads?{loads(i)}', auth, None)),
+        ('POST /call-metrics', 1, lambda i: ('POST', '/call-metrics', json_auth, call_metric_body(rng))),
+        ('GET /call-metrics page', 1, lambda i: ('GET', f'/call-metrics?{pages(i)}', auth, None)),
+        ('GET /call-metrics export', 10, lambda i: ('GET', '/call-metrics?format=ndjson&limit=10000', auth, None)),
+        ('GET /dashboard', 1, lambda i: ('GET', '/dashboard', {}, None)),
+        ('GET /dashboard/data', 1, lambda i: ('GET', '/dashboard/data', {}, None)),
+        ('GET /dashboard/data 304', 1, revalidate),
+    ]
+
+
+class TestClientTarget:
+    """The app in this process, driven through Flask's test client"""
+
+    def __init__(self):
+        sys.path.insert(0, SRC_DIR)
+        import app
+        self.client = app.app.test_client()
+
+    def request(self, method, path, headers, body):
+        response = self.client.open(path, method=method, headers=headers, data=body)
+        response.get_data()  # streamed bodies are generated here
+        return response.status_code, response.headers
+
+
+class HttpTarget:
+    """A running server, over HTTP"""
+
+    def __init__(self, url):
+        self.url = url.rstrip('/')
+
+    def request(self, method, path, headers, body):
+        data = body.encode('utf-8') if body is not None else None
+        req = urllib.request.Request(self.url + path, data=data, headers=headers, method=method)
+        try:
+            with urllib.request.urlopen(req, timeout=120) as response:
+                response.read()
+                return response.status, response.headers
+        except urllib.error.HTTPError as e:
+            e.read()
+            return e.code, e.headers
+
+
+def percentile(samples, q):
+    return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+def measure(target, iterations, warmup=3):
+    """{endpoint: {requests, errors, throughput, p50, p95, p99}} with latencies in ms"""
+    results = {}
+    for name, divisor, make in scenarios(target):
+        runs = max(5, iterations // divisor)
+        for i in range(warmup):
+            target.request(*make(i))
+        samples, errors = [], 0
+        for i in range(runs):
+            method, path, headers, body = make(i)
+            start = time.perf_counter()
+            status, _ = target.request(method, path, headers, body)
+            samples.append(time.perf_counter() - start)
+            if status >= 400:
+                errors += 1
+        samples.sort()
+        results[name] = {
+            'requests': runs,
+            'errors': errors,
+            'throughput': round(runs / sum(samples), 1),
+            'p50': round(percentile(samples, 0.50) * 1000, 3),
+            'p95': round(percentile(samples, 0.95) * 1000, 3),
+            'p99': round(percentile(samples, 0.99) * 1000, 3),
+        }
+    return results
+
+
+def run_size(size, iterations, backend):
+    """Generate a dataset and benchmark a fresh app process against it"""
+    loads, call_metrics = SIZES[size]
+    with tempfile.TemporaryDirectory() as data_dir:
+        write_dataset(data_dir, loads, call_metrics)
+        if backend != 'csv':
+            sys.path.insert(0, SRC_DIR)
+            from migrate_storage import migrate
+            from storage import get_storage
+            source, target = get_storage('csv', data_dir), get_storage(backend, data_dir)
+            migrate(source, target)
+            source.close()
+            target.close()
+        env = dict(os.environ, STORAGE_DIR=data_dir, STORAGE_BACKEND=backend, FAST_START='0', ACME_API_KEY=API_KEY)
+        results_path = os.path.join(data_dir, 'results.json')
+        out = subprocess.run([sys.executable, __file__, '--worker', results_path, '--iterations', str(iterations)],
+                             cwd=SRC_DIR, env=env, capture_output=True, text=True)
+        if out.returncode != 0:
+            raise RuntimeError(f'Benchmark worker failed for {size}:\n{out.stderr}')
+        # The app logs to stdout, so results come back through a file
+        with open(results_path) as f:
+            return json.load(f)
+
+
+def report(results):
+    print(f'{"size":<20}{"endpoint":<28}{"req/s":>10}{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}{"errors":>8}')
+    for size, endpoints in results.items():
+        for name, r in endpoints.items():
+            print(f'{size:<20}{name:<28}{r["throughput"]:>10.1f}{r["p50"]:>10.3f}'
+                  f'{r["p95"]:>10.3f}{r["p99"]:>10.3f}{r["errors"]:>8}')
+
+
+def regressions(results, baseline, tolerance, min_delta_ms):
+    """Endpoints whose p95 grew past tolerance x baseline (and by more than min_delta_ms)"""
+    found = []
+    for size, endpoints in results.items():
+        for name, r in endpoints.items():
+            base = baseline.get(size, {}).get(name)
+            if base is None:
+                continue
+            if r['p95'] > base['p95'] * tolerance and r['p95'] - base['p95'] > min_delta_ms:
+                found.append(f'{size} {name}: p95 {r["p95"]:.3f} ms vs baseline {base["p95"]:.3f} ms')
+            if r['errors'] > base['errors']:
+                found.append(f'{size} {name}: {r["errors"]} errors vs baseline {base["errors"]}')
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Latency and throughput of every endpoint on synthetic data')
+    parser.add_argument('--sizes', default=','.join(SIZES), help=f'comma-separated subset of {", ".join(SIZES)}')
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--backend', default='csv', choices=['csv', 'sqlite', 'parquet', 'partitioned'])
+    parser.add_argument('--url', help='benchmark a running server instead (its data is used as-is)')
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--update-baseline', action='store_true', help='store these results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=1.5, help='allowed p95 slowdown factor')
+    parser.add_argument('--min-delta-ms', type=float, default=1.0, help='ignore p95 changes smaller than this')
+    parser.add_argument('--worker', metavar='RESULTS', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        results = measure(TestClientTarget(), args.iterations)
+        with open(args.worker, 'w') as f:
+            json.dump(results, f)
+        return 0
+
+    if args.url:
+        results = {'server': measure(HttpTarget(args.url), args.iterations)}
+    else:
+        # Baselines are kept per backend; csv results keep the plain size name
+        suffix = '' if args.backend == 'csv' else f'/{args.backend}'
+        results = {size + suffix: run_size(size, args.iterations, args.backend) for size in args.sizes.split(',')}
+    report(results)
+
+    if args.update_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f'Baseline written to {args.baseline}')
+        return 0
+    if not os.path.exists(args.baseline):
+        print('No baseline to compare against; run with --update-baseline to record one')
+        return 0
+    with open(args.baseline) as f:
+        found = regressions(results, json.load(f), args.tolerance, args.min_delta_ms)
+    for line in found:
+        print(f'REGRESSION {line}')
+    return 1 if found else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,75 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.dirname(BASE_DIR)
+SRC_DIR = os.path.join(PROJECT_ROOT, 'src')
+sys.path.insert(0, BASE_DIR)
+sys.path.insert(0, SRC_DIR)
+
+API_KEY = os.environ.get('ACME_API_KEY', 'testkey123')
+
+FORMATS = ['json', 'ndjson', 'csv', 'msgpack', 'arrow']
+ENCODINGS = ['identity', 'gzip', 'br']
+
+
+def timed_get(client, path, headers, iterations):
+    """(p50 seconds, body bytes) of fetching path and reading the whole body"""
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        response = client.get(path, headers=headers)
+        body = response.get_data()  # streamed bodies are generated here
+        samples.append(time.perf_counter() - start)
+        if response.status_code != 200:
+            raise RuntimeError(f'GET {path} {headers}: {response.status_code} {body[:200]!r}')
+    samples.sort()
+    return samples[len(samples) // 2], len(body)
+
+
+def run(call_metrics, iterations, query):
+    with tempfile.TemporaryDirectory() as data_dir:
+        # src/ modules read their configuration at import, so set it before loading any of them
+        os.environ.update(STORAGE_DIR=data_dir, FAST_START='0', ACME_API_KEY=API_KEY, LOG_LEVEL='WARNING')
+        from synthetic_data import write_dataset
+        write_dataset(data_dir, 1000, call_metrics)
+        import app
+        from wire_formats import content_encodings, missing_format_dependency
+        client = app.app.test_client()
+        encodings = ['identity'] + [e for e in ENCODINGS if e in content_encodings()]
+
+        print(f'GET /call-metrics?{query} over {call_metrics} calls')
+        print(f'{"format":<10}{"encoding":<10}{"bytes":>14}{"vs json":>10}{"p50 ms":>10}')
+        baseline = None
+        for fmt in FORMATS:
+            if missing_format_dependency(fmt):
+                print(f'{fmt:<10}skipped: {missing_format_dependency(fmt)}')
+                continue
+            for encoding in encodings:
+                headers = {'x-api-key': API_KEY, 'Accept-Encoding': encoding}
+                seconds, size = timed_get(client, f'/call-metrics?format={fmt}&{query}', headers, iterations)
+                baseline = baseline or size
+                print(f'{fmt:<10}{encoding:<10}{size:>14,}{size / baseline:>10.3f}{seconds * 1000:>10.1f}')
+
+        print('\nGET /dashboard/data')
+        print(f'{"format":<10}{"encoding":<10}{"bytes":>14}{"p50 ms":>10}')
+        for fmt, accept in (('json', 'application/json'), ('msgpack', 'application/msgpack')):
+            if missing_format_dependency(fmt):
+                continue
+            for encoding in encodings:
+                headers = {'Accept': accept, 'Accept-Encoding': encoding}
+                seconds, size = timed_get(client, '/dashboard/data', headers, iterations * 10)
+                print(f'{fmt:<10}{encoding:<10}{size:>14,}{seconds * 1000:>10.3f}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Bytes on the wire and time to serve GET /call-metrics and /dashboard/data per format and encoding')
+    parser.add_argument('--call-metrics', type=int, default=200000)
+    parser.add_argument('--iterations', type=int, default=5)
+    parser.add_argument('--query', default='', help='extra query string, e.g. outcome=successful')
+    args = parser.parse_args()
+    run(args.call_metrics, args.iterations, args.query)
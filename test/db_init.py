@@ -1,13 +1,18 @@
-import csv
 import os
+import sys
 
-# Place the CSV where the application expects it (project_root/src/loads.csv)
+import pandas as pd
+
+# Seed the load board through the same storage layer the application reads
+# (STORAGE_BACKEND / STORAGE_DIR select the backend, CSV by default)
 BASE_DIR = os.path.dirname(__file__)
 PROJECT_ROOT = os.path.dirname(BASE_DIR)
-CSV_PATH = os.path.join(PROJECT_ROOT, 'src', 'loads.csv')
+sys.path.insert(0, os.path.join(PROJECT_ROOT, 'src'))
+
+from storage import get_storage  # noqa: E402
 
 
-def init_csv():
+def init_loads():
     headers = [
         'load_id',
         'origin',
@@ -178,15 +183,13 @@ def init_csv():
     ]
 
     # Write header and sample rows
-    with open(CSV_PATH, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=headers)
-        writer.writeheader()
-        for row in sample_rows:
-            writer.writerow(row)
+    storage = get_storage()
+    storage.write_loads(pd.DataFrame(sample_rows, columns=headers))
+    storage.close()
 
-    print(f'CSV initialized at: {CSV_PATH} with {len(sample_rows)} sample rows')
+    print(f'Load board initialized in {storage.name} storage with {len(sample_rows)} sample rows')
 
 
 if __name__ == '__main__':
-    init_csv()
+    init_loads()
 
@@ -0,0 +1,178 @@
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Reproducible production-sized datasets for the benchmarks: the same seed
+# always yields byte-identical sample_loads.csv and call_metrics.csv
+BASE_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.dirname(BASE_DIR)
+sys.path.insert(0, os.path.join(PROJECT_ROOT, 'src'))
+
+from geo import CITIES_CSV, EARTH_RADIUS_MI  # noqa: E402
+from metrics_writer import CALL_METRICS_COLUMNS  # noqa: E402
+from storage import LOADS_COLUMNS  # noqa: E402
+
+SEED = 42
+START = np.datetime64('2025-10-01T00:00:00')
+
+EQUIPMENT = ['Dry Van', 'Reefer', 'Flatbed']
+EQUIPMENT_SHARE = [0.6, 0.25, 0.15]
+# Linehaul $/mile premium over dry van
+EQUIPMENT_PREMIUM = np.array([1.0, 1.15, 1.10])
+COMMODITIES = {
+    'Dry Van': ['General', 'Electronics', 'Paper', 'Furniture', 'Retail'],
+    'Reefer': ['Produce', 'Frozen Food', 'Dairy', 'Meat', 'Pharmaceuticals'],
+    'Flatbed': ['Steel', 'Lumber', 'Machinery', 'Building Materials', 'Pipe'],
+}
+DIMENSIONS = ['48x40x60', '48x40x96', '53x102x110', '240x96x60', '48x48x48']
+NOTES = ['', 'Handle with care', 'Team drivers', 'Drop and hook', 'Oversize - permit required', 'Lumper required']
+NOTES_SHARE = [0.7, 0.08, 0.05, 0.1, 0.02, 0.05]
+
+OUTCOMES = ['successful', 'failed', 'transferred', 'no_match']
+OUTCOME_SHARE = [0.45, 0.3, 0.15, 0.1]
+SENTIMENTS = ['positive', 'neutral', 'negative']
+# Sentiment mix per outcome
+SENTIMENT_SHARE = {
+    'successful': [0.65, 0.3, 0.05],
+    'failed': [0.1, 0.3, 0.6],
+    'transferred': [0.5, 0.4, 0.1],
+    'no_match': [0.15, 0.55, 0.3],
+}
+CARRIERS = 5000
+CARRIER_WORDS = ['Trans', 'Fast', 'Mega', 'Eagle', 'Blue', 'Summit', 'Prime', 'Iron', 'Lone Star', 'Coastal']
+CARRIER_SUFFIXES = ['Logistics LLC', 'Haul Inc', 'Truck Co', 'Freight', 'Carriers', 'Transport LLC']
+
+
+def _zipf_weights(n, s=1.0):
+    weights = 1.0 / np.arange(1, n + 1) ** s
+    return weights / weights.sum()
+
+
+def _format_minutes(stamps):
+    return pd.to_datetime(stamps).strftime('%Y-%m-%d %H:%M')
+
+
+def generate_loads(n, seed=SEED):
+    """n loads between real cities, with rate, transit time and weight following distance and equipment"""
+    rng = np.random.default_rng(seed)
+    cities = pd.read_csv(CITIES_CSV)
+    names = (cities['city'] + ', ' + cities['state']).to_numpy()
+    lats, lons = cities['lat'].to_numpy(), cities['lon'].to_numpy()
+    # Big metros originate and receive most freight; the table is ordered by size
+    weights = _zipf_weights(len(cities), 0.8)
+    origin = rng.choice(len(cities), n, p=weights)
+    destination = rng.choice(len(cities), n, p=weights)
+    same = origin == destination
+    destination[same] = (destination[same] + 1 + rng.integers(0, len(cities) - 1, same.sum())) % len(cities)
+
+    la1, lo1, la2, lo2 = map(np.radians, (lats[origin], lons[origin], lats[destination], lons[destination]))
+    a = np.sin((la2 - la1) / 2) ** 2 + np.cos(la1) * np.cos(la2) * np.sin((lo2 - lo1) / 2) ** 2
+    straight = 2 * EARTH_RADIUS_MI * np.arcsin(np.sqrt(a))
+    # Road miles run ~20% over great-circle distance
+    miles = np.maximum(10, np.round(straight * rng.normal(1.2, 0.05, n))).astype(int)
+
+    equipment = rng.choice(len(EQUIPMENT), n, p=EQUIPMENT_SHARE)
+    # Short hauls pay more per mile
+    per_mile = rng.lognormal(np.log(2.4), 0.2, n) * EQUIPMENT_PREMIUM[equipment] * (1 + 150 / (miles + 150))
+    rate = np.round(np.maximum(250, miles * per_mile) / 25) * 25
+
+    pickup = START + rng.integers(0, 30 * 24 * 4, n) * np.timedelta64(15, 'm')
+    # ~50 mph plus dwell, with an 11 hour driving day
+    transit_hours = miles / 50 + (miles // 550) * 10 + rng.uniform(1, 4, n)
+    delivery = pickup + (transit_hours * 60).astype(int) * np.timedelta64(1, 'm')
+
+    weight = np.clip(rng.normal(np.where(equipment == 2, 38000, 28000), 8000), 1000, 45000).round(-2).astype(int)
+    equipment_names = np.array(EQUIPMENT)[equipment]
+    commodity = np.array([COMMODITIES[e][i] for e, i in zip(equipment_names, rng.integers(0, 5, n))])
+
+    df = pd.DataFrame({
+        'load_id': [f'L{i:06d}' for i in range(1, n + 1)],
+        'origin': names[origin],
+        'destination': names[destination],
+        'pickup_datetime': _format_minutes(pickup),
+        'delivery_datetime': _format_minutes(delivery),
+        'equipment_type': equipment_names,
+        'loadboard_rate': rate.astype(int),
+        'notes': rng.choice(NOTES, n, p=NOTES_SHARE),
+        'weight': weight,
+        'commodity_type': commodity,
+        'num_of_pieces': rng.integers(1, 30, n) * np.where(equipment == 2, 1, 10),
+        'miles': miles,
+        'dimensions': rng.choice(DIMENSIONS, n),
+    })
+    return df[LOADS_COLUMNS]
+
+
+def generate_call_metrics(n, loads, seed=SEED + 1, days=90):
+    """n calls over `days` days, weighted to business hours, against the given loads"""
+    rng = np.random.default_rng(seed)
+    # Calls cluster on weekdays between 7:00 and 19:00: most weekend calls move to Friday
+    first_day = (START - np.timedelta64(days, 'D')).astype('datetime64[D]')
+    day = rng.integers(0, days, n)
+    weekday = (first_day.astype(np.int64) + day + 3) % 7  # 1970-01-01 was a Thursday
+    moved = (weekday >= 5) & (rng.random(n) < 0.7)
+    day[moved] -= weekday[moved] - 4
+    day = np.clip(day, 0, days - 1)
+    seconds = np.clip(rng.normal(13 * 3600, 3 * 3600, n), 0, 86399).astype(int)
+    stamps = np.sort(first_day + day * np.timedelta64(1, 'D')
+                     + seconds * np.timedelta64(1, 's') + rng.integers(0, 10 ** 6, n) * np.timedelta64(1, 'us'))
+
+    carrier = rng.choice(CARRIERS, n, p=_zipf_weights(CARRIERS, 0.9))
+    carrier_names = np.array([
+        f'{CARRIER_WORDS[i % len(CARRIER_WORDS)]}{i // len(CARRIER_WORDS)} {CARRIER_SUFFIXES[i % len(CARRIER_SUFFIXES)]}'
+        for i in range(CARRIERS)
+    ])
+    outcome = rng.choice(len(OUTCOMES), n, p=OUTCOME_SHARE)
+    sentiment = np.empty(n, dtype=int)
+    for i, name in enumerate(OUTCOMES):
+        hits = outcome == i
+        sentiment[hits] = rng.choice(len(SENTIMENTS), hits.sum(), p=SENTIMENT_SHARE[name])
+
+    load = rng.integers(0, len(loads), n)
+    initial_rate = loads['loadboard_rate'].to_numpy()[load].astype(float)
+    rounds = np.where(outcome == 3, 0, rng.poisson(1.5, n))
+    # Each round concedes a few percent; failed calls record no final rate
+    concession = np.round(initial_rate * rng.uniform(0.0, 0.04, n) * rounds / 25) * 25
+    successful = outcome == 0
+    final_rate = np.where(outcome == 1, 0.0, np.where(outcome == 3, initial_rate, initial_rate - concession))
+    accepted = successful & (rng.random(n) < 0.92)
+
+    df = pd.DataFrame({
+        'timestamp': pd.to_datetime(stamps).strftime('%Y-%m-%dT%H:%M:%S.%f'),
+        'mc_number': (100000 + carrier * 137).astype(str),
+        'carrier_name': carrier_names[carrier],
+        'call_duration': np.clip(rng.lognormal(np.log(180) + 0.15 * rounds, 0.5), 15, 1800).astype(int),
+        'load_id': loads['load_id'].to_numpy()[load],
+        'outcome': np.array(OUTCOMES)[outcome],
+        'sentiment': np.array(SENTIMENTS)[sentiment],
+        'negotiation_rounds': rounds,
+        'initial_rate': initial_rate,
+        'final_rate': final_rate,
+        'rate_difference': final_rate - initial_rate,
+        'load_accepted': np.where(accepted, 'True', 'False'),
+        'call_id': [f'call-{i:08d}' for i in range(n)],
+    })
+    return df[CALL_METRICS_COLUMNS]
+
+
+def write_dataset(data_dir, loads, call_metrics, seed=SEED):
+    """Write sample_loads.csv and call_metrics.csv for the CSV backend into data_dir"""
+    os.makedirs(data_dir, exist_ok=True)
+    loads_df = generate_loads(loads, seed)
+    loads_df.to_csv(os.path.join(data_dir, 'sample_loads.csv'), index=False)
+    generate_call_metrics(call_metrics, loads_df, seed + 1).to_csv(
+        os.path.join(data_dir, 'call_metrics.csv'), index=False)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate a reproducible synthetic load board and call history')
+    parser.add_argument('data_dir', help='directory to write sample_loads.csv and call_metrics.csv into')
+    parser.add_argument('--loads', type=int, default=100000)
+    parser.add_argument('--call-metrics', type=int, default=1000000)
+    parser.add_argument('--seed', type=int, default=SEED)
+    args = parser.parse_args()
+    write_dataset(args.data_dir, args.loads, args.call_metrics, args.seed)
+    print(f'Wrote {args.loads} loads and {args.call_metrics} call metrics to {args.data_dir}')
@@ -0,0 +1,27 @@
+import os
+import sys
+
+from werkzeug.test import EnvironBuilder
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from conditional import data_etag, not_modified  # noqa: E402
+
+
+def request(headers):
+    return EnvironBuilder(headers=headers).get_request()
+
+
+def test_etag_depends_only_on_dataset_stamp_and_variant():
+    # Every worker derives the same validator for the same storage version
+    assert data_etag('call-metrics', (1, 40), ['json']) == data_etag('call-metrics', (1, 40), ['json'])
+    assert data_etag('call-metrics', (1, 40), ['json']) != data_etag('call-metrics', (1, 41), ['json'])
+    assert data_etag('call-metrics', (1, 40), ['json']) != data_etag('call-metrics', (1, 40), ['csv'])
+
+
+def test_only_if_none_match_answers_not_modified():
+    etag = data_etag('loads', 3)
+    assert not_modified(request({'If-None-Match': f'"{etag}"'}), etag)
+    assert not not_modified(request({'If-None-Match': '"loads-stale"'}), etag)
+    assert not not_modified(request({'If-Modified-Since': 'Wed, 01 Jan 2200 00:00:00 GMT'}), etag)
+    assert not not_modified(request({}), etag)
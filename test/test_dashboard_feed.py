@@ -0,0 +1,25 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from dashboard_feed import DashboardFeed  # noqa: E402
+
+
+class UntouchableAggregates:
+    def refresh(self):
+        raise AssertionError('notify() must not refresh the aggregates')
+
+    snapshot = refresh
+
+
+def test_notify_only_wakes_the_feed_thread():
+    feed = DashboardFeed(UntouchableAggregates(), render=lambda agg: {})
+    feed.notify()
+    assert not feed._wake.is_set()
+
+    sub = feed.broadcaster.subscribe()
+    feed.notify()
+    assert feed._wake.is_set()
+    assert feed._thread is None
+    feed.broadcaster.unsubscribe(sub)
@@ -0,0 +1,71 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from idempotency import CallIdIndex  # noqa: E402
+from storage import CsvStorage  # noqa: E402
+
+
+def calls(call_ids):
+    return [{
+        'timestamp': '2025-07-01T10:00:00',
+        'mc_number': '123456',
+        'carrier_name': 'Test Carrier',
+        'call_duration': 120,
+        'load_id': 'L001',
+        'outcome': 'successful',
+        'sentiment': 'positive',
+        'negotiation_rounds': 1,
+        'initial_rate': 2000.0,
+        'final_rate': 1950.0,
+        'rate_difference': -50.0,
+        'load_accepted': True,
+        'call_id': key,
+    } for key in call_ids]
+
+
+class WatchedStorage:
+    """Records each frame scan and whether the index lock was held during it"""
+
+    def __init__(self, storage):
+        self.storage = storage
+        self.index = None
+        self.scans = []
+
+    def __getattr__(self, name):
+        return getattr(self.storage, name)
+
+    def iter_call_metrics_frames(self, cursor=0, end=None, **kwargs):
+        self.scans.append(self.index is not None and self.index._lock.locked())
+        return self.storage.iter_call_metrics_frames(cursor, end, **kwargs)
+
+
+def index_over(tmp_path, call_ids):
+    storage = CsvStorage(str(tmp_path))
+    storage.append_call_metrics(calls(call_ids))
+    watched = WatchedStorage(storage)
+    index = CallIdIndex(watched, recent_size=2, capacity=1000, error=0.01)
+    index.refresh()
+    watched.index = index
+    watched.scans.clear()
+    return index, watched
+
+
+def test_old_call_ids_are_confirmed_against_storage_outside_the_lock(tmp_path):
+    index, watched = index_over(tmp_path, ['a', 'b', 'c', 'd'])
+    assert 'a' not in index.recent
+    assert index.claim(['a', 'e', 'a']) == [False, True, False]
+    assert watched.scans == [False]
+
+
+def test_released_call_ids_are_accepted_without_a_storage_scan(tmp_path):
+    index, watched = index_over(tmp_path, ['a', 'b'])
+    assert index.claim(['x']) == [True]
+    index.release(['x'])
+    # The Bloom filter still matches x, but it is known not to be stored
+    assert index.claim(['x']) == [True]
+    assert watched.scans == []
+    # Reserved again, so a second retry is a duplicate
+    assert index.claim(['x']) == [False]
+    assert 'x' not in index.released
@@ -0,0 +1,51 @@
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from load_board import LoadBoardSnapshot  # noqa: E402
+from storage import LOADS_COLUMNS  # noqa: E402
+
+
+def board():
+    df = pd.DataFrame([
+        {'load_id': 'L001', 'origin': 'Dallas, TX', 'destination': 'Atlanta, GA', 'equipment_type': 'Reefer',
+         'loadboard_rate': 2000, 'miles': 780},
+        {'load_id': 'L002', 'origin': 'Chicago, IL', 'destination': 'Detroit, MI', 'equipment_type': 'Dry Van',
+         'loadboard_rate': 800, 'miles': 283},
+    ], columns=LOADS_COLUMNS)
+    return LoadBoardSnapshot(df, (None, None, 0))
+
+
+def test_applied_changes_leave_the_older_snapshot_lookup_alone():
+    old = board()
+    new = old.applied([
+        {'op': 'upsert', 'load': {'load_id': 'L001', 'loadboard_rate': 2100}},
+        {'op': 'upsert', 'load': {'load_id': 'L003', 'origin': 'Dallas, TX', 'loadboard_rate': 1200}},
+        {'op': 'delete', 'load_id': 'L002'},
+    ], (None, None, 3))
+
+    # Readers of the older snapshot only ever get rows of its own frame
+    assert old.ids_by_load == {'L001': 0, 'L002': 1}
+    assert all(row < len(old.df) for row in old.ids_by_load.values())
+    assert new.ids_by_load == {'L001': 2, 'L003': 3}
+    assert float(new.typed['loadboard_rate'][new.ids_by_load['L001']]) == 2100
+
+
+def test_radius_params_are_not_also_substring_filters():
+    bounds, exact, near, substring = board().typed_conditions({'origin_near': 'Dallas, TX', 'dest_near': '33.75,-84.39'})
+    assert set(near) == {'origin', 'destination'}
+    assert substring == {} and bounds == {} and exact == {}
+
+
+def test_loads_without_a_comma_in_their_city_are_found_by_radius():
+    df = pd.DataFrame([
+        {'load_id': 'L001', 'origin': 'Dallas TX', 'destination': 'Atlanta, GA', 'loadboard_rate': 2000},
+        {'load_id': 'L002', 'origin': 'Chicago, IL', 'destination': 'Detroit, MI', 'loadboard_rate': 800},
+    ], columns=LOADS_COLUMNS)
+    snap = LoadBoardSnapshot(df, (None, None, 0))
+    for query in ('Dallas TX', 'Dallas, TX'):
+        mask, _ = snap.match({'origin_near': query, 'radius_mi': '25'})
+        assert list(snap.df['load_id'][mask]) == ['L001']
@@ -0,0 +1,31 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from metrics_writer import CallMetricsWriter  # noqa: E402
+
+
+def test_batch_mode_syncs_a_quiet_tail_within_the_interval(tmp_path):
+    writer = CallMetricsWriter(str(tmp_path / 'call_metrics.csv'), fsync_mode='batch', fsync_rows=100,
+                               fsync_interval=0.05)
+    writer.append({'call_id': 'a'})
+    writer.append({'call_id': 'b'})
+    assert writer._unsynced == 2
+    # No further append arrives: the deadline timer does the group commit
+    deadline = time.monotonic() + 5
+    while writer._unsynced and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert writer._unsynced == 0
+    writer.close()
+
+
+def test_close_cancels_the_pending_group_commit(tmp_path):
+    writer = CallMetricsWriter(str(tmp_path / 'call_metrics.csv'), fsync_mode='batch', fsync_rows=100,
+                               fsync_interval=60)
+    writer.append({'call_id': 'a'})
+    timer = writer._timer
+    writer.close()
+    timer.join(1)
+    assert not timer.is_alive() and writer._unsynced == 0
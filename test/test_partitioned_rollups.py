@@ -0,0 +1,80 @@
+import os
+import sys
+from datetime import date
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from rollups import read_rollups  # noqa: E402
+from storage import PartitionedCsvStorage  # noqa: E402
+
+RATE_BIN_WIDTH = 25
+DAY = date(2025, 7, 1)
+TODAY = date(2025, 10, 1)
+
+
+def calls(n, accepted, duration=120):
+    return [{
+        'timestamp': f'{DAY.isoformat()}T10:{i % 60:02d}:00',
+        'mc_number': '123456',
+        'carrier_name': 'Test Carrier',
+        'call_duration': duration,
+        'load_id': 'L001',
+        'outcome': 'successful',
+        'sentiment': 'positive',
+        'negotiation_rounds': 1,
+        'initial_rate': 2000.0,
+        'final_rate': 1950.0,
+        'rate_difference': -50.0,
+        'load_accepted': accepted,
+        'call_id': '',
+    } for i in range(n)]
+
+
+def compact(storage):
+    return storage.compact_call_metrics(RATE_BIN_WIDTH, rollup_after_days=7, retention_days=30, today=TODAY)
+
+
+def day_summary(storage):
+    return next(s for s in read_rollups(storage.rollups_path) if s['date'] == DAY.isoformat())
+
+
+def test_late_rows_for_an_expired_day_are_merged_into_its_rollup(tmp_path):
+    storage = PartitionedCsvStorage(str(tmp_path))
+    storage.append_call_metrics(calls(5, True))
+    assert compact(storage) == (1, 1)
+    assert not os.path.exists(storage._path(DAY))
+
+    # A late write recreates the deleted partition with only the new rows
+    storage.append_call_metrics(calls(3, False, duration=600))
+    storage.close()
+    storage = PartitionedCsvStorage(str(tmp_path))
+
+    # Rebuilds and daily reports see the late rows before the next compaction
+    summaries, _ = storage.call_metrics_rollups()
+    assert [s['calls'] for s in summaries] == [8]
+    assert storage.daily_call_metrics(RATE_BIN_WIDTH)[0]['calls'] == 8
+
+    compact(storage)
+    compact(storage)
+    summary = day_summary(storage)
+    assert summary['calls'] == 8
+    assert summary['loads_accepted'] == 5
+    assert summary['duration_count'] == 8
+    assert summary['duration_max'] == 600
+    assert sum(summary['durations_accepted'].values()) == 5
+    assert sum(summary['durations_rejected'].values()) == 3
+    summaries, _ = storage.call_metrics_rollups()
+    assert [s['calls'] for s in summaries] == [8]
+
+
+def test_rolled_up_day_still_on_disk_is_not_counted_twice(tmp_path):
+    storage = PartitionedCsvStorage(str(tmp_path))
+    storage.append_call_metrics(calls(4, True))
+    # Rolled up but kept as raw rows (retention not reached)
+    storage.compact_call_metrics(RATE_BIN_WIDTH, rollup_after_days=7, retention_days=200, today=TODAY)
+    storage.append_call_metrics(calls(2, True))
+    storage.compact_call_metrics(RATE_BIN_WIDTH, rollup_after_days=7, retention_days=200, today=TODAY)
+    storage.compact_call_metrics(RATE_BIN_WIDTH, rollup_after_days=7, retention_days=200, today=TODAY)
+    assert day_summary(storage)['calls'] == 6
+    assert os.path.exists(storage._path(DAY))
+    storage.close()
@@ -0,0 +1,60 @@
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from load_board import LoadBoardSnapshot  # noqa: E402
+from rate_guidance import RateGuidance  # noqa: E402
+from storage import LOADS_COLUMNS  # noqa: E402
+
+
+class NoCalls:
+    def call_metrics_state(self):
+        return (0, 0)
+
+
+class Board:
+    def __init__(self, snap):
+        self.snap = snap
+
+    def snapshot(self):
+        return self.snap
+
+
+class CountingLookup(dict):
+    """load_id -> row that counts reads, like a lookup another request could change in between"""
+
+    reads = 0
+
+    def get(self, key, default=None):
+        self.reads += 1
+        return super().get(key, default)
+
+    def __getitem__(self, key):
+        self.reads += 1
+        return super().__getitem__(key)
+
+
+def snapshot():
+    df = pd.DataFrame([
+        {'load_id': 'L001', 'origin': 'Dallas, TX', 'destination': 'Atlanta, GA', 'equipment_type': 'Reefer',
+         'loadboard_rate': 2000, 'miles': 780},
+    ], columns=LOADS_COLUMNS)
+    return LoadBoardSnapshot(df, (None, None, 0))
+
+
+def test_guidance_reads_the_load_row_once():
+    snap = snapshot()
+    snap.ids_by_load = CountingLookup(snap.ids_by_load)
+    guidance = RateGuidance(NoCalls(), Board(snap)).guidance('L001')
+    assert guidance['loadboard_rate'] == 2000
+    assert guidance['origin'] == 'Dallas, TX'
+    assert snap.ids_by_load.reads == 1
+
+
+def test_guidance_ignores_a_row_past_the_snapshot_frame():
+    snap = snapshot()
+    snap.ids_by_load['L002'] = len(snap.df)
+    assert RateGuidance(NoCalls(), Board(snap)).guidance('L002') is None
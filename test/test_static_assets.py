@@ -0,0 +1,19 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from static_assets import StaticAsset, unhashed_name  # noqa: E402
+
+
+def test_hashed_name_maps_back_to_the_asset_name():
+    asset = StaticAsset('plotly-2.35.2.min.js', b'console.log(1)')
+    assert asset.hashed_name.startswith('plotly-2.35.2.min.') and asset.hashed_name.endswith('.js')
+    assert unhashed_name(asset.hashed_name) == 'plotly-2.35.2.min.js'
+
+
+def test_dotted_names_without_a_digest_are_kept():
+    assert unhashed_name('plotly-2.35.2.min.js') == 'plotly-2.35.2.min.js'
+    assert unhashed_name('plotly.min.js') == 'plotly.min.js'
+    assert unhashed_name('plotly.0123456789ABCDEF.js') == 'plotly.0123456789ABCDEF.js'
+    assert unhashed_name('plotly.js') == 'plotly.js'
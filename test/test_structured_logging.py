@@ -0,0 +1,27 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from structured_logging import configure_logging  # noqa: E402
+from telemetry import REGISTRY  # noqa: E402
+
+
+def test_dropped_log_records_are_exported():
+    handler = configure_logging()
+    handler.dropped = 7
+    assert 'log_records_dropped 7' in REGISTRY.render().splitlines()
+
+
+def test_unknown_log_levels_fall_back_instead_of_failing_at_import(tmp_path):
+    import subprocess
+    env = dict(os.environ, LOG_LEVEL='verbose', LOG_ROUTE_LEVELS='/loads=WARNING,/metrics=loud')
+    code = ('import logging, structured_logging as s; s.configure_logging(); '
+            'print(s.LOG_LEVEL, s.ROUTE_LEVELS == {"/loads": logging.WARNING}); s._handler.close()')
+    out = subprocess.run([sys.executable, '-c', code], env=env, cwd=os.path.join(os.path.dirname(
+        os.path.dirname(os.path.abspath(__file__))), 'src'), capture_output=True, text=True, timeout=60)
+    assert out.returncode == 0, out.stderr
+    lines = out.stdout.splitlines()
+    assert 'INFO True' in lines
+    warnings = [line for line in lines if 'log_level.invalid' in line]
+    assert len(warnings) == 2 and 'VERBOSE' in warnings[0] and 'loud' in warnings[1]